@@ -0,0 +1,459 @@
+# fleet_sim.py - 模拟 Agent 集群，用于压测桌面端监控
+"""
+serve: 单进程 asyncio 启动大量假 Agent（每个 Agent 一个端口），提供与 server.py 相同的
+       /metrics 接口与 Bearer Token 认证，按配置比例分配行为:
+         ok            正常随机游走的指标
+         slow          每个请求随机延迟（--slow-ms）
+         timeout       持有连接 --timeout-hold 秒不响应（桌面端请求超时为 10 秒）
+         unauthorized  使用另一把密钥，桌面端请求返回 401
+         spike         周期性 CPU 超过阈值（--spike-period / --spike-duration）
+bench: 启动模拟集群，用无界面的监控引擎逐轮检查，集群规模逐级增加，
+       统计每轮耗时、告警发现延迟以及桌面端 CPU/内存
+startup: 冷启动基准，反复启动 jk.py（需要图形环境），统计窗口显示、卡片创建完成、
+       托盘就绪和首次检查完成的时间
+
+示例:
+    python fleet_sim.py serve --count 500 --port-base 19000
+    python fleet_sim.py bench --sizes 50,100,250,500 --rounds 3 --json fleet.json
+    python fleet_sim.py startup --servers 300 --runs 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PROFILES = ('ok', 'slow', 'timeout', 'unauthorized', 'spike')
+
+
+def parse_mix(text):
+    """解析 ok:90,slow:5 形式的行为比例"""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition(':')
+        name = name.strip()
+        if not name:
+            continue
+        if name not in PROFILES:
+            raise ValueError(f'unknown profile: {name}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def assign_profiles(count, mix, rng):
+    """按比例分配行为，保证每种行为的数量与比例一致后再打乱"""
+    total = sum(mix.values())
+    profiles = []
+    for name, weight in mix.items():
+        profiles += [name] * int(round(count * weight / total))
+    profiles = (profiles + ['ok'] * count)[:count]
+    rng.shuffle(profiles)
+    return profiles
+
+
+class FakeAgent:
+    """单个假 Agent：指标随机游走，按行为脚本返回延迟、超时、401 或超阈值数据"""
+
+    def __init__(self, index, port, profile, key, args, rng):
+        self.name = f'sim-{index:04d}'
+        self.port = port
+        self.profile = profile
+        self.key = key if profile != 'unauthorized' else key + '-other'
+        self.args = args
+        self.rng = rng
+        self.cpu = rng.uniform(5, 50)
+        self.memory = rng.uniform(20, 70)
+        self.load = rng.uniform(5, 50)
+        self.phase = rng.uniform(0, args.spike_period)
+        self.requests = 0
+
+    def spiking(self, now, started_at):
+        if self.profile != 'spike':
+            return False
+        return (now - started_at - self.phase) % self.args.spike_period < self.args.spike_duration \
+            and now - started_at >= self.phase
+
+    def metrics(self, now, started_at):
+        rng = self.rng
+        self.cpu = min(70.0, max(1.0, self.cpu + rng.gauss(0, 3)))
+        self.memory = min(75.0, max(5.0, self.memory + rng.gauss(0, 0.5)))
+        self.load = min(70.0, max(1.0, self.load + rng.gauss(0, 2)))
+        cpu = 95.0 if self.spiking(now, started_at) else self.cpu
+        return {
+            'timestamp': datetime.fromtimestamp(now).isoformat(),
+            'cpu': {'percent': round(cpu, 2), 'count': 8},
+            'memory': {
+                'total': 16 * 1024 ** 3,
+                'used': int(16 * 1024 ** 3 * self.memory / 100),
+                'percent': round(self.memory, 2),
+                'total_gb': 16.0,
+                'used_gb': round(16 * self.memory / 100, 2),
+                'swap': {'total': 0, 'used': 0, 'percent': 0, 'swapin_rate': 0.0, 'swapout_rate': 0.0}
+            },
+            'disk': {'total': 100 * 1024 ** 3, 'used': 40 * 1024 ** 3, 'percent': 40.0,
+                     'total_gb': 100.0, 'used_gb': 40.0, 'free_gb': 60.0},
+            'system': {'hostname': self.name, 'platform': 'Linux', 'platform_release': 'sim',
+                       'architecture': 'x86_64'},
+            'load': {'load1': round(self.load * 0.08, 2), 'load5': round(self.load * 0.08, 2),
+                     'load15': round(self.load * 0.08, 2), 'load1_percent': round(self.load, 2),
+                     'load5_percent': round(self.load, 2), 'load15_percent': round(self.load, 2)},
+            'pressure': {'available': False},
+            'cgroups': {'available': False}
+        }
+
+    async def handle(self, reader, writer):
+        started_at = self.args.started_at
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                parts = request_line.decode('latin-1').split()
+                path = parts[1].split('?')[0] if len(parts) > 1 else '/'
+                self.requests += 1
+
+                if self.profile == 'timeout':
+                    await asyncio.sleep(self.args.timeout_hold)
+                    break
+                if self.profile == 'slow':
+                    await asyncio.sleep(self.rng.uniform(*self.args.slow_range) / 1000)
+
+                token = headers.get('authorization', '')
+                token = token[7:] if token.startswith('Bearer ') else token
+                if token != self.key:
+                    status, data = '401 Unauthorized', {'error': 'Unauthorized', 'code': 401}
+                elif path in ('/metrics', '/health'):
+                    status, data = '200 OK', self.metrics(time.time(), started_at)
+                else:
+                    status, data = '404 Not Found', {'error': 'Not Found', 'path': path}
+
+                body = json.dumps(data).encode('utf-8')
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                head = (f'HTTP/1.1 {status}\r\nContent-Type: application/json; charset=utf-8\r\n'
+                        f'Content-Length: {len(body)}\r\n'
+                        f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+                writer.write(head.encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve_fleet(args):
+    rng = random.Random(args.seed)
+    args.started_at = time.time()
+    profiles = assign_profiles(args.count, parse_mix(args.mix), rng)
+    agents = [FakeAgent(i, args.port_base + i, profile, args.key, args, random.Random(args.seed + i))
+              for i, profile in enumerate(profiles)]
+    servers = []
+    for agent in agents:
+        servers.append(await asyncio.start_server(agent.handle, args.host, agent.port, backlog=128))
+
+    events = {
+        'started_at': args.started_at,
+        'key': args.key,
+        'spike_period': args.spike_period,
+        'spike_duration': args.spike_duration,
+        'agents': [{'name': a.name, 'url': f'http://{args.host}:{a.port}', 'profile': a.profile,
+                    'phase': round(a.phase, 3)} for a in agents]
+    }
+    if args.events:
+        tmp = args.events + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(events, f, indent=2)
+        os.replace(tmp, args.events)
+
+    counts = {p: profiles.count(p) for p in PROFILES if p in profiles}
+    print(f"Fleet ready: {len(agents)} agents on {args.host}:{args.port_base}-{args.port_base + len(agents) - 1} {counts}",
+          flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for server in servers:
+            server.close()
+
+
+def rss_bytes():
+    """当前进程 RSS（无法获取时返回 None）"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == 'darwin' else usage * 1024
+    except ImportError:
+        return None
+
+
+def make_headless_monitor(monitor_core, args, notifications, logs):
+    """无界面的监控引擎：日志与通知写入列表"""
+
+    class HeadlessMonitor(monitor_core.MonitorEngine):
+        def __init__(self):
+            super().__init__()
+            self.apply_settings({
+                'cpu_threshold': args.cpu_threshold,
+                'latency_threshold': args.latency_threshold,
+                'check_interval': 0,
+                'verify_count': args.verify_count,
+                'verify_interval': 0,
+                'enable_smart_alert': str(args.smart_alert),
+                'alert_time_window': args.alert_window
+            })
+            self.monitoring = True
+
+        def log(self, message, level='info'):
+            logs.append((level, message))
+
+        def show_notification(self, title, message):
+            notifications.append((time.time(), title))
+
+    return HeadlessMonitor()
+
+
+def spike_start(agent, events, now):
+    """agent 最近一次 CPU 超阈值开始的时间"""
+    elapsed = now - events['started_at'] - agent['phase']
+    if elapsed < 0:
+        return None
+    return events['started_at'] + agent['phase'] + (elapsed // events['spike_period']) * events['spike_period']
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(pct / 100.0 * len(values))) - 1))]
+
+
+def start_fleet(args, count, events_file):
+    """在子进程中启动模拟集群，等待其写出 events 文件"""
+    fleet = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'serve',
+                              '--count', str(count), '--port-base', str(args.port_base),
+                              '--mix', args.mix, '--events', events_file, '--seed', str(args.seed),
+                              '--spike-period', str(args.spike_period),
+                              '--spike-duration', str(args.spike_duration),
+                              '--slow-ms', args.slow_ms, '--timeout-hold', str(args.timeout_hold)])
+    deadline = time.time() + 30
+    while not os.path.exists(events_file):
+        if fleet.poll() is not None or time.time() > deadline:
+            fleet.terminate()
+            raise RuntimeError('fleet simulator failed to start')
+        time.sleep(0.2)
+    with open(events_file, 'r') as f:
+        return fleet, json.load(f)
+
+
+def run_bench(args):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import monitor_core
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    events_file = os.path.join(tempfile.mkdtemp(prefix='fleet-'), 'events.json')
+    fleet, events = start_fleet(args, max(sizes), events_file)
+    results = []
+    try:
+        by_name = {a['name']: a for a in events['agents']}
+
+        print(f"\n{'size':>6}{'round avg':>11}{'round max':>11}{'checks/s':>10}{'errors':>8}"
+              f"{'alerts':>8}{'detect p50':>12}{'detect max':>12}{'cpu s/round':>13}{'rss MB':>8}")
+        for size in sizes:
+            notifications, logs = [], []
+            app = make_headless_monitor(monitor_core, args, notifications, logs)
+            app.servers = [monitor_core.ServerState(a['name'], a['url'], key=events['key'])
+                           for a in events['agents'][:size]]
+            durations, cpu_times = [], []
+            for _ in range(args.rounds):
+                started, cpu_started = time.perf_counter(), time.process_time()
+                app.check_all_servers()
+                durations.append(time.perf_counter() - started)
+                cpu_times.append(time.process_time() - cpu_started)
+
+            latencies = []
+            for notified_at, title in notifications:
+                name = title.rsplit(' - ', 1)[-1].strip()
+                agent = by_name.get(name)
+                if agent and agent['profile'] == 'spike':
+                    start = spike_start(agent, events, notified_at)
+                    if start is not None:
+                        latencies.append(notified_at - start)
+
+            rss = rss_bytes()
+            r = {
+                'size': size,
+                'rounds': args.rounds,
+                'round_avg_s': round(sum(durations) / len(durations), 3),
+                'round_max_s': round(max(durations), 3),
+                'checks_per_s': round(size * len(durations) / sum(durations), 1) if sum(durations) else None,
+                'errors': sum(1 for level, _ in logs if level == 'error'),
+                'alerts': len(notifications),
+                'detect_p50_s': round(percentile(latencies, 50), 2) if latencies else None,
+                'detect_max_s': round(max(latencies), 2) if latencies else None,
+                'cpu_s_per_round': round(sum(cpu_times) / len(cpu_times), 3),
+                'rss_mb': round(rss / 1024 / 1024, 1) if rss else None
+            }
+            results.append(r)
+            print(f"{r['size']:>6}{r['round_avg_s']:>11}{r['round_max_s']:>11}{r['checks_per_s']!s:>10}"
+                  f"{r['errors']:>8}{r['alerts']:>8}{r['detect_p50_s']!s:>12}{r['detect_max_s']!s:>12}"
+                  f"{r['cpu_s_per_round']:>13}{r['rss_mb']!s:>8}", flush=True)
+    finally:
+        fleet.terminate()
+        fleet.wait()
+        try:
+            os.remove(events_file)
+            os.rmdir(os.path.dirname(events_file))
+        except OSError:
+            pass
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'timestamp': datetime.now().isoformat(),
+                'python': sys.version.split()[0],
+                'config': {k: v for k, v in vars(args).items() if k not in ('json', 'slow_range')},
+                'results': results
+            }, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    return 0
+
+
+def run_startup(args):
+    """
+    冷启动基准：每轮启动一个新的 jk.py 进程（需要图形环境），数据库中预置 --servers 台模拟服务器，
+    统计从启动进程到窗口显示、卡片全部创建、托盘图标就绪和首次检查完成的时间
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, here)
+    import monitor_core
+
+    workdir = tempfile.mkdtemp(prefix='startup-')
+    report_file = os.path.join(workdir, 'startup.json')
+    stages = ('window', 'cards', 'tray', 'first_poll')
+    fleet, events = start_fleet(args, args.servers, os.path.join(workdir, 'events.json'))
+    runs = []
+    try:
+        db = monitor_core.DatabaseManager(os.path.join(workdir, 'server_monitor.db'),
+                                          os.path.join(workdir, 'monitor.key'))
+        for agent in events['agents']:
+            db.add_server(agent['name'], agent['url'], events['key'])
+
+        print(f"\n{'run':>4}" + ''.join(f"{stage + ' s':>14}" for stage in stages))
+        for i in range(args.runs):
+            if os.path.exists(report_file):
+                os.remove(report_file)
+            started = time.time()
+            try:
+                subprocess.run([sys.executable, os.path.join(here, 'jk.py')], cwd=workdir, timeout=args.timeout,
+                               env=dict(os.environ, MONITOR_STARTUP_REPORT=report_file))
+            except subprocess.TimeoutExpired:
+                pass
+            if not os.path.exists(report_file):
+                print(f"run {i + 1}: jk.py exited without a startup report (is a display available?)")
+                return 1
+            with open(report_file, 'r') as f:
+                marks = json.load(f)['marks']
+            run = {stage: round(marks[stage] - started, 3) for stage in stages if stage in marks}
+            runs.append(run)
+            print(f"{i + 1:>4}" + ''.join(f"{run.get(stage, '-')!s:>14}" for stage in stages), flush=True)
+
+        median = {stage: percentile([r[stage] for r in runs if stage in r], 50) for stage in stages}
+        print(f"{'p50':>4}" + ''.join(f"{median[stage]!s:>14}" for stage in stages))
+    finally:
+        fleet.terminate()
+        fleet.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'timestamp': datetime.now().isoformat(),
+                'python': sys.version.split()[0],
+                'servers': args.servers,
+                'runs': runs,
+                'p50': median
+            }, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Server Monitor fleet simulator')
+    sub = parser.add_subparsers(dest='command')
+
+    def common(p):
+        p.add_argument('--port-base', type=int, default=19000)
+        p.add_argument('--mix', default='ok:90,slow:4,timeout:1,unauthorized:1,spike:4',
+                       help='profile weights: ok, slow, timeout, unauthorized, spike')
+        p.add_argument('--seed', type=int, default=1)
+        p.add_argument('--spike-period', type=float, default=60.0)
+        p.add_argument('--spike-duration', type=float, default=20.0)
+        p.add_argument('--slow-ms', default='200-2000', help='latency range for slow agents')
+        p.add_argument('--timeout-hold', type=float, default=15.0)
+
+    serve = sub.add_parser('serve', help='run the simulated fleet')
+    common(serve)
+    serve.add_argument('--count', type=int, default=500)
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--key', default='sim-key')
+    serve.add_argument('--events', help='write agent profiles and spike schedule to this JSON file')
+
+    bench = sub.add_parser('bench', help='benchmark the desktop monitor against the simulated fleet')
+    common(bench)
+    bench.add_argument('--sizes', default='50,100,250,500')
+    bench.add_argument('--rounds', type=int, default=3)
+    bench.add_argument('--cpu-threshold', type=float, default=80.0)
+    bench.add_argument('--latency-threshold', type=float, default=2000.0)
+    bench.add_argument('--smart-alert', action='store_true', help='enable verification before alerting')
+    bench.add_argument('--verify-count', type=int, default=3)
+    bench.add_argument('--alert-window', type=int, default=1, help='alert de-duplication window in seconds')
+    bench.add_argument('--json', help='write machine-readable results to this file')
+
+    startup = sub.add_parser('startup', help='measure desktop cold start: time to window, cards, tray and first poll')
+    common(startup)
+    startup.set_defaults(mix='ok:1')
+    startup.add_argument('--servers', type=int, default=100)
+    startup.add_argument('--runs', type=int, default=5)
+    startup.add_argument('--timeout', type=float, default=60.0, help='give up on a run after this many seconds')
+    startup.add_argument('--json', help='write machine-readable results to this file')
+
+    args = parser.parse_args()
+    if args.command is None:
+        parser.print_help()
+        return 1
+    low, _, high = args.slow_ms.partition('-')
+    args.slow_range = (float(low), float(high or low))
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve_fleet(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if args.command == 'startup':
+        return run_startup(args)
+    return run_bench(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,310 +1,118 @@
 # jk.py - 服务器性能监控客户端（图形化展示版 - 数据库加密版 - 智能告警版 - 完全可配置版 - 系统托盘版）
-import requests
 import time
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
-from plyer import notification
 import json
-from collections import deque
-import sqlite3
 import os
-from cryptography.fernet import Fernet
-import base64
-import hashlib
-import pystray
-from PIL import Image, ImageDraw
+from array import array
+from collections import deque
+from monitor_core import DatabaseManager, CheckTiming, MonitorEngine, ServerState
+
+# 启动计时报告文件（fleet_sim.py startup 基准测试时设置），记录各启动阶段完成的时间
+STARTUP_REPORT = os.environ.get('MONITOR_STARTUP_REPORT')
+
 
-class DatabaseManager:
-    """数据库管理类"""
-    
-    def __init__(self, db_path='server_monitor.db'):
-        self.db_path = db_path
-        self.key_file = 'monitor.key'
-        self.cipher = self._get_cipher()
-        self.init_database()
-    
-    def _get_cipher(self):
-        """获取加密密钥"""
-        if os.path.exists(self.key_file):
-            with open(self.key_file, 'rb') as f:
-                key = f.read()
+class HistoryBuffer:
+    """定长环形缓冲区，样本保存在 array('f') 中（每个 4 字节）"""
+    __slots__ = ('data', 'start', 'count')
+    
+    def __init__(self, size):
+        self.data = array('f', [0.0]) * size
+        self.start = 0  # 最早样本的位置
+        self.count = 0
+    
+    def append(self, value):
+        size = len(self.data)
+        if self.count < size:
+            self.data[(self.start + self.count) % size] = value
+            self.count += 1
         else:
-            # 生成新密钥
-            key = Fernet.generate_key()
-            with open(self.key_file, 'wb') as f:
-                f.write(key)
-        return Fernet(key)
-    
-    def encrypt(self, text):
-        """加密文本"""
-        if not text:
-            return ""
-        return self.cipher.encrypt(text.encode()).decode()
-    
-    def decrypt(self, encrypted_text):
-        """解密文本"""
-        if not encrypted_text:
-            return ""
-        try:
-            return self.cipher.decrypt(encrypted_text.encode()).decode()
-        except Exception:
-            return ""
-    
-    def init_database(self):
-        """初始化数据库"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # 创建服务器表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS servers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                url TEXT NOT NULL UNIQUE,
-                encrypted_key TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # 创建配置表
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
-    def add_server(self, name, url, key):
-        """添加服务器"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            encrypted_key = self.encrypt(key)
-            cursor.execute('''
-                INSERT INTO servers (name, url, encrypted_key)
-                VALUES (?, ?, ?)
-            ''', (name, url, encrypted_key))
-            conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
-        finally:
-            conn.close()
-    
-    def update_server(self, old_url, name, url, key):
-        """更新服务器"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            encrypted_key = self.encrypt(key)
-            cursor.execute('''
-                UPDATE servers 
-                SET name=?, url=?, encrypted_key=?, updated_at=CURRENT_TIMESTAMP
-                WHERE url=?
-            ''', (name, url, encrypted_key, old_url))
-            conn.commit()
-            return cursor.rowcount > 0
-        finally:
-            conn.close()
-    
-    def delete_server(self, url):
-        """删除服务器"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM servers WHERE url=?', (url,))
-        conn.commit()
-        deleted = cursor.rowcount > 0
-        conn.close()
-        return deleted
-    
-    def get_all_servers(self):
-        """获取所有服务器"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT name, url, encrypted_key FROM servers ORDER BY id')
-        rows = cursor.fetchall()
-        conn.close()
-        
-        servers = []
-        for name, url, encrypted_key in rows:
-            servers.append({
-                'name': name,
-                'url': url,
-                'key': self.decrypt(encrypted_key)
-            })
-        return servers
-    
-    def save_setting(self, key, value):
-        """保存配置"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO settings (key, value, updated_at)
-            VALUES (?, ?, CURRENT_TIMESTAMP)
-        ''', (key, str(value)))
-        conn.commit()
-        conn.close()
-    
-    def get_setting(self, key, default=None):
-        """获取配置"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT value FROM settings WHERE key=?', (key,))
-        row = cursor.fetchone()
-        conn.close()
-        
-        return row[0] if row else default
-    
-    def save_all_settings(self, settings):
-        """批量保存配置"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        for key, value in settings.items():
-            cursor.execute('''
-                INSERT OR REPLACE INTO settings (key, value, updated_at)
-                VALUES (?, ?, CURRENT_TIMESTAMP)
-            ''', (key, str(value)))
-        
-        conn.commit()
-        conn.close()
-    
-    def get_all_settings(self):
-        """获取所有配置"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT key, value FROM settings')
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return {key: value for key, value in rows}
+            self.data[self.start] = value
+            self.start = (self.start + 1) % size
+    
+    def __len__(self):
+        return self.count
+    
+    def __iter__(self):
+        """从最早到最新"""
+        size = len(self.data)
+        for i in range(self.count):
+            yield self.data[(self.start + i) % size]
+    
+    def resized(self, size):
+        """改变容量，保留最近的样本"""
+        buffer = HistoryBuffer(size)
+        for value in list(self)[-size:]:
+            buffer.append(value)
+        return buffer
 
 
-class AlertTracker:
-    """告警追踪器 - 实现智能告警逻辑"""
-    
-    def __init__(self, time_window=600, verify_count=3, enable_smart_alert=True):
-        """
-        初始化告警追踪器
-        :param time_window: 时间窗口（秒），默认600秒（10分钟）
-        :param verify_count: 验证次数，默认3次
-        :param enable_smart_alert: 是否启用智能告警
-        """
-        self.time_window = time_window
-        self.verify_count = verify_count
-        self.enable_smart_alert = enable_smart_alert
-        
-        # 存储每个服务器的异常记录 {server_url: [(timestamp, metric_name, value), ...]}
-        self.alert_history = defaultdict(list)
-        
-        # 存储已发送通知的服务器 {server_url: {metric_name: timestamp}}
-        self.notified_servers = defaultdict(dict)
-    
-    def record_alert(self, server_url, metric_name, value):
-        """
-        记录一次告警
-        :param server_url: 服务器URL
-        :param metric_name: 指标名称 (cpu/memory/load)
-        :param value: 指标值
-        """
-        current_time = datetime.now()
-        
-        # 清理超过时间窗口的旧记录
-        self.alert_history[server_url] = [
-            (ts, name, val) for ts, name, val in self.alert_history[server_url]
-            if (current_time - ts).total_seconds() <= self.time_window
-        ]
-        
-        # 添加新记录
-        self.alert_history[server_url].append((current_time, metric_name, value))
-    
-    def should_verify(self, server_url, metric_name):
-        """
-        检查是否应该进行连续验证
-        :param server_url: 服务器URL
-        :param metric_name: 指标名称
-        :return: True如果在时间窗口内检测到异常
-        """
-        if not self.enable_smart_alert:
-            return True  # 如果禁用智能告警，总是进行验证（即立即通知）
-        
-        current_time = datetime.now()
-        
-        # 统计时间窗口内该指标的异常次数
-        count = sum(
-            1 for ts, name, _ in self.alert_history[server_url]
-            if name == metric_name and (current_time - ts).total_seconds() <= self.time_window
-        )
-        
-        return count > 0
-    
-    def should_notify(self, server_url, metric_name):
-        """
-        检查是否应该发送通知
-        :param server_url: 服务器URL
-        :param metric_name: 指标名称
-        :return: True如果应该发送通知
-        """
-        # 检查是否最近已经通知过（时间窗口内不重复通知相同指标）
-        if metric_name in self.notified_servers[server_url]:
-            last_notify_time = self.notified_servers[server_url][metric_name]
-            if (datetime.now() - last_notify_time).total_seconds() < self.time_window:
-                return False
+class Sparkline:
+    """
+    迷你趋势图（0-100%）：每个新样本只追加一段折线
+    画满后所有线段整体左移一格并删除最早的一段，不重画整张图
+    """
+    WIDTH = 90
+    HEIGHT = 25
+    
+    def __init__(self, parent, length):
+        self.canvas = tk.Canvas(parent, width=self.WIDTH, height=self.HEIGHT,
+                                bg='#fafafa', highlightthickness=0)
+        self.length = length
+        self.segments = deque()  # 线段，从最早到最新
+        self.last_y = None
+        self.count = 0  # 已画的点数
+    
+    def y(self, percent):
+        percent = min(100.0, max(0.0, percent))
+        return self.HEIGHT - 2 - percent / 100 * (self.HEIGHT - 4)
+    
+    def add(self, percent):
+        y = self.y(percent)
+        if self.last_y is None or self.length < 2:
+            self.last_y = y
+            self.count = 1
+            return
         
-        return True
-    
-    def mark_notified(self, server_url, metric_name):
-        """
-        标记已发送通知
-        :param server_url: 服务器URL
-        :param metric_name: 指标名称
-        """
-        self.notified_servers[server_url][metric_name] = datetime.now()
-    
-    def clear_alerts(self, server_url, metric_name):
-        """
-        清除告警记录（当指标恢复正常时调用）
-        :param server_url: 服务器URL
-        :param metric_name: 指标名称
-        """
-        self.alert_history[server_url] = [
-            (ts, name, val) for ts, name, val in self.alert_history[server_url]
-            if name != metric_name
-        ]
-        
-        # 清除通知记录
-        if metric_name in self.notified_servers[server_url]:
-            del self.notified_servers[server_url][metric_name]
+        step = self.WIDTH / (self.length - 1)
+        if self.count >= self.length:
+            self.canvas.delete(self.segments.popleft())
+            self.canvas.move('segment', -step, 0)
+            x = (self.length - 2) * step
+        else:
+            x = (self.count - 1) * step
+            self.count += 1
+        self.segments.append(self.canvas.create_line(x, self.last_y, x + step, y,
+                                                     fill='#2196F3', tags='segment'))
+        self.last_y = y
+    
+    def draw(self, values, length):
+        """清空后按历史样本重画（卡片控件绑定到另一台服务器时）"""
+        self.canvas.delete('segment')
+        self.segments.clear()
+        self.last_y = None
+        self.count = 0
+        self.length = length
+        for value in values:
+            self.add(value)
 
 
 class ServerCard(tk.Frame):
     """服务器监控卡片"""
+    SPARKLINE_METRICS = ('cpu', 'memory', 'load', 'latency')  # 显示趋势图的指标
     
-    def __init__(self, parent, server_info, on_delete_callback, on_refresh_callback):
+    def __init__(self, parent, server_info, on_delete_callback, on_refresh_callback, history_length=60):
         super().__init__(parent, relief='raised', borderwidth=2, bg='#ffffff')
         self.server_info = server_info
         self.on_delete_callback = on_delete_callback
         self.on_refresh_callback = on_refresh_callback
-        self.history_data = {
-            'cpu': deque(maxlen=20),
-            'memory': deque(maxlen=20),
-            'load': deque(maxlen=20)
-        }
+        self.history_length = history_length
+        self.sparklines = {}  # {指标: Sparkline}
+        self.rendered = {}  # 各控件最近一次显示的选项 {控件: {选项: 值}}
+        self.system_key = None  # 最近一次显示的主机信息及其格式化文本
+        self.system_text = ""
         
         # 设置最小尺寸
         self.config(width=400, height=450)
@@ -319,9 +127,10 @@ class ServerCard(tk.Frame):
         header_frame.pack_propagate(False)
         
         # 服务器名称
-        tk.Label(header_frame, text=f"🖥️ {self.server_info['name']}", 
-                bg='#2196F3', fg='white', 
-                font=('Arial', 12, 'bold')).pack(side='left', padx=10, pady=5)
+        self.name_label = tk.Label(header_frame, text=f"🖥️ {self.server_info.name}", 
+                                   bg='#2196F3', fg='white', 
+                                   font=('Arial', 12, 'bold'))
+        self.name_label.pack(side='left', padx=10, pady=5)
         
         # 状态指示器
         self.status_label = tk.Label(header_frame, text="●", 
@@ -352,11 +161,11 @@ class ServerCard(tk.Frame):
         content_frame.pack(fill='both', expand=True)
         
         # URL信息
-        url_label = tk.Label(content_frame, 
-                            text=self.server_info['url'],
-                            bg='#ffffff', fg='#666666',
-                            font=('Arial', 9))
-        url_label.pack(anchor='w', pady=(0, 10))
+        self.url_label = tk.Label(content_frame, 
+                                  text=self.server_info.url,
+                                  bg='#ffffff', fg='#666666',
+                                  font=('Arial', 9))
+        self.url_label.pack(anchor='w', pady=(0, 10))
         
         # CPU使用率
         self.create_metric_display(content_frame, "CPU使用率", 'cpu')
@@ -370,6 +179,12 @@ class ServerCard(tk.Frame):
         # 磁盘使用率
         self.create_metric_display(content_frame, "磁盘使用", 'disk')
         
+        # 资源压力 (PSI)
+        self.create_metric_display(content_frame, "资源压力", 'pressure')
+        
+        # 响应延迟
+        self.create_metric_display(content_frame, "响应延迟", 'latency')
+        
         # 底部信息栏
         self.info_frame = tk.Frame(content_frame, bg='#f5f5f5', height=60)
         self.info_frame.pack(fill='x', pady=(10, 0))
@@ -388,6 +203,13 @@ class ServerCard(tk.Frame):
                                          bg='#ffffff', fg='#999999',
                                          font=('Arial', 8))
         self.update_time_label.pack(pady=(5, 0))
+        
+        # 检查耗时分位数
+        self.timing_label = tk.Label(content_frame,
+                                     text="",
+                                     bg='#ffffff', fg='#999999',
+                                     font=('Arial', 8))
+        self.timing_label.pack()
     
     def create_metric_display(self, parent, label_text, metric_type):
         """创建指标显示组件"""
@@ -407,9 +229,15 @@ class ServerCard(tk.Frame):
                               font=('Arial', 10, 'bold'))
         value_label.pack(side='right')
         
+        # 趋势图（在进度条右侧）
+        if metric_type in self.SPARKLINE_METRICS:
+            sparkline = Sparkline(frame, self.history_length)
+            sparkline.canvas.pack(side='right', padx=(5, 0), pady=(3, 0))
+            self.sparklines[metric_type] = sparkline
+        
         # 进度条容器
         progress_container = tk.Frame(frame, bg='#e0e0e0', height=25)
-        progress_container.pack(fill='x', pady=(3, 0))
+        progress_container.pack(side='left', fill='x', expand=True, pady=(3, 0))
         progress_container.pack_propagate(False)
         
         # 进度条
@@ -428,6 +256,22 @@ class ServerCard(tk.Frame):
         setattr(self, f'{metric_type}_percent_label', percent_label)
         setattr(self, f'{metric_type}_container', progress_container)
     
+    def set_widget(self, widget, **options):
+        """只把与上次显示不同的选项交给 Tk"""
+        rendered = self.rendered.setdefault(widget, {})
+        changed = {key: value for key, value in options.items() if rendered.get(key) != value}
+        if changed:
+            rendered.update(changed)
+            widget.config(**changed)
+    
+    def place_bar(self, progress_bar, relwidth):
+        """设置进度条宽度（精确到 0.1%），宽度未变时不调用 place"""
+        relwidth = round(relwidth, 3)
+        rendered = self.rendered.setdefault(progress_bar, {})
+        if rendered.get('relwidth') != relwidth:
+            rendered['relwidth'] = relwidth
+            progress_bar.place(relwidth=relwidth)
+    
     def update_metric(self, metric_type, value, max_value=100, detail_text=""):
         """更新指标显示"""
         percent = min(100, (value / max_value * 100)) if max_value > 0 else 0
@@ -435,42 +279,38 @@ class ServerCard(tk.Frame):
         # 更新数值标签
         value_label = getattr(self, f'{metric_type}_value_label')
         if metric_type == 'load':
-            value_label.config(text=f"{value:.2f}")
+            self.set_widget(value_label, text=f"{value:.2f}")
+        elif metric_type == 'latency':
+            self.set_widget(value_label, text=f"{value:.0f}ms {detail_text}")
         else:
-            value_label.config(text=f"{value:.1f}% {detail_text}")
+            self.set_widget(value_label, text=f"{value:.1f}% {detail_text}")
         
         # 更新进度条
         progress_bar = getattr(self, f'{metric_type}_progress_bar')
         percent_label = getattr(self, f'{metric_type}_percent_label')
-        container = getattr(self, f'{metric_type}_container')
         
         # 根据百分比改变颜色
         if percent >= 90:
             color = '#f44336'  # 红色 - 严重
-            percent_label.config(bg=color, fg='white')
+            self.set_widget(percent_label, bg=color, fg='white', text=f"{percent:.1f}%")
         elif percent >= 80:
             color = '#FF9800'  # 橙色 - 警告
-            percent_label.config(bg=color, fg='white')
+            self.set_widget(percent_label, bg=color, fg='white', text=f"{percent:.1f}%")
         elif percent >= 70:
             color = '#FFC107'  # 黄色 - 注意
-            percent_label.config(bg='#e0e0e0', fg='#333333')
+            self.set_widget(percent_label, bg='#e0e0e0', fg='#333333', text=f"{percent:.1f}%")
         else:
             color = '#4CAF50'  # 绿色 - 正常
-            percent_label.config(bg='#e0e0e0', fg='#333333')
-        
-        progress_bar.config(bg=color)
-        progress_bar.place(relwidth=percent/100)
-        percent_label.config(text=f"{percent:.1f}%")
+            self.set_widget(percent_label, bg='#e0e0e0', fg='#333333', text=f"{percent:.1f}%")
         
-        # 保存历史数据
-        if metric_type in self.history_data:
-            self.history_data[metric_type].append(value)
+        self.set_widget(progress_bar, bg=color)
+        self.place_bar(progress_bar, percent / 100)
     
     def update_data(self, data):
         """更新服务器数据"""
         try:
             # 更新状态指示器
-            self.status_label.config(fg='#4CAF50')  # 绿色表示在线
+            self.set_widget(self.status_label, fg='#4CAF50')  # 绿色表示在线
             
             # CPU
             cpu_percent = data['cpu']['percent']
@@ -495,32 +335,115 @@ class ServerCard(tk.Frame):
             disk_detail = f"({disk['used_gb']:.1f}G/{disk['total_gb']:.1f}G)"
             self.update_metric('disk', disk_percent, detail_text=disk_detail)
             
-            # 更新底部信息
+            # 资源压力 (旧版Agent或不支持PSI的内核没有该数据)
+            pressure_percent, pressure_resource = ServerMonitor.get_pressure_percent(data)
+            if pressure_resource:
+                self.update_metric('pressure', pressure_percent, detail_text=f"({pressure_resource})")
+            else:
+                self.update_metric('pressure', 0, detail_text="(不支持)")
+            
+            # 更新底部信息（主机信息很少变化，只在变化时重新格式化）
             system = data['system']
-            info_text = (
-                f"主机: {system['hostname']} | "
-                f"系统: {system['platform']} {system['platform_release']} | "
-                f"架构: {system['architecture']}"
-            )
-            self.info_label.config(text=info_text)
+            system_key = (system['hostname'], system['platform'],
+                          system['platform_release'], system['architecture'])
+            if system_key != self.system_key:
+                self.system_key = system_key
+                self.system_text = (
+                    f"主机: {system['hostname']} | "
+                    f"系统: {system['platform']} {system['platform_release']} | "
+                    f"架构: {system['architecture']}"
+                )
+            info_text = self.system_text
+            
+            # 资源占用最高的 systemd 单元（Agent 开启 cgroup 采集时才有）
+            cgroups = data.get('cgroups') or {}
+            units = cgroups.get('units') or []
+            if units:
+                top = units[0]
+                info_text += (
+                    f"\n最忙单元: {top['name']} | CPU: {top['cpu_percent']:.1f}% | "
+                    f"内存: {top['memory_current'] / (1024**2):.0f}M"
+                )
+            self.set_widget(self.info_label, text=info_text)
             
             # 更新时间
             update_time = datetime.now().strftime('%H:%M:%S')
-            self.update_time_label.config(text=f"最后更新: {update_time}")
+            self.set_widget(self.update_time_label, text=f"最后更新: {update_time}")
             
         except Exception as e:
             print(f"更新数据失败: {e}")
     
+    def set_relay_summary(self, summary):
+        """显示中继汇总状态"""
+        self.set_widget(self.status_label, fg='#4CAF50' if summary.get('error', 0) == 0 else '#FF9800')
+        self.set_widget(self.info_label, text=(
+            f"🛰️ 中继: 共{summary.get('total', 0)}台 | 正常{summary.get('ok', 0)} | "
+            f"异常{summary.get('error', 0)} | 过期{summary.get('stale', 0)}"
+        ))
+        update_time = datetime.now().strftime('%H:%M:%S')
+        self.set_widget(self.update_time_label, text=f"最后更新: {update_time}")
+    
     def set_error_status(self, error_msg="连接失败"):
         """设置错误状态"""
-        self.status_label.config(fg='#f44336')  # 红色表示离线
-        self.info_label.config(text=f"❌ {error_msg}")
+        self.set_widget(self.status_label, fg='#f44336')  # 红色表示离线
+        self.set_widget(self.info_label, text=f"❌ {error_msg}")
         
         # 重置所有进度条
-        for metric in ['cpu', 'memory', 'load', 'disk']:
+        for metric in ['cpu', 'memory', 'load', 'disk', 'pressure', 'latency']:
             progress_bar = getattr(self, f'{metric}_progress_bar', None)
             if progress_bar:
-                progress_bar.place(relwidth=0)
+                self.place_bar(progress_bar, 0)
+    
+    def set_circuit_open(self, failures, retry_at):
+        """显示熔断状态和下次重试时间"""
+        self.set_error_status(
+            f"熔断: 连续失败{failures}次，暂停检测\n下次重试: {datetime.fromtimestamp(retry_at).strftime('%H:%M:%S')}"
+        )
+        self.set_widget(self.status_label, fg='#9E9E9E')  # 灰色表示已暂停检测
+    
+    def update_latency(self, latency, p95, threshold):
+        """更新响应延迟，进度条以阈值为 80% 刻度"""
+        self.update_metric('latency', latency, max_value=threshold / 0.8,
+                           detail_text=f"(p95 {p95:.0f}ms)")
+    
+    def set_timing(self, stats):
+        """显示最近检查耗时的分位数和最慢阶段"""
+        summary = stats.summary()
+        slowest = stats.slowest_phase()
+        total = summary['total']
+        self.set_widget(
+            self.timing_label,
+            text=(f"⏱️ 耗时 p50 {total['p50']:.0f}ms p95 {total['p95']:.0f}ms | "
+                  f"最慢: {CheckTiming.PHASE_NAMES[slowest]} {summary[slowest]['p95']:.0f}ms"),
+            fg='#FF9800' if total['p95'] >= 1000 else '#999999'
+        )
+    
+    def bind_server(self, server_info):
+        """复用卡片显示另一台服务器：更换名称和地址并清空原有显示"""
+        self.server_info = server_info
+        self.set_widget(self.name_label, text=f"🖥️ {server_info.name}")
+        self.set_widget(self.url_label, text=server_info.url)
+        self.set_widget(self.status_label, fg='#FFC107')
+        self.set_widget(self.info_label, text="等待数据...")
+        self.set_widget(self.update_time_label, text="")
+        self.set_widget(self.timing_label, text="")
+        
+        for metric in ['cpu', 'memory', 'load', 'disk', 'pressure', 'latency']:
+            self.set_widget(getattr(self, f'{metric}_value_label'), text="0.0%")
+            self.set_widget(getattr(self, f'{metric}_progress_bar'), bg='#4CAF50')
+            self.place_bar(getattr(self, f'{metric}_progress_bar'), 0)
+            self.set_widget(getattr(self, f'{metric}_percent_label'), text="0%", bg='#e0e0e0', fg='#333333')
+        for sparkline in self.sparklines.values():
+            sparkline.draw((), sparkline.length)
+    
+    def add_sample(self, metric_type, percent):
+        """趋势图追加一个样本"""
+        self.sparklines[metric_type].add(percent)
+    
+    def draw_history(self, history):
+        """按历史样本重画所有趋势图 {指标: HistoryBuffer}"""
+        for metric_type, buffer in history.items():
+            self.sparklines[metric_type].draw(buffer, len(buffer.data))
     
     def refresh_card(self):
         """刷新卡片数据"""
@@ -533,55 +456,329 @@ class ServerCard(tk.Frame):
             self.on_delete_callback(self.server_info)
 
 
-class ServerMonitor:
+class CardState:
+    """
+    服务器卡片的显示状态：记录每类更新最近一次的参数
+    卡片控件只为可见区域内的服务器创建并复用，滚动到可见区域时把记录的状态重放到控件上
+    """
+    STATUS_CALLS = ('set_error_status', 'set_circuit_open')
+    
+    def __init__(self, server_info, on_change=None, history_length=60):
+        """
+        :param on_change: 状态变化时以 url 调用（可能来自检查线程），供集群总览重画色块
+        :param history_length: 趋势图保留的样本数
+        """
+        self.server_info = server_info
+        self.on_change = on_change
+        self.card = None  # 当前绑定的 ServerCard 控件
+        self.calls = {}  # {方法名: 参数}，按最近调用的顺序排列
+        # 趋势图样本（与进度条相同的百分比），控件复用时据此重画
+        self.history = {metric: HistoryBuffer(history_length) for metric in ServerCard.SPARKLINE_METRICS}
+    
+    def _record(self, name, *args):
+        if name in ('update_data', 'set_relay_summary') or name in self.STATUS_CALLS:
+            # 新数据或新错误覆盖之前的错误状态
+            for status in self.STATUS_CALLS:
+                self.calls.pop(status, None)
+        self.calls.pop(name, None)
+        self.calls[name] = args
+        
+        card = self.card
+        if card is not None:
+            getattr(card, name)(*args)
+        if self.on_change is not None:
+            self.on_change(self.server_info.url)
+    
+    def _add_sample(self, metric, percent):
+        self.history[metric].append(percent)
+        card = self.card
+        if card is not None:
+            card.add_sample(metric, percent)
+    
+    def update_data(self, data):
+        self._record('update_data', data)
+        # 引擎已把最新指标记录到 ServerState.metrics
+        for metric, name in (('cpu', 'CPU'), ('memory', '内存'), ('load', '负载')):
+            value = self.server_info.metric(name)
+            if value is not None:
+                self._add_sample(metric, value)
+    
+    def set_relay_summary(self, summary):
+        self._record('set_relay_summary', summary)
+    
+    def set_error_status(self, error_msg="连接失败"):
+        self._record('set_error_status', error_msg)
+    
+    def set_circuit_open(self, failures, retry_at):
+        self._record('set_circuit_open', failures, retry_at)
+    
+    def update_latency(self, latency, p95, threshold):
+        self._record('update_latency', latency, p95, threshold)
+        self._add_sample('latency', latency / threshold * 80 if threshold > 0 else 0)
+    
+    def set_timing(self, stats):
+        self._record('set_timing', stats)
+    
+    def attach(self, card):
+        """绑定卡片控件并重放当前状态"""
+        self.card = card
+        card.bind_server(self.server_info)
+        for name, args in list(self.calls.items()):
+            getattr(card, name)(*args)
+        card.draw_history(self.history)
+    
+    def detach(self):
+        self.card = None
+    
+    def clear(self):
+        """服务器地址或密钥修改后丢弃原服务器的显示状态和趋势图样本（绑定的控件需重新 attach）"""
+        self.calls = {}
+        self.history = {metric: HistoryBuffer(len(buffer.data)) for metric, buffer in self.history.items()}
+    
+    def resize_history(self, history_length):
+        """修改趋势图样本数，保留最近的样本"""
+        self.history = {metric: buffer.resized(history_length) for metric, buffer in self.history.items()}
+        card = self.card
+        if card is not None:
+            card.draw_history(self.history)
+
+
+class FleetHeatmap(tk.Frame):
+    """
+    集群总览：每台服务器是同一个 Canvas 上的一个色块，按所选指标相对阈值的比例着色
+    只重画颜色变化的色块，悬停显示详情，点击跳转到完整卡片
+    """
+    CELL = 14  # 色块边长（像素）
+    GAP = 2  # 色块间距
+    PAD = 10
+    REFRESH_INTERVAL = 1000  # 刷新间隔（毫秒）
+    WORST = '最差指标'
+    METRICS = ('CPU', '内存', '负载', '磁盘', '压力', '延迟')  # 可选的着色指标，名称同时用于查询阈值
+    HEALTH_COLORS = {'pending': '#e0e0e0', 'error': '#424242', 'paused': '#9E9E9E'}
+    HEALTH_NAMES = {'pending': '等待数据', 'ok': '在线', 'error': '异常', 'paused': '已熔断'}
+    HINT = "将鼠标移到色块上查看详情，点击跳转到服务器卡片"
+    
+    def __init__(self, parent, monitor):
+        super().__init__(parent, bg='#f5f5f5')
+        self.monitor = monitor
+        self.items = {}  # {url: 色块}
+        self.item_urls = {}  # {色块: url}
+        self.colors = {}  # 色块当前颜色 {url: 颜色}
+        self.dirty = set()  # 状态变化、待重画的服务器
+        self.layout_dirty = True
+        self.columns = 0
+        self.hover_url = None
+        
+        self.setup_ui()
+        self.after(self.REFRESH_INTERVAL, self.refresh_loop)
+    
+    def setup_ui(self):
+        """设置UI"""
+        toolbar = tk.Frame(self, bg='#f5f5f5')
+        toolbar.pack(fill='x', padx=10, pady=(10, 0))
+        
+        tk.Label(toolbar, text="着色指标:", bg='#f5f5f5',
+                font=('Arial', 10)).pack(side='left')
+        self.metric_var = tk.StringVar(value=self.WORST)
+        metric_combo = ttk.Combobox(toolbar, textvariable=self.metric_var, state='readonly', width=10,
+                                    values=(self.WORST,) + self.METRICS)
+        metric_combo.pack(side='left', padx=5)
+        metric_combo.bind('<<ComboboxSelected>>', lambda e: self.repaint_all())
+        
+        # 图例
+        for text, color in [("正常", '#4CAF50'), ("≥70%阈值", '#FFC107'), ("≥90%阈值", '#FF9800'),
+                            ("超阈值", '#f44336'), ("异常", '#424242'), ("熔断", '#9E9E9E'),
+                            ("等待数据", '#e0e0e0')]:
+            tk.Label(toolbar, text="■", bg='#f5f5f5', fg=color,
+                    font=('Arial', 12)).pack(side='left', padx=(10, 0))
+            tk.Label(toolbar, text=text, bg='#f5f5f5', fg='#666666',
+                    font=('Arial', 9)).pack(side='left')
+        
+        self.info_label = tk.Label(self, text=self.HINT, bg='#f5f5f5', fg='#666666',
+                                   font=('Arial', 9), anchor='w')
+        self.info_label.pack(fill='x', padx=10, pady=5)
+        
+        self.canvas = tk.Canvas(self, bg='#ffffff', highlightthickness=0)
+        scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y', pady=(0, 10))
+        self.canvas.pack(side='left', fill='both', expand=True, padx=(10, 0), pady=(0, 10))
+        
+        self.canvas.bind('<Configure>', self.on_resize)
+        self.canvas.tag_bind('cell', '<Motion>', self.on_hover)
+        self.canvas.tag_bind('cell', '<Leave>', self.on_hover)
+        self.canvas.tag_bind('cell', '<Button-1>', self.on_click)
+        # 切换到本标签页时按当前阈值重画
+        self.bind('<Map>', lambda e: self.repaint_all())
+    
+    def mark_dirty(self, url):
+        """卡片状态变化（CardState.on_change）"""
+        self.dirty.add(url)
+    
+    def invalidate(self):
+        """服务器列表变化后重新排列色块"""
+        self.layout_dirty = True
+    
+    def repaint_all(self):
+        """指标或阈值变化后重新计算所有色块的颜色"""
+        self.dirty.update(self.items)
+        self.refresh()
+    
+    def refresh_loop(self):
+        """定时刷新，标签页不可见时只累积变化"""
+        if self.winfo_ismapped():
+            self.refresh()
+        self.after(self.REFRESH_INTERVAL, self.refresh_loop)
+    
+    def refresh(self):
+        if self.layout_dirty:
+            self.layout()
+        while self.dirty:
+            self.paint(self.dirty.pop())
+    
+    def on_resize(self, event):
+        step = self.CELL + self.GAP
+        if max(1, (event.width - 2 * self.PAD) // step) != self.columns:
+            self.invalidate()
+            self.refresh()
+    
+    def layout(self):
+        """按服务器顺序重新创建所有色块"""
+        self.layout_dirty = False
+        self.dirty.clear()
+        canvas = self.canvas
+        canvas.delete('cell')
+        self.items.clear()
+        self.item_urls.clear()
+        self.colors.clear()
+        
+        step = self.CELL + self.GAP
+        self.columns = max(1, (canvas.winfo_width() - 2 * self.PAD) // step)
+        cards = self.monitor.server_cards
+        order = self.monitor.card_order
+        for index, url in enumerate(order):
+            x = self.PAD + (index % self.columns) * step
+            y = self.PAD + (index // self.columns) * step
+            color = self.cell_color(cards[url].server_info)
+            item = canvas.create_rectangle(x, y, x + self.CELL, y + self.CELL,
+                                           fill=color, width=0, tags='cell')
+            self.items[url] = item
+            self.item_urls[item] = url
+            self.colors[url] = color
+        
+        rows = -(-len(order) // self.columns)
+        canvas.configure(scrollregion=(0, 0, 2 * self.PAD + self.columns * step, 2 * self.PAD + rows * step))
+    
+    def paint(self, url):
+        """颜色变化时才更新色块"""
+        item = self.items.get(url)
+        state = self.monitor.server_cards.get(url)
+        if item is None or state is None:
+            return
+        color = self.cell_color(state.server_info)
+        if self.colors.get(url) != color:
+            self.colors[url] = color
+            self.canvas.itemconfigure(item, fill=color)
+    
+    def metric_ratio(self, server):
+        """所选指标（或最差指标）与阈值的比例，没有数据时返回 None"""
+        selected = self.metric_var.get()
+        ratios = []
+        for name in (self.METRICS if selected == self.WORST else (selected,)):
+            value = server.metric(name)
+            if value is not None:
+                ratios.append(value / self.monitor.get_metric_threshold(name))
+        return max(ratios, default=None)
+    
+    def cell_color(self, server):
+        """server: ServerState"""
+        color = self.HEALTH_COLORS.get(server.health)
+        if color:
+            return color
+        ratio = self.metric_ratio(server)
+        if ratio is None or ratio < 0.7:
+            return '#4CAF50'
+        elif ratio < 0.9:
+            return '#FFC107'
+        elif ratio < 1:
+            return '#FF9800'
+        return '#f44336'
+    
+    def describe(self, url):
+        """悬停提示：名称、状态和各项指标"""
+        state = self.monitor.server_cards.get(url)
+        if state is None:
+            return self.HINT
+        server = state.server_info
+        parts = [f"🖥️ {server.name} ({url})", self.HEALTH_NAMES.get(server.health, server.health)]
+        for name in self.METRICS:
+            value = server.metric(name)
+            if value is not None:
+                parts.append(f"{name} {value:.1f}{self.monitor.METRIC_UNITS.get(name, '%')}")
+        return " | ".join(parts)
+    
+    def on_hover(self, event):
+        current = self.canvas.find_withtag('current') if str(event.type) == 'Motion' else ()
+        url = self.item_urls.get(current[0]) if current else None
+        if url != self.hover_url:
+            self.hover_url = url
+            self.info_label.config(text=self.describe(url) if url else self.HINT)
+    
+    def on_click(self, event):
+        current = self.canvas.find_withtag('current')
+        url = self.item_urls.get(current[0]) if current else None
+        if url:
+            self.monitor.show_card(url)
+
+
+class ServerMonitor(MonitorEngine):
+    """服务器监控图形界面"""
+    CARDS_PER_ROW = 3  # 每行显示的卡片数
+    CARD_PAD = 10  # 卡片间距
+    CARD_OVERSCAN = 1  # 可见区域上下额外保留的卡片行数
+    TRAY_DELAY = 500  # 窗口显示多久后创建托盘图标（毫秒）
+    
     def __init__(self):
         self.window = tk.Tk()
         self.window.title("服务器性能监控系统")
         self.window.geometry("1400x900")
         self.window.configure(bg='#f5f5f5')
         
-        # 初始化数据库管理器
-        self.db = DatabaseManager()
+        # 初始化数据库管理器和轮询引擎
+        super().__init__(DatabaseManager())
         
         # 系统托盘相关
         self.tray_icon = None
         self.is_hidden = False
         
-        # 监控参数
-        self.cpu_threshold = 80.0
-        self.load_threshold = 80.0
-        self.memory_threshold = 85.0
-        self.check_interval = 15
-        self.verify_count = 3  # 智能告警验证次数
-        self.verify_interval = 1  # 验证检测间隔（秒）
-        self.enable_smart_alert = True  # 是否启用智能告警
-        self.alert_time_window = 600  # 告警时间窗口（秒）
-        
-        # 初始化告警追踪器
-        self.alert_tracker = AlertTracker(
-            time_window=self.alert_time_window,
-            verify_count=self.verify_count,
-            enable_smart_alert=self.enable_smart_alert
-        )
-        
-        self.monitoring = False
-        self.monitor_thread = None
-        
-        # 数据存储
-        self.servers = []
-        self.server_cards = {}
-        self.card_row_frames = []  # 存储卡片行容器
+        # 卡片网格：server_cards 保存每台服务器的 CardState，控件只为可见区域创建并复用
+        self.server_cards = {}  # {url: CardState}，同时记录在 ServerState.card 上
+        self.card_order = []  # 卡片显示顺序 [url]
+        self.visible_cards = {}  # 已绑定控件的卡片 {url: ServerCard}
+        self.card_pool = []  # 空闲的卡片控件
+        self.card_cell = None  # 单元格尺寸 (宽, 高)，由第一个卡片控件测得
+        self.layout_job = None
+        self.startup_marks = {}  # 启动阶段完成时间 {阶段: 时间戳}
         
         self.setup_ui()
+        self.window.bind('<Map>', lambda event: self.mark_startup('window'), add='+')
         
-        # 加载保存的配置
+        # 加载保存的配置（卡片在窗口显示后分批创建）
         self.load_config()
         
-        # 创建系统托盘图标
-        self.create_tray_icon()
+        # 托盘图标需要导入 pystray/PIL，窗口显示后再创建
+        self.window.after(self.TRAY_DELAY, self.create_tray_icon)
     
     def create_tray_icon(self):
-        """创建系统托盘图标"""
+        """创建系统托盘图标并在后台线程中运行"""
+        try:
+            import pystray
+            from PIL import Image, ImageDraw
+        except Exception as e:
+            self.log(f"⚠️ 系统托盘不可用: {str(e)}", 'warning')
+            self.mark_startup('tray')
+            return
+        
         # 创建一个简单的图标
         def create_image():
             # 创建一个64x64的图标
@@ -615,6 +812,8 @@ class ServerMonitor:
             "服务器监控系统",
             menu
         )
+        threading.Thread(target=self.tray_icon.run, daemon=True).start()
+        self.mark_startup('tray')
     
     def show_window(self, icon=None, item=None):
         """显示主窗口"""
@@ -774,18 +973,7 @@ class ServerMonitor:
     def save_config(self):
         """保存配置到数据库"""
         try:
-            settings = {
-                'cpu_threshold': self.cpu_threshold,
-                'memory_threshold': self.memory_threshold,
-                'load_threshold': self.load_threshold,
-                'check_interval': self.check_interval,
-                'verify_count': self.verify_count,
-                'verify_interval': self.verify_interval,
-                'enable_smart_alert': self.enable_smart_alert,
-                'alert_time_window': self.alert_time_window
-            }
-            
-            self.db.save_all_settings(settings)
+            self.db.save_all_settings(self.get_settings())
             self.log(f"💾 配置已保存到数据库", 'success')
             return True
         except Exception as e:
@@ -799,34 +987,31 @@ class ServerMonitor:
             settings = self.db.get_all_settings()
             
             if settings:
-                self.cpu_threshold = float(settings.get('cpu_threshold', 80.0))
-                self.memory_threshold = float(settings.get('memory_threshold', 85.0))
-                self.load_threshold = float(settings.get('load_threshold', 80.0))
-                self.check_interval = int(settings.get('check_interval', 15))
-                self.verify_count = int(settings.get('verify_count', 3))
-                self.verify_interval = int(settings.get('verify_interval', 1))
-                self.enable_smart_alert = settings.get('enable_smart_alert', 'True') == 'True'
-                self.alert_time_window = int(settings.get('alert_time_window', 600))
+                self.apply_settings(settings)
                 
                 # 更新UI
                 self.cpu_threshold_var.set(str(self.cpu_threshold))
                 self.memory_threshold_var.set(str(self.memory_threshold))
                 self.load_threshold_var.set(str(self.load_threshold))
+                self.swap_threshold_var.set(str(self.swap_threshold))
+                self.pressure_threshold_var.set(str(self.pressure_threshold))
+                self.latency_threshold_var.set(str(self.latency_threshold))
                 self.check_interval_var.set(str(self.check_interval))
                 self.verify_count_var.set(str(self.verify_count))
                 self.verify_interval_var.set(str(self.verify_interval))
                 self.smart_alert_var.set(self.enable_smart_alert)
                 self.alert_window_var.set(str(self.alert_time_window))
+                self.history_length_var.set(str(self.history_length))
             
-            # 加载服务器列表
-            self.servers = self.db.get_all_servers()
+            # 加载服务器列表（密钥在第一次检查时才解密）
+            self.servers = self.db.get_all_servers(decrypt=False)
             
             # 创建服务器卡片和树视图项
             for server_info in self.servers:
                 self.create_server_card(server_info)
                 self.server_tree.insert('', 'end', 
-                                      values=(server_info['name'], 
-                                             server_info['url']))
+                                      values=(server_info.name, 
+                                             server_info.url))
             
             self.update_server_count()
             if self.servers:
@@ -852,6 +1037,10 @@ class ServerMonitor:
         # 创建滚动区域
         self.setup_monitor_tab()
         
+        # 集群总览标签页
+        self.heatmap = FleetHeatmap(self.notebook, self)
+        self.notebook.add(self.heatmap, text='🗺️ 集群总览')
+        
         # 服务器管理标签页
         self.manage_tab = tk.Frame(self.notebook, bg='#ffffff')
         self.notebook.add(self.manage_tab, text='⚙️ 服务器管理')
@@ -914,19 +1103,14 @@ class ServerMonitor:
     
     def setup_monitor_tab(self):
         """设置监控标签页"""
-        # 创建Canvas和Scrollbar
-        canvas = tk.Canvas(self.monitor_tab, bg='#f5f5f5')
-        scrollbar = ttk.Scrollbar(self.monitor_tab, orient="vertical", command=canvas.yview)
-        self.scrollable_frame = tk.Frame(canvas, bg='#f5f5f5')
-        
-        # 绑定滚动事件
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
+        # 创建Canvas和Scrollbar，卡片控件按位置放在 Canvas 上
+        canvas = tk.Canvas(self.monitor_tab, bg='#f5f5f5', highlightthickness=0)
+        scrollbar = ttk.Scrollbar(self.monitor_tab, orient="vertical", command=self.on_cards_scroll)
         canvas.configure(yscrollcommand=scrollbar.set)
+        self.card_canvas = canvas
+        
+        # 窗口大小变化时重新计算可见区域
+        canvas.bind("<Configure>", lambda e: self.schedule_layout())
         
         # 布局
         canvas.pack(side="left", fill="both", expand=True)
@@ -935,15 +1119,16 @@ class ServerMonitor:
         # 鼠标滚轮绑定
         def _on_mousewheel(event):
             canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+            self.schedule_layout()
         
         canvas.bind_all("<MouseWheel>", _on_mousewheel)
         
         # 空状态提示
-        self.empty_label = tk.Label(self.scrollable_frame,
+        self.empty_label = tk.Label(canvas,
                                     text="📭 暂无服务器\n\n请在「服务器管理」标签页中添加服务器",
                                     bg='#f5f5f5', fg='#999999',
                                     font=('Arial', 14))
-        self.empty_label.pack(pady=100)
+        self.empty_label.place(relx=0.5, y=100, anchor='n')
     
     def setup_manage_tab(self):
         """设置管理标签页"""
@@ -975,6 +1160,12 @@ class ServerMonitor:
         tk.Entry(row1, textvariable=self.load_threshold_var,
                 width=10, font=('Arial', 10)).pack(side='left', padx=5)
         
+        tk.Label(row1, text="交换阈值(页/秒):", bg='#ffffff',
+                font=('Arial', 10)).pack(side='left', padx=5)
+        self.swap_threshold_var = tk.StringVar(value="500")
+        tk.Entry(row1, textvariable=self.swap_threshold_var,
+                width=10, font=('Arial', 10)).pack(side='left', padx=5)
+        
         # 第二行 - 检测配置
         row2 = tk.Frame(config_frame, bg='#ffffff')
         row2.pack(fill='x', pady=5)
@@ -985,6 +1176,27 @@ class ServerMonitor:
         tk.Entry(row2, textvariable=self.check_interval_var,
                 width=10, font=('Arial', 10)).pack(side='left', padx=5)
         
+        tk.Label(row2, text="压力阈值(%):", bg='#ffffff',
+                font=('Arial', 10)).pack(side='left', padx=5)
+        self.pressure_threshold_var = tk.StringVar(value="20")
+        tk.Entry(row2, textvariable=self.pressure_threshold_var,
+                width=10, font=('Arial', 10)).pack(side='left', padx=5)
+        
+        tk.Label(row2, text="(PSI 10秒平均停顿比例)", bg='#ffffff', fg='#666666',
+                font=('Arial', 9)).pack(side='left', padx=5)
+        
+        tk.Label(row2, text="延迟阈值(毫秒):", bg='#ffffff',
+                font=('Arial', 10)).pack(side='left', padx=5)
+        self.latency_threshold_var = tk.StringVar(value="2000")
+        tk.Entry(row2, textvariable=self.latency_threshold_var,
+                width=10, font=('Arial', 10)).pack(side='left', padx=5)
+        
+        tk.Label(row2, text="趋势点数:", bg='#ffffff',
+                font=('Arial', 10)).pack(side='left', padx=5)
+        self.history_length_var = tk.StringVar(value="60")
+        tk.Entry(row2, textvariable=self.history_length_var,
+                width=10, font=('Arial', 10)).pack(side='left', padx=5)
+        
         # 第三行 - 智能告警配置
         row3 = tk.Frame(config_frame, bg='#ffffff')
         row3.pack(fill='x', pady=5)
@@ -1214,6 +1426,12 @@ class ServerMonitor:
                  font=('Arial', 10, 'bold'),
                  relief='flat', cursor='hand2').pack(side='left', padx=5)
         
+        tk.Button(toolbar, text="⏱️ 导出检查耗时",
+                 command=self.export_timings,
+                 bg='#607D8B', fg='white',
+                 font=('Arial', 10, 'bold'),
+                 relief='flat', cursor='hand2').pack(side='left', padx=5)
+        
         # 日志文本区域
         self.log_text = scrolledtext.ScrolledText(self.log_tab,
                                                   font=('Courier', 9),
@@ -1254,6 +1472,13 @@ class ServerMonitor:
                                                  font=('Arial', 10))
         self.smart_alert_status_label.pack(side='left', padx=15)
         
+        # 最慢服务器的检查耗时
+        self.timing_status_label = tk.Label(status_frame,
+                                            text="⏱️ 检查耗时: -",
+                                            bg='#E0E0E0', fg='#666666',
+                                            font=('Arial', 10))
+        self.timing_status_label.pack(side='left', padx=15)
+        
         # 数据库加密状态
         tk.Label(status_frame, text="🔒 数据库加密保护",
                 bg='#E0E0E0', fg='#4CAF50',
@@ -1291,11 +1516,15 @@ class ServerMonitor:
             self.cpu_threshold = float(self.cpu_threshold_var.get())
             self.memory_threshold = float(self.memory_threshold_var.get())
             self.load_threshold = float(self.load_threshold_var.get())
+            self.swap_threshold = float(self.swap_threshold_var.get())
+            self.pressure_threshold = float(self.pressure_threshold_var.get())
+            self.latency_threshold = float(self.latency_threshold_var.get())
             self.check_interval = int(self.check_interval_var.get())
             self.verify_count = int(self.verify_count_var.get())
             self.verify_interval = int(self.verify_interval_var.get())
             self.enable_smart_alert = self.smart_alert_var.get()
             self.alert_time_window = int(self.alert_window_var.get())
+            history_length = int(self.history_length_var.get())
             
             if self.check_interval < 5:
                 messagebox.showwarning("警告", "检测间隔不能小于5秒！")
@@ -1313,6 +1542,20 @@ class ServerMonitor:
                 messagebox.showwarning("警告", "告警时间窗口不能小于60秒！")
                 return
             
+            if not 0 < self.latency_threshold < self.REQUEST_TIMEOUT * 1000:
+                messagebox.showwarning("警告", f"延迟阈值需在0到{self.REQUEST_TIMEOUT * 1000}毫秒(请求超时)之间！")
+                return
+            
+            if not 2 <= history_length <= 1000:
+                messagebox.showwarning("警告", "趋势点数需在2到1000之间！")
+                return
+            
+            # 修改趋势点数后调整已有的历史数据
+            if history_length != self.history_length:
+                self.history_length = history_length
+                for state in self.server_cards.values():
+                    state.resize_history(history_length)
+            
             # 更新告警追踪器
             self.alert_tracker.verify_count = self.verify_count
             self.alert_tracker.enable_smart_alert = self.enable_smart_alert
@@ -1346,20 +1589,17 @@ class ServerMonitor:
         
         # 检查是否已存在
         for server in self.servers:
-            if server['url'] == url:
+            if server.url == url:
                 messagebox.showwarning("警告", "该服务器已存在！")
                 return
         
         # 保存到数据库
-        if not self.db.add_server(name, url, key):
+        server_id = self.db.add_server(name, url, key)
+        if not server_id:
             messagebox.showerror("错误", "添加服务器失败！可能已存在相同地址的服务器。")
             return
         
-        server_info = {
-            'name': name,
-            'url': url,
-            'key': key
-        }
+        server_info = ServerState(name, url, key=key, server_id=server_id)
         
         self.servers.append(server_info)
         self.server_tree.insert('', 'end', values=(name, url))
@@ -1389,7 +1629,7 @@ class ServerMonitor:
         # 查找服务器信息
         server_info = None
         for s in self.servers:
-            if s['url'] == url:
+            if s.url == url:
                 server_info = s
                 break
         
@@ -1398,7 +1638,7 @@ class ServerMonitor:
         
         # 创建编辑对话框
         edit_window = tk.Toplevel(self.window)
-        edit_window.title(f"修改服务器配置 - {server_info['name']}")
+        edit_window.title(f"修改服务器配置 - {server_info.name}")
         edit_window.geometry("500x300")
         edit_window.transient(self.window)
         edit_window.grab_set()
@@ -1418,7 +1658,7 @@ class ServerMonitor:
         name_frame.pack(fill='x', pady=10)
         tk.Label(name_frame, text="服务器名称:", bg='#ffffff',
                 font=('Arial', 10), width=12, anchor='w').pack(side='left')
-        name_var = tk.StringVar(value=server_info['name'])
+        name_var = tk.StringVar(value=server_info.name)
         name_entry = tk.Entry(name_frame, textvariable=name_var,
                              font=('Arial', 10))
         name_entry.pack(side='left', fill='x', expand=True, padx=5)
@@ -1428,7 +1668,7 @@ class ServerMonitor:
         url_frame.pack(fill='x', pady=10)
         tk.Label(url_frame, text="服务器地址:", bg='#ffffff',
                 font=('Arial', 10), width=12, anchor='w').pack(side='left')
-        url_var = tk.StringVar(value=server_info['url'])
+        url_var = tk.StringVar(value=server_info.url)
         url_entry = tk.Entry(url_frame, textvariable=url_var,
                             font=('Arial', 10))
         url_entry.pack(side='left', fill='x', expand=True, padx=5)
@@ -1438,7 +1678,7 @@ class ServerMonitor:
         key_frame.pack(fill='x', pady=10)
         tk.Label(key_frame, text="访问密钥:", bg='#ffffff',
                 font=('Arial', 10), width=12, anchor='w').pack(side='left')
-        key_var = tk.StringVar(value=server_info['key'])
+        key_var = tk.StringVar(value=self.get_server_key(server_info))
         key_entry = tk.Entry(key_frame, textvariable=key_var,
                             font=('Arial', 10), show='*')
         key_entry.pack(side='left', fill='x', expand=True, padx=5)
@@ -1467,37 +1707,30 @@ class ServerMonitor:
                 new_url = 'http://' + new_url
             
             # 检查URL是否与其他服务器冲突
-            if new_url != server_info['url']:
+            if new_url != server_info.url:
                 for s in self.servers:
-                    if s['url'] == new_url:
+                    if s.url == new_url:
                         messagebox.showwarning("警告", "该服务器地址已被使用！", parent=edit_window)
                         return
             
             # 更新数据库
-            if self.db.update_server(server_info['url'], new_name, new_url, new_key):
+            if self.db.update_server(server_info.url, new_name, new_url, new_key):
                 # 更新内存中的数据
-                old_url = server_info['url']
-                server_info['name'] = new_name
-                server_info['url'] = new_url
-                server_info['key'] = new_key
+                old_url = server_info.url
+                reset = new_url != old_url or new_key != self.get_server_key(server_info)
+                if reset:
+                    # 地址或密钥变了，原来的指标、熔断和统计不再适用
+                    server_info.reset()
+                    self.forget_server(server_info)
+                server_info.name = new_name
+                server_info.url = new_url
+                server_info.key = new_key
                 
                 # 更新树视图
                 self.server_tree.item(item, values=(new_name, new_url))
                 
-                # 如果URL改变，需要更新卡片
-                if old_url != new_url:
-                    # 删除旧卡片
-                    if old_url in self.server_cards:
-                        self.server_cards[old_url].destroy()
-                        del self.server_cards[old_url]
-                    
-                    # 重建所有卡片以保持布局
-                    self.rebuild_all_cards()
-                else:
-                    # 只更新卡片信息
-                    if new_url in self.server_cards:
-                        # 更新卡片的服务器信息
-                        self.server_cards[new_url].server_info = server_info
+                # 更新卡片（位置不变）
+                self.update_card(old_url, server_info, reset)
                 
                 self.log(f"✏️ 已更新服务器配置: {new_name}", 'success')
                 messagebox.showinfo("成功", "服务器配置已更新！", parent=edit_window)
@@ -1519,83 +1752,192 @@ class ServerMonitor:
                  relief='flat', cursor='hand2',
                  width=10).pack(side='left', padx=5)
     
-    def rebuild_all_cards(self):
-        """重建所有服务器卡片"""
-        # 清除所有旧卡片
-        for card in self.server_cards.values():
-            card.destroy()
-        self.server_cards.clear()
-        
-        # 清除所有行容器
-        for row_frame in self.card_row_frames:
-            row_frame.destroy()
-        self.card_row_frames.clear()
-        
-        # 隐藏空状态提示
-        if self.servers:
-            self.empty_label.pack_forget()
-        else:
-            self.empty_label.pack(pady=100)
+    def create_server_card(self, server_info):
+        """添加服务器卡片（只记录状态，控件在滚动到可见区域时才绑定）"""
+        url = server_info.url
+        if url in self.server_cards:
+            self.server_cards[url].server_info = server_info
+            server_info.card = self.server_cards[url]
             return
+        self.server_cards[url] = server_info.card = CardState(server_info, on_change=self.heatmap.mark_dirty,
+                                                              history_length=self.history_length)
+        self.card_order.append(url)
+        self.heatmap.invalidate()
+        self.schedule_layout()
+    
+    def update_card(self, old_url, server_info, reset=False):
+        """
+        服务器名称或地址修改后更新卡片，保留显示位置
+        :param reset: 地址或密钥已修改，清空卡片上原服务器的数据，中继服务器的下游主机卡片一并移除（下次检查时重新创建）
+        """
+        if reset:
+            self.remove_cards(self.get_relay_host_urls(old_url))
         
-        # 重新创建所有卡片
-        for server_info in self.servers:
+        state = self.server_cards.pop(old_url, None)
+        if state is None:
             self.create_server_card(server_info)
-    
-    def create_server_card(self, server_info):
-        """创建服务器卡片"""
-        # 隐藏空状态提示
-        self.empty_label.pack_forget()
-        
-        # 每行显示3个卡片
-        cards_per_row = 3
-        current_row_index = len(self.server_cards) // cards_per_row
-        
-        # 检查是否需要创建新行
-        if len(self.server_cards) % cards_per_row == 0:
-            row_frame = tk.Frame(self.scrollable_frame, bg='#f5f5f5')
-            row_frame.pack(fill='x', padx=10, pady=10)
-            self.card_row_frames.append(row_frame)
-        else:
-            row_frame = self.card_row_frames[-1]
+            return
         
-        # 创建卡片
-        card = ServerCard(row_frame, server_info, 
+        new_url = server_info.url
+        state.server_info = server_info
+        if reset:
+            state.clear()
+        self.server_cards[new_url] = state
+        self.card_order[self.card_order.index(old_url)] = new_url
+        self.heatmap.invalidate()
+        
+        card = self.visible_cards.pop(old_url, None)
+        if card is not None:
+            self.visible_cards[new_url] = card
+            state.attach(card)
+    
+    def get_relay_host_urls(self, relay_url):
+        """中继服务器的全部下游主机（虚拟url）"""
+        return {sub_url for sub_url, info in self.relay_hosts.items() if info.relay_url == relay_url}
+    
+    def remove_card(self, url):
+        """移除服务器卡片，中继服务器连同其下游主机的卡片一起移除"""
+        self.remove_cards({url} | self.get_relay_host_urls(url))
+    
+    def remove_cards(self, urls):
+        """移除一组卡片，其中的中继下游主机同时丢弃其状态记录"""
+        if not urls:
+            return
+        for card_url in urls:
+            state = self.server_cards.pop(card_url, None)
+            if state:
+                state.detach()
+                state.server_info.card = None
+            sub_info = self.relay_hosts.pop(card_url, None)
+            if sub_info is not None:
+                self.forget_server(sub_info)
+        self.card_order = [u for u in self.card_order if u not in urls]
+        self.heatmap.invalidate()
+        self.schedule_layout()
+    
+    def show_card(self, url):
+        """切换到监控标签页并滚动到该服务器的卡片"""
+        if url not in self.card_order:
+            return
+        self.notebook.select(self.monitor_tab)
+        cell_width, cell_height = self.get_card_cell()
+        rows = -(-len(self.card_order) // self.CARDS_PER_ROW)
+        row = self.card_order.index(url) // self.CARDS_PER_ROW
+        self.card_canvas.yview_moveto(row * cell_height / (rows * cell_height + self.CARD_PAD))
+        self.schedule_layout()
+    
+    def on_cards_scroll(self, *args):
+        """滚动条拖动"""
+        self.card_canvas.yview(*args)
+        self.schedule_layout()
+    
+    def schedule_layout(self):
+        """合并多次变化，在空闲时重新布局一次"""
+        if self.layout_job is None:
+            self.layout_job = self.window.after_idle(self.layout_cards)
+    
+    def new_card_widget(self, server_info):
+        """创建一个放在 Canvas 上的卡片控件（初始隐藏）"""
+        card = ServerCard(self.card_canvas, server_info,
                          on_delete_callback=self.delete_server_from_card,
-                         on_refresh_callback=self.refresh_single_server)
-        card.pack(side='left', padx=10, pady=10)
-        
-        self.server_cards[server_info['url']] = card
+                         on_refresh_callback=self.refresh_single_server,
+                         history_length=self.history_length)
+        card.canvas_item = self.card_canvas.create_window(0, 0, window=card, anchor='nw', state='hidden')
+        return card
+    
+    def get_card_cell(self):
+        """单元格尺寸，第一次调用时创建一个卡片控件测量并放入复用池"""
+        if self.card_cell is None:
+            card = self.new_card_widget(ServerState('', ''))
+            card.update_idletasks()
+            self.card_pool.append(card)
+            self.card_cell = (card.winfo_reqwidth() + 2 * self.CARD_PAD,
+                              card.winfo_reqheight() + 2 * self.CARD_PAD)
+        return self.card_cell
+    
+    def layout_cards(self):
+        """只为可见区域（上下各多留几行）内的服务器绑定卡片控件，移出的控件放回复用池"""
+        self.layout_job = None
+        canvas = self.card_canvas
+        per_row = self.CARDS_PER_ROW
+        
+        if self.card_order:
+            self.empty_label.place_forget()
+        else:
+            self.empty_label.place(relx=0.5, y=100, anchor='n')
+        
+        cell_width, cell_height = self.get_card_cell()
+        rows = -(-len(self.card_order) // per_row)
+        canvas.configure(scrollregion=(0, 0, cell_width * per_row + self.CARD_PAD,
+                                       rows * cell_height + self.CARD_PAD))
+        
+        top = canvas.canvasy(0)
+        first_row = max(0, int(top // cell_height) - self.CARD_OVERSCAN)
+        last_row = int((top + canvas.winfo_height()) // cell_height) + self.CARD_OVERSCAN
+        start = first_row * per_row
+        wanted = self.card_order[start:(last_row + 1) * per_row]
+        wanted_set = set(wanted)
+        
+        # 移出可见区域（或已删除）的卡片控件放回复用池
+        for url in [url for url in self.visible_cards if url not in wanted_set]:
+            card = self.visible_cards.pop(url)
+            state = self.server_cards.get(url)
+            if state is not None and state.card is card:
+                state.detach()
+            canvas.itemconfigure(card.canvas_item, state='hidden')
+            self.card_pool.append(card)
+        
+        for offset, url in enumerate(wanted):
+            card = self.visible_cards.get(url)
+            if card is None:
+                card = self.card_pool.pop() if self.card_pool else self.new_card_widget(self.server_cards[url].server_info)
+                self.visible_cards[url] = card
+                self.server_cards[url].attach(card)
+            index = start + offset
+            canvas.coords(card.canvas_item,
+                          self.CARD_PAD + (index % per_row) * cell_width + self.CARD_PAD,
+                          self.CARD_PAD + (index // per_row) * cell_height + self.CARD_PAD)
+            canvas.itemconfigure(card.canvas_item, state='normal')
+        
+        self.mark_startup('cards')
     
     def delete_server_from_card(self, server_info):
         """从卡片删除服务器"""
+        if server_info.relay_host:
+            messagebox.showinfo("提示", "该主机由中继汇总提供，请在中继的下游列表(RELAY_TARGETS_FILE)中移除")
+            return
+        
         if messagebox.askyesno("确认删除", 
-                              f"确定要删除服务器 '{server_info['name']}' 吗？"):
+                              f"确定要删除服务器 '{server_info.name}' 吗？"):
             # 从数据库删除
-            if self.db.delete_server(server_info['url']):
+            if self.db.delete_server(server_info.url):
                 # 从内存中删除
-                self.servers = [s for s in self.servers if s['url'] != server_info['url']]
+                self.servers = [s for s in self.servers if s is not server_info]
+                self.forget_server(server_info)
                 
                 # 从树视图中删除
                 for item in self.server_tree.get_children():
                     values = self.server_tree.item(item, 'values')
-                    if values[1] == server_info['url']:
+                    if values[1] == server_info.url:
                         self.server_tree.delete(item)
                         break
                 
-                # 重建所有卡片以保持布局
-                self.rebuild_all_cards()
+                # 移除卡片，后面的卡片依次前移
+                self.remove_card(server_info.url)
                 
-                self.log(f"🗑️ 已删除服务器: {server_info['name']}", 'warning')
+                self.log(f"🗑️ 已删除服务器: {server_info.name}", 'warning')
                 self.update_server_count()
     
     def refresh_single_server(self, server_info):
         """刷新单个服务器"""
-        self.log(f"🔄 正在刷新服务器: {server_info['name']}...", 'info')
+        self.log(f"🔄 正在刷新服务器: {server_info.name}...", 'info')
+        
+        # 手动刷新立即探测，不受熔断限制
+        server_info.breaker = None
         
         def refresh_thread():
             self.check_server(server_info)
-            self.log(f"✅ 服务器 {server_info['name']} 刷新完成", 'success')
+            self.log(f"✅ 服务器 {server_info.name} 刷新完成", 'success')
         
         threading.Thread(target=refresh_thread, daemon=True).start()
     
@@ -1615,13 +1957,16 @@ class ServerMonitor:
             # 从数据库删除
             if self.db.delete_server(url):
                 # 从内存中删除
-                self.servers = [s for s in self.servers if s['url'] != url]
+                for server_info in self.servers:
+                    if server_info.url == url:
+                        self.forget_server(server_info)
+                self.servers = [s for s in self.servers if s.url != url]
                 
                 # 从树视图中删除
                 self.server_tree.delete(item)
                 
-                # 重建所有卡片
-                self.rebuild_all_cards()
+                # 移除卡片，后面的卡片依次前移
+                self.remove_card(url)
                 
                 self.log(f"🗑️ 已删除服务器: {name}", 'warning')
                 self.update_server_count()
@@ -1639,11 +1984,7 @@ class ServerMonitor:
         if not url.startswith(('http://', 'https://')):
             url = 'http://' + url
         
-        server_info = {
-            'name': name or '测试服务器',
-            'url': url,
-            'key': key
-        }
+        server_info = ServerState(name or '测试服务器', url, key=key)
         
         self.log(f"🔍 正在测试连接: {url}...", 'info')
         self.log(f"   开始连续{self.verify_count}次连接测试 (每次间隔{self.verify_interval}秒)...", 'info')
@@ -1682,199 +2023,17 @@ class ServerMonitor:
             messagebox.showerror("测试失败", 
                                f"服务器连接失败！\n连续检测成功率: {success_count}/{self.verify_count}\n\n请检查:\n1. 服务器地址是否正确\n2. 密钥是否正确\n3. 服务器是否在线")
     
-    def verify_alert(self, server_info, metric_name, value):
-        """
-        验证告警 - 连续检测确认
-        :param server_info: 服务器信息
-        :param metric_name: 指标名称
-        :param value: 初始检测值
-        :return: True如果验证通过（连续N次都超过阈值）
-        """
-        self.log(f"🔍 [{server_info['name']}] 触发{metric_name}告警验证机制 (初始值: {value:.1f}%)", 'verify')
-        self.log(f"   开始连续{self.verify_count}次验证检测 (每次间隔{self.verify_interval}秒)...", 'verify')
-        
-        exceeded_count = 0
-        threshold_map = {
-            'CPU': self.cpu_threshold,
-            '内存': self.memory_threshold,
-            '负载': self.load_threshold
-        }
-        threshold = threshold_map.get(metric_name, 80)
-        
-        for i in range(self.verify_count):
-            time.sleep(self.verify_interval)  # 每次检测间隔
-            
-            # 进行单次检测
-            data = self.check_server(server_info, silent_mode=True)
-            
-            if data:
-                # 获取对应指标的值
-                current_value = 0
-                if metric_name == 'CPU':
-                    current_value = data['cpu']['percent']
-                elif metric_name == '内存':
-                    current_value = data['memory']['percent']
-                elif metric_name == '负载':
-                    current_value = data['load'].get('load1_percent', 0)
-                
-                # 检查是否超过阈值
-                if current_value > threshold:
-                    exceeded_count += 1
-                    self.log(f"   ✅ 第{i+1}/{self.verify_count}次验证: {metric_name}={current_value:.1f}% (超过阈值{threshold}%)", 'verify')
-                else:
-                    self.log(f"   ❌ 第{i+1}/{self.verify_count}次验证: {metric_name}={current_value:.1f}% (未超过阈值{threshold}%)", 'info')
-            else:
-                self.log(f"   ❌ 第{i+1}/{self.verify_count}次验证: 连接失败", 'error')
-        
-        # 判断是否所有检测都超过阈值
-        all_exceeded = (exceeded_count == self.verify_count)
-        
-        if all_exceeded:
-            self.log(f"🚨 [{server_info['name']}] {metric_name}告警验证通过！连续{exceeded_count}次检测都超过阈值", 'alert')
-        else:
-            self.log(f"ℹ️ [{server_info['name']}] {metric_name}告警验证未通过 ({exceeded_count}/{self.verify_count}次超过阈值)", 'info')
-        
-        return all_exceeded
-    
-    def check_server(self, server_info, test_mode=False, silent_mode=False):
-        """
-        检查服务器性能
-        :param server_info: 服务器信息
-        :param test_mode: 测试模式（只返回True/False）
-        :param silent_mode: 静默模式（不更新UI和日志，用于验证检测）
-        """
-        try:
-            headers = {
-                'Authorization': f'Bearer {server_info["key"]}'
-            }
-            
-            response = requests.get(f"{server_info['url']}/metrics",
-                                   headers=headers, timeout=10)
-            
-            if response.status_code == 401:
-                if not test_mode and not silent_mode:
-                    self.log(f"🔐 [{server_info['name']}] 认证失败 - 密钥错误!", 'error')
-                    if server_info['url'] in self.server_cards:
-                        self.server_cards[server_info['url']].set_error_status("认证失败")
-                return None
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                if test_mode:
-                    return True
-                
-                if silent_mode:
-                    return data
-                
-                # 更新卡片数据
-                if server_info['url'] in self.server_cards:
-                    self.server_cards[server_info['url']].update_data(data)
-                
-                cpu = data['cpu']['percent']
-                memory = data['memory']['percent']
-                load = data['load'].get('load1_percent', 0)
-                
-                # 检查阈值 - 使用智能告警机制
-                alerts = []
-                metrics_exceeded = {}
-                
-                if cpu > self.cpu_threshold:
-                    alerts.append(f"CPU: {cpu:.1f}%")
-                    metrics_exceeded['CPU'] = cpu
-                
-                if memory > self.memory_threshold:
-                    alerts.append(f"内存: {memory:.1f}%")
-                    metrics_exceeded['内存'] = memory
-                
-                if load > self.load_threshold:
-                    alerts.append(f"负载: {load:.1f}%")
-                    metrics_exceeded['负载'] = load
-                
-                if metrics_exceeded:
-                    # 有指标超过阈值
-                    for metric_name, metric_value in metrics_exceeded.items():
-                        # 记录告警
-                        self.alert_tracker.record_alert(server_info['url'], metric_name, metric_value)
-                        
-                        # 检查是否需要验证（根据智能告警设置）
-                        if self.alert_tracker.should_verify(server_info['url'], metric_name):
-                            # 检查是否应该发送通知（避免重复通知）
-                            if self.alert_tracker.should_notify(server_info['url'], metric_name):
-                                # 如果启用智能告警，进行连续验证
-                                if self.enable_smart_alert:
-                                    self.log(f"⚠️ [{server_info['name']}] 检测到{metric_name}超过阈值: {metric_value:.1f}%", 'warning')
-                                    
-                                    verified = self.verify_alert(server_info, metric_name, metric_value)
-                                    
-                                    if verified:
-                                        # 验证通过，发送系统通知
-                                        alert_msg = f"⚠️ [{server_info['name']}] {metric_name}持续超过阈值！"
-                                        self.log(alert_msg, 'alert')
-                                        
-                                        self.show_notification(
-                                            f"🚨 服务器性能警告 - {server_info['name']}",
-                                            f"{metric_name}持续超过阈值！\n当前值: {metric_value:.1f}%\n阈值: {self.cpu_threshold if metric_name=='CPU' else (self.memory_threshold if metric_name=='内存' else self.load_threshold)}%\n\n请立即检查服务器状态！"
-                                        )
-                                        
-                                        # 标记已通知
-                                        self.alert_tracker.mark_notified(server_info['url'], metric_name)
-                                    else:
-                                        # 验证未通过，可能是瞬时波动
-                                        self.log(f"ℹ️ [{server_info['name']}] {metric_name}可能为瞬时波动，未发送通知", 'info')
-                                else:
-                                    # 未启用智能告警，直接通知
-                                    alert_msg = f"⚠️ [{server_info['name']}] {metric_name}超过阈值: {metric_value:.1f}%"
-                                    self.log(alert_msg, 'alert')
-                                    
-                                    self.show_notification(
-                                        f"🚨 服务器性能警告 - {server_info['name']}",
-                                        f"{metric_name}超过阈值！\n当前值: {metric_value:.1f}%\n阈值: {self.cpu_threshold if metric_name=='CPU' else (self.memory_threshold if metric_name=='内存' else self.load_threshold)}%\n\n请立即检查服务器状态！"
-                                    )
-                                    
-                                    # 标记已通知
-                                    self.alert_tracker.mark_notified(server_info['url'], metric_name)
-                    
-                    # 记录当前状态
-                    if not silent_mode:
-                        msg = f"⚠️ [{server_info['name']}] " + ", ".join(alerts)
-                        self.log(msg, 'warning')
-                else:
-                    # 所有指标正常
-                    if not silent_mode:
-                        msg = f"✅ [{server_info['name']}] CPU:{cpu:.1f}% 内存:{memory:.1f}% 负载:{load:.1f}%"
-                        self.log(msg, 'success')
-                    
-                    # 清除所有告警记录
-                    for metric_name in ['CPU', '内存', '负载']:
-                        self.alert_tracker.clear_alerts(server_info['url'], metric_name)
-                
-                return data
-            else:
-                if not silent_mode:
-                    self.log(f"❌ [{server_info['name']}] HTTP {response.status_code}", 'error')
-                    if server_info['url'] in self.server_cards:
-                        self.server_cards[server_info['url']].set_error_status(f"HTTP {response.status_code}")
-                return None
-                
-        except requests.exceptions.Timeout:
-            if not silent_mode:
-                self.log(f"⏱️ [{server_info['name']}] 连接超时", 'error')
-                if server_info['url'] in self.server_cards:
-                    self.server_cards[server_info['url']].set_error_status("连接超时")
-            return None
-        except requests.exceptions.ConnectionError:
-            if not silent_mode:
-                self.log(f"🔌 [{server_info['name']}] 连接失败", 'error')
-                if server_info['url'] in self.server_cards:
-                    self.server_cards[server_info['url']].set_error_status("连接失败")
-            return None
-        except Exception as e:
-            if not silent_mode:
-                self.log(f"❌ [{server_info['name']}] 错误: {str(e)}", 'error')
-                if server_info['url'] in self.server_cards:
-                    self.server_cards[server_info['url']].set_error_status(str(e))
-            return None
+    def update_timing_status(self):
+        """状态栏显示 p95 耗时最高的服务器"""
+        self.mark_startup('first_poll')
+        timed = [server for server in self.all_servers() if server.timings is not None]
+        if not timed:
+            return
+        server = max(timed, key=lambda server: server.timings.p95_total)
+        stats = server.timings
+        self.timing_status_label.config(
+            text=f"⏱️ 最慢: {server.name} p95 {stats.p95_total:.0f}ms ({CheckTiming.PHASE_NAMES[stats.slowest_phase()]})"
+        )
     
     def refresh_all_servers(self):
         """刷新所有服务器数据"""
@@ -1892,37 +2051,6 @@ class ServerMonitor:
         
         threading.Thread(target=refresh_thread, daemon=True).start()
     
-    def monitor_loop(self):
-        """监控循环"""
-        self.log("="*80, 'info')
-        self.log("🚀 开始服务器性能监控...", 'info')
-        self.log(f"📊 监控服务器数量: {len(self.servers)}", 'info')
-        self.log(f"⏱️  检测间隔: {self.check_interval}秒", 'info')
-        
-        if self.enable_smart_alert:
-            self.log(f"🧠 智能告警: 已启用", 'info')
-            self.log(f"   ├─ 时间窗口: {self.alert_time_window}秒 ({self.alert_time_window//60}分钟)", 'info')
-            self.log(f"   ├─ 验证机制: 检测到超阈值 → 连续{self.verify_count}次验证(每{self.verify_interval}秒一次) → 全部超过才通知", 'info')
-            self.log(f"   └─ 防重复: 时间窗口内同一指标不会重复通知", 'info')
-        else:
-            self.log(f"🧠 智能告警: 已禁用 (检测到超阈值立即通知)", 'warning')
-        
-        self.log(f"🔒 数据库加密: 已启用", 'info')
-        self.log("="*80, 'info')
-        
-        while self.monitoring:
-            # 检查所有服务器
-            for server_info in self.servers[:]:
-                if not self.monitoring:
-                    break
-                self.check_server(server_info)
-            
-            if self.monitoring:
-                self.log(f"⏸️ 等待 {self.check_interval} 秒后继续下一轮检测...", 'info')
-                time.sleep(self.check_interval)
-                
-        self.log("⏹️ 监控已停止", 'warning')
-    
     def start_monitoring(self):
         """开始监控"""
         if not self.servers:
@@ -1937,6 +2065,9 @@ class ServerMonitor:
             self.cpu_threshold = float(self.cpu_threshold_var.get())
             self.memory_threshold = float(self.memory_threshold_var.get())
             self.load_threshold = float(self.load_threshold_var.get())
+            self.swap_threshold = float(self.swap_threshold_var.get())
+            self.pressure_threshold = float(self.pressure_threshold_var.get())
+            self.latency_threshold = float(self.latency_threshold_var.get())
             self.check_interval = int(self.check_interval_var.get())
             self.verify_count = int(self.verify_count_var.get())
             self.verify_interval = int(self.verify_interval_var.get())
@@ -1976,6 +2107,8 @@ class ServerMonitor:
     def show_notification(self, title, message):
         """显示系统通知"""
         try:
+            from plyer import notification
+            
             notification.notify(
                 title=title,
                 message=message,
@@ -2020,26 +2153,72 @@ class ServerMonitor:
         except Exception as e:
             messagebox.showerror("错误", f"导出失败:\n{str(e)}")
     
+    def export_timings(self):
+        """导出每台服务器各阶段检查耗时的分位数（CSV）"""
+        timed = [server for server in self.all_servers() if server.timings is not None]
+        if not timed:
+            messagebox.showinfo("提示", "还没有检查耗时数据！")
+            return
+        try:
+            from tkinter import filedialog
+            
+            filename = filedialog.asksaveasfilename(
+                defaultextension=".csv",
+                filetypes=[("CSV文件", "*.csv"), ("所有文件", "*.*")],
+                initialfile=f"check_timings_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            )
+            
+            if filename:
+                import csv
+                
+                phases = CheckTiming.PHASES + ('total',)
+                with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(['server', 'url', 'samples'] +
+                                    [f'{phase}_p{pct}_ms' for phase in phases for pct in (50, 95, 99)])
+                    for server in timed:
+                        stats = server.timings
+                        summary = stats.summary()
+                        writer.writerow([server.name, server.url, stats.count] +
+                                        [summary[phase][f'p{pct}'] for phase in phases for pct in (50, 95, 99)])
+                
+                self.log(f"💾 检查耗时已导出到: {filename}", 'success')
+                messagebox.showinfo("成功", f"检查耗时已导出到:\n{filename}")
+        except Exception as e:
+            messagebox.showerror("错误", f"导出失败:\n{str(e)}")
+    
     def update_server_count(self):
         """更新服务器数量显示"""
         count = len(self.servers)
         self.server_count_label.config(text=f"服务器数量: {count}")
         
         # 更新空状态提示
-        if count == 0:
-            self.empty_label.pack(pady=100)
-        else:
-            self.empty_label.pack_forget()
+        self.schedule_layout()
+    
+    def mark_startup(self, stage):
+        """
+        记录启动阶段（window / cards / tray / first_poll）首次完成的时间
+        设置了 MONITOR_STARTUP_REPORT 时，窗口显示后自动开始监控，全部阶段完成后写出报告并退出
+        """
+        if stage in self.startup_marks:
+            return
+        self.startup_marks[stage] = time.time()
+        if not STARTUP_REPORT:
+            return
+        
+        if stage == 'window' and self.servers:
+            self.window.after(0, self.start_monitoring)
+        expected = {'window', 'cards', 'tray'} | ({'first_poll'} if self.servers else set())
+        if expected <= set(self.startup_marks):
+            with open(STARTUP_REPORT, 'w') as f:
+                json.dump({'servers': len(self.servers), 'marks': self.startup_marks}, f)
+            self.window.after(0, self.quit_app)
     
     def run(self):
         """运行应用"""
         # 绑定关闭事件
         self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        # 启动托盘图标（在后台线程中）
-        if self.tray_icon:
-            threading.Thread(target=self.tray_icon.run, daemon=True).start()
-        
         self.window.mainloop()
 
 
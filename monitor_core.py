@@ -0,0 +1,1357 @@
+# monitor_core.py - 服务器性能监控核心（数据库、告警、轮询引擎），不依赖任何图形界面库
+import time
+from datetime import datetime
+from collections import defaultdict
+import threading
+import copy
+from collections import deque
+import sqlite3
+import os
+import random
+import socket
+import importlib
+import itertools
+from array import array
+
+
+class LazyModule:
+    """首次访问属性时才导入的模块（requests 等导入较慢，推迟到第一次检查时）"""
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+requests = LazyModule('requests')
+
+
+class DatabaseManager:
+    """数据库管理类"""
+    
+    def __init__(self, db_path='server_monitor.db', key_file='monitor.key'):
+        self.db_path = db_path
+        self.key_file = key_file
+        self._cipher = None
+        self.init_database()
+    
+    @property
+    def cipher(self):
+        """加密器，首次加解密时才读取密钥"""
+        if self._cipher is None:
+            self._cipher = self._get_cipher()
+        return self._cipher
+    
+    def _get_cipher(self):
+        """获取加密密钥"""
+        from cryptography.fernet import Fernet
+        
+        if os.path.exists(self.key_file):
+            with open(self.key_file, 'rb') as f:
+                key = f.read()
+        else:
+            # 生成新密钥
+            key = Fernet.generate_key()
+            with open(self.key_file, 'wb') as f:
+                f.write(key)
+        return Fernet(key)
+    
+    def encrypt(self, text):
+        """加密文本"""
+        if not text:
+            return ""
+        return self.cipher.encrypt(text.encode()).decode()
+    
+    def decrypt(self, encrypted_text):
+        """解密文本"""
+        if not encrypted_text:
+            return ""
+        try:
+            return self.cipher.decrypt(encrypted_text.encode()).decode()
+        except Exception:
+            return ""
+    
+    def init_database(self):
+        """初始化数据库"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        # 创建服务器表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS servers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                url TEXT NOT NULL UNIQUE,
+                encrypted_key TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # 创建配置表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        conn.commit()
+        conn.close()
+    
+    def add_server(self, name, url, key):
+        """
+        添加服务器
+        :return: 新服务器的编号，地址已存在时返回 False
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            encrypted_key = self.encrypt(key)
+            cursor.execute('''
+                INSERT INTO servers (name, url, encrypted_key)
+                VALUES (?, ?, ?)
+            ''', (name, url, encrypted_key))
+            conn.commit()
+            return cursor.lastrowid
+        except sqlite3.IntegrityError:
+            return False
+        finally:
+            conn.close()
+    
+    def update_server(self, old_url, name, url, key):
+        """更新服务器"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            encrypted_key = self.encrypt(key)
+            cursor.execute('''
+                UPDATE servers 
+                SET name=?, url=?, encrypted_key=?, updated_at=CURRENT_TIMESTAMP
+                WHERE url=?
+            ''', (name, url, encrypted_key, old_url))
+            conn.commit()
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+    
+    def delete_server(self, url):
+        """删除服务器"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('DELETE FROM servers WHERE url=?', (url,))
+        conn.commit()
+        deleted = cursor.rowcount > 0
+        conn.close()
+        return deleted
+    
+    def get_all_servers(self, decrypt=True):
+        """
+        获取所有服务器
+        :param decrypt: False 时不解密，返回 encrypted_key，由使用方在需要时解密
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT id, name, url, encrypted_key FROM servers ORDER BY id')
+        rows = cursor.fetchall()
+        conn.close()
+        
+        servers = []
+        for server_id, name, url, encrypted_key in rows:
+            if decrypt:
+                servers.append(ServerState(name, url, key=self.decrypt(encrypted_key), server_id=server_id))
+            else:
+                servers.append(ServerState(name, url, encrypted_key=encrypted_key, server_id=server_id))
+        return servers
+    
+    def save_setting(self, key, value):
+        """保存配置"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            INSERT OR REPLACE INTO settings (key, value, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        ''', (key, str(value)))
+        conn.commit()
+        conn.close()
+    
+    def get_setting(self, key, default=None):
+        """获取配置"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT value FROM settings WHERE key=?', (key,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        return row[0] if row else default
+    
+    def save_all_settings(self, settings):
+        """批量保存配置"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        for key, value in settings.items():
+            cursor.execute('''
+                INSERT OR REPLACE INTO settings (key, value, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+            ''', (key, str(value)))
+        
+        conn.commit()
+        conn.close()
+    
+    def get_all_settings(self):
+        """获取所有配置"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT key, value FROM settings')
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return {key: value for key, value in rows}
+
+
+class ServerState:
+    """
+    单台服务器的状态记录，各子系统共用同一个对象
+    保存身份与配置、最新指标、健康状况、熔断器、延迟和耗时统计，以及界面卡片
+    """
+    METRICS = ('CPU', '内存', '负载', '磁盘', '交换', '压力', '延迟')  # metrics 数组中各指标的位置
+    NO_DATA = float('nan')  # 没有数据的指标
+    _transient_ids = itertools.count(-1, -1)  # 未入库的服务器（中继下游主机、测试连接）使用负数编号
+    
+    __slots__ = ('id', 'name', 'url', 'key', 'encrypted_key', 'relay_url', 'relay_host',
+                 'metrics', 'pressure_resource', 'health', 'breaker', 'latency', 'timings',
+                 'metrics_version', 'metrics_data', 'card')
+    
+    def __init__(self, name, url, key=None, encrypted_key=None, server_id=None,
+                 relay_url=None, relay_host=None):
+        """
+        :param key: 访问密钥，为 None 时在第一次使用时由 encrypted_key 解密
+        :param server_id: 数据库中的编号，未入库时自动分配负数编号
+        :param relay_url: 中继下游主机所属中继的地址
+        :param relay_host: 中继下游主机在中继中的名称
+        """
+        self.id = server_id if server_id is not None else next(self._transient_ids)
+        self.name = name
+        self.url = url
+        self.key = key
+        self.encrypted_key = encrypted_key
+        self.relay_url = relay_url
+        self.relay_host = relay_host
+        self.metrics = array('d', [self.NO_DATA]) * len(self.METRICS)
+        self.pressure_resource = None  # 压力最大的资源 (cpu/memory/io)
+        self.health = 'pending'  # pending / ok / error / paused
+        self.breaker = None  # CircuitBreaker，第一次检查时创建
+        self.latency = None  # 最近的响应延迟（毫秒） deque
+        self.timings = None  # 最近的检查耗时 TimingStats
+        self.metrics_version = None  # 增量拉取的最新完整数据及其版本号
+        self.metrics_data = None
+        self.card = None  # 图形界面的卡片状态（CardState），无界面时为 None
+    
+    def __repr__(self):
+        return f"ServerState(id={self.id}, name={self.name!r}, url={self.url!r})"
+    
+    def metric(self, name):
+        """某项指标的最新值，没有数据时返回 None"""
+        value = self.metrics[self.METRICS.index(name)]
+        return None if value != value else value
+    
+    def reset(self):
+        """地址或密钥修改后清空与原服务器相关的状态"""
+        self.metrics = array('d', [self.NO_DATA]) * len(self.METRICS)
+        self.pressure_resource = None
+        self.health = 'pending'
+        self.breaker = None
+        self.latency = None
+        self.timings = None
+        self.metrics_version = None
+        self.metrics_data = None
+
+
+class AlertTracker:
+    """告警追踪器 - 实现智能告警逻辑"""
+    
+    def __init__(self, time_window=600, verify_count=3, enable_smart_alert=True):
+        """
+        初始化告警追踪器
+        :param time_window: 时间窗口（秒），默认600秒（10分钟）
+        :param verify_count: 验证次数，默认3次
+        :param enable_smart_alert: 是否启用智能告警
+        """
+        self.time_window = time_window
+        self.verify_count = verify_count
+        self.enable_smart_alert = enable_smart_alert
+        
+        # 存储每个服务器的异常记录 {服务器编号: [(timestamp, metric_name, value), ...]}
+        self.alert_history = defaultdict(list)
+        
+        # 存储已发送通知的服务器 {服务器编号: {metric_name: timestamp}}
+        self.notified_servers = defaultdict(dict)
+    
+    def record_alert(self, server_id, metric_name, value):
+        """
+        记录一次告警
+        :param server_id: 服务器编号 (ServerState.id)
+        :param metric_name: 指标名称 (cpu/memory/load)
+        :param value: 指标值
+        """
+        current_time = datetime.now()
+        
+        # 清理超过时间窗口的旧记录
+        self.alert_history[server_id] = [
+            (ts, name, val) for ts, name, val in self.alert_history[server_id]
+            if (current_time - ts).total_seconds() <= self.time_window
+        ]
+        
+        # 添加新记录
+        self.alert_history[server_id].append((current_time, metric_name, value))
+    
+    def should_verify(self, server_id, metric_name):
+        """
+        检查是否应该进行连续验证
+        :param server_id: 服务器编号 (ServerState.id)
+        :param metric_name: 指标名称
+        :return: True如果在时间窗口内检测到异常
+        """
+        if not self.enable_smart_alert:
+            return True  # 如果禁用智能告警，总是进行验证（即立即通知）
+        
+        current_time = datetime.now()
+        
+        # 统计时间窗口内该指标的异常次数
+        count = sum(
+            1 for ts, name, _ in self.alert_history[server_id]
+            if name == metric_name and (current_time - ts).total_seconds() <= self.time_window
+        )
+        
+        return count > 0
+    
+    def should_notify(self, server_id, metric_name):
+        """
+        检查是否应该发送通知
+        :param server_id: 服务器编号 (ServerState.id)
+        :param metric_name: 指标名称
+        :return: True如果应该发送通知
+        """
+        # 检查是否最近已经通知过（时间窗口内不重复通知相同指标）
+        if metric_name in self.notified_servers[server_id]:
+            last_notify_time = self.notified_servers[server_id][metric_name]
+            if (datetime.now() - last_notify_time).total_seconds() < self.time_window:
+                return False
+        
+        return True
+    
+    def mark_notified(self, server_id, metric_name):
+        """
+        标记已发送通知
+        :param server_id: 服务器编号 (ServerState.id)
+        :param metric_name: 指标名称
+        """
+        self.notified_servers[server_id][metric_name] = datetime.now()
+    
+    def clear_alerts(self, server_id, metric_name):
+        """
+        清除告警记录（当指标恢复正常时调用）
+        :param server_id: 服务器编号 (ServerState.id)
+        :param metric_name: 指标名称
+        """
+        self.alert_history[server_id] = [
+            (ts, name, val) for ts, name, val in self.alert_history[server_id]
+            if name != metric_name
+        ]
+        
+        # 清除通知记录
+        if metric_name in self.notified_servers[server_id]:
+            del self.notified_servers[server_id][metric_name]
+    
+    def forget(self, server_id):
+        """
+        丢弃服务器的全部告警和通知记录（服务器被删除或地址、密钥被修改时调用）
+        :param server_id: 服务器编号 (ServerState.id)
+        """
+        self.alert_history.pop(server_id, None)
+        self.notified_servers.pop(server_id, None)
+
+
+class CircuitBreaker:
+    """单台服务器的熔断器：连续失败后暂停检测，按指数退避（带抖动）放行单次探测"""
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold=3, base_delay=30, max_delay=600):
+        """
+        :param failure_threshold: 连续失败多少次后熔断
+        :param base_delay: 第一次熔断的等待时间（秒），之后每次翻倍
+        :param max_delay: 最长等待时间（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = self.CLOSED
+        self.failures = 0  # 连续失败次数
+        self.open_count = 0  # 连续熔断次数，决定退避时长
+        self.retry_at = None
+        self.lock = threading.Lock()
+    
+    def allow(self):
+        """是否允许本次检测；熔断到期时转为半开并只放行一次探测"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.time() >= self.retry_at:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+    
+    def record_success(self):
+        """
+        记录一次成功
+        :return: True 如果是从熔断中恢复
+        """
+        with self.lock:
+            recovered = self.state != self.CLOSED
+            self.state = self.CLOSED
+            self.failures = 0
+            self.open_count = 0
+            self.retry_at = None
+            return recovered
+    
+    def record_failure(self):
+        """
+        记录一次失败（超时或连接失败）
+        :return: 本次进入熔断时的等待秒数，未熔断返回 None
+        """
+        with self.lock:
+            self.failures += 1
+            if self.state != self.HALF_OPEN and self.failures < self.failure_threshold:
+                return None
+            # 先加抖动再封顶，等待时间不超过 max_delay
+            delay = min(self.max_delay, self.base_delay * 2 ** self.open_count * random.uniform(0.8, 1.2))
+            self.open_count += 1
+            self.state = self.OPEN
+            self.retry_at = time.time() + delay
+            return delay
+
+
+class CheckTiming:
+    """单次检查的分阶段耗时（毫秒），网络阶段由 TimedConnectionMixin 记录到当前线程的计时器"""
+
+    PHASES = ('resolve', 'connect', 'tls', 'ttfb', 'download', 'parse', 'ui')
+    PHASE_NAMES = {
+        'resolve': 'DNS', 'connect': '连接', 'tls': 'TLS', 'ttfb': '首字节',
+        'download': '下载', 'parse': '解析', 'ui': '界面'
+    }
+    _local = threading.local()
+
+    def __init__(self):
+        self.phases = dict.fromkeys(self.PHASES, 0.0)
+        self.sent_at = None
+        self.headers_at = None
+        self.lap_at = time.perf_counter()
+        self.previous = getattr(self._local, 'current', None)
+        self._local.current = self
+
+    @classmethod
+    def current(cls):
+        """当前线程正在进行的检查计时（没有则返回 None）"""
+        return getattr(cls._local, 'current', None)
+
+    def add(self, phase, seconds):
+        self.phases[phase] += seconds * 1000
+
+    def lap(self, phase):
+        """把上次打点到现在的耗时计入 phase"""
+        now = time.perf_counter()
+        self.add(phase, now - self.lap_at)
+        self.lap_at = now
+
+    def received(self):
+        """响应体读取完成：响应头之后的时间计为下载"""
+        now = time.perf_counter()
+        if self.headers_at is not None:
+            self.add('download', now - self.headers_at)
+        self.lap_at = now
+
+    def finish(self):
+        """结束计时，恢复外层检查的计时器"""
+        self._local.current = self.previous
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    @property
+    def latency(self):
+        """请求往返延迟：从解析地址到读完响应体"""
+        return sum(self.phases[phase] for phase in ('resolve', 'connect', 'tls', 'ttfb', 'download'))
+
+
+class TimedConnectionMixin:
+    """在 urllib3 连接上记录 DNS 解析、TCP 连接、TLS 握手和首字节时间"""
+
+    def _new_conn(self):
+        timing = CheckTiming.current()
+        if timing is None:
+            return super()._new_conn()
+
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)
+        except OSError:
+            addresses = []
+        resolved = time.perf_counter()
+        timing.add('resolve', resolved - started)
+
+        # 逐个尝试解析结果，保持与 create_connection 相同的多地址回退
+        try:
+            error = None
+            for address in dict.fromkeys(info[4][0] for info in addresses) or [host]:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except Exception as e:
+                    error = e
+            raise error
+        finally:
+            self._dns_host = host
+            timing.add('connect', time.perf_counter() - resolved)
+
+    def connect(self):
+        timing = CheckTiming.current()
+        if timing is None:
+            return super().connect()
+
+        before = timing.phases['resolve'] + timing.phases['connect']
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            # connect 中除去解析和 TCP 连接的部分即 TLS 握手（HTTP 下约为 0）
+            elapsed = (time.perf_counter() - started) * 1000
+            spent = timing.phases['resolve'] + timing.phases['connect'] - before
+            timing.phases['tls'] += max(0.0, elapsed - spent)
+
+    def request(self, *args, **kwargs):
+        timing = CheckTiming.current()
+        if timing is not None:
+            timing.sent_at = time.perf_counter()
+        return super().request(*args, **kwargs)
+
+    def getresponse(self, *args, **kwargs):
+        timing = CheckTiming.current()
+        try:
+            return super().getresponse(*args, **kwargs)
+        finally:
+            if timing is not None and timing.sent_at is not None:
+                timing.headers_at = time.perf_counter()
+                timing.add('ttfb', timing.headers_at - timing.sent_at)
+
+
+_timed_adapter_class = None
+
+
+def timed_adapter():
+    """创建使用计时连接的 requests 适配器，相关类在第一次请求时才定义"""
+    global _timed_adapter_class
+    if _timed_adapter_class is None:
+        from requests.adapters import HTTPAdapter
+        from urllib3.connection import HTTPConnection, HTTPSConnection
+        from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+        class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+            pass
+
+        class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+            pass
+
+        class TimedHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = TimedHTTPConnection
+
+        class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = TimedHTTPSConnection
+
+        class TimedHTTPAdapter(HTTPAdapter):
+            def init_poolmanager(self, *args, **kwargs):
+                super().init_poolmanager(*args, **kwargs)
+                self.poolmanager.pool_classes_by_scheme = {
+                    'http': TimedHTTPConnectionPool,
+                    'https': TimedHTTPSConnectionPool
+                }
+
+        _timed_adapter_class = TimedHTTPAdapter
+    return _timed_adapter_class()
+
+
+_numpy = None
+
+
+def get_numpy():
+    """NumPy 为可选依赖，第一次批量评估阈值时才导入，未安装时返回 None"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+class FleetMetrics:
+    """
+    全部服务器最新指标的共享矩阵：每台服务器一行（按 ServerState.id 分配），每列一个指标（顺序同 ServerState.METRICS）
+    数据保存在连续的 array('d') 中，评估时零拷贝地视为 NumPy 矩阵；同时保存每行上一次评估时的超限位掩码
+    行的分配、写入和评估都在锁内进行（有 NumPy 视图时不能扩容）
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.values = array('d')
+        self.previous = array('q')  # 每行上一次评估时超过阈值的指标位掩码
+        self.rows = {}  # {服务器编号: 行号}
+        self.free_rows = []  # 已释放、可复用的行号
+        self.lock = threading.Lock()
+
+    def _row(self, server_id):
+        """服务器所在的行，没有时分配（需持有锁）"""
+        row = self.rows.get(server_id)
+        if row is None:
+            if self.free_rows:
+                row = self.free_rows.pop()
+            else:
+                row = len(self.previous)
+                self.values.extend(array('d', [ServerState.NO_DATA]) * self.width)
+                self.previous.append(0)
+            self.rows[server_id] = row
+        return row
+
+    def write(self, server_id, metrics):
+        """写入服务器的最新指标"""
+        with self.lock:
+            start = self._row(server_id) * self.width
+            self.values[start:start + self.width] = metrics
+
+    def release(self, server_id):
+        """释放服务器的行（删除服务器或地址、密钥修改后），之后写入时重新从空白行开始"""
+        with self.lock:
+            row = self.rows.pop(server_id, None)
+            if row is None:
+                return
+            start = row * self.width
+            self.values[start:start + self.width] = array('d', [ServerState.NO_DATA]) * self.width
+            self.previous[row] = 0
+            self.free_rows.append(row)
+
+    def evaluate(self, server_ids, thresholds, np=None):
+        """
+        一次评估若干服务器的全部指标，并更新各行的上一次掩码
+        :param np: NumPy 模块，为 None 时逐行比较
+        :return: [(超限掩码, 上升沿掩码, 恢复掩码), ...]，按 ServerState.METRICS 位置，没有数据的指标不算超过
+        """
+        with self.lock:
+            rows = [self._row(server_id) for server_id in server_ids]
+            if np is None:
+                return [self._evaluate_row(row, thresholds) for row in rows]
+            return self._evaluate_rows(np, rows, thresholds)
+
+    def _evaluate_row(self, row, thresholds):
+        start = row * self.width
+        mask = 0
+        for index, (value, threshold) in enumerate(zip(self.values[start:start + self.width], thresholds)):
+            if value > threshold:
+                mask |= 1 << index
+        previous = self.previous[row]
+        self.previous[row] = mask
+        return mask, mask & ~previous, previous & ~mask
+
+    def _evaluate_rows(self, np, rows, thresholds):
+        # 视图只在本函数内存在，返回前（锁释放前）即被回收
+        values = np.frombuffer(self.values, dtype=np.float64).reshape(-1, self.width)
+        previous = np.frombuffer(self.previous, dtype=np.int64)
+        index = np.asarray(rows, dtype=np.intp)
+        weights = 1 << np.arange(self.width, dtype=np.int64)
+        masks = (values[index] > np.asarray(thresholds, dtype=np.float64)) @ weights
+        last = previous[index]
+        previous[index] = masks
+        return list(zip(masks.tolist(), (masks & ~last).tolist(), (last & ~masks).tolist()))
+
+
+class TimingStats:
+    """单台服务器最近若干次检查的分阶段耗时，提供滚动分位数"""
+
+    def __init__(self, size=100):
+        self.samples = {phase: deque(maxlen=size) for phase in CheckTiming.PHASES + ('total',)}
+        self.count = 0
+        self.p95_total = 0.0
+
+    def add(self, timing):
+        for phase, value in timing.phases.items():
+            self.samples[phase].append(value)
+        self.samples['total'].append(timing.total)
+        self.count += 1
+        self.p95_total = self.percentile(self.samples['total'], 95)
+
+    @staticmethod
+    def percentile(values, pct):
+        """最近秩法分位数"""
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        rank = max(1, int(-(-pct * len(ordered) // 100)))
+        return ordered[rank - 1]
+
+    def summary(self):
+        """{阶段: {'p50', 'p95', 'p99'}}"""
+        return {
+            phase: {f'p{pct}': round(self.percentile(values, pct), 1) for pct in (50, 95, 99)}
+            for phase, values in self.samples.items()
+        }
+
+    def slowest_phase(self):
+        """p95 最大的阶段"""
+        return max(CheckTiming.PHASES, key=lambda phase: self.percentile(self.samples[phase], 95))
+
+
+class MonitorEngine:
+    """
+    轮询与告警引擎：检查服务器、合并增量数据、评估阈值并验证告警
+    图形界面和后台守护进程都基于它，界面相关的部分通过 log / show_notification /
+    create_server_card / update_timing_status 以及 ServerState.card 接入
+    """
+    # 非百分比指标的单位（未列出的指标均为百分比）
+    METRIC_UNITS = {'交换': '页/秒', '延迟': 'ms'}
+    REQUEST_TIMEOUT = 10  # 请求超时（秒）
+    LATENCY_WINDOW = 20  # 每台服务器保留的响应延迟样本数
+    BREAKER_FAILURES = 3  # 连续失败多少次后熔断
+    BREAKER_BASE_DELAY = 30  # 首次熔断后的重试等待（秒），之后指数增长
+    BREAKER_MAX_DELAY = 600  # 最长重试等待（秒）
+    VECTORIZE_MIN = 16  # 一次响应中至少多少台时用 NumPy 评估（太少时逐台比较更快）
+    
+    def __init__(self, db=None):
+        """
+        :param db: DatabaseManager，不需要读写配置时可为 None
+        """
+        self.db = db
+        
+        # 监控参数
+        self.cpu_threshold = 80.0
+        self.load_threshold = 80.0
+        self.memory_threshold = 85.0
+        self.swap_threshold = 500.0  # 换页速率阈值（页/秒），用于发现 swap 抖动
+        self.pressure_threshold = 20.0  # PSI 停顿百分比阈值（some avg10）
+        self.latency_threshold = 2000.0  # 响应延迟阈值（毫秒），需小于请求超时
+        self.check_interval = 15
+        self.verify_count = 3  # 智能告警验证次数
+        self.verify_interval = 1  # 验证检测间隔（秒）
+        self.enable_smart_alert = True  # 是否启用智能告警
+        self.alert_time_window = 600  # 告警时间窗口（秒）
+        self.history_length = 60  # 趋势图保留的样本数
+        
+        # 初始化告警追踪器
+        self.alert_tracker = AlertTracker(
+            time_window=self.alert_time_window,
+            verify_count=self.verify_count,
+            enable_smart_alert=self.enable_smart_alert
+        )
+        
+        self.monitoring = False
+        self.monitor_thread = None
+        
+        # 数据存储
+        # 服务器状态记录（ServerState），增量数据、熔断器、延迟和耗时统计都保存在记录上
+        self.servers = []
+        self.relay_hosts = {}  # 中继下游主机 {虚拟url: ServerState}
+        self.fleet_metrics = FleetMetrics(len(ServerState.METRICS))  # 全部服务器的最新指标矩阵
+    
+    def get_settings(self):
+        """当前监控参数（保存到数据库的格式）"""
+        return {
+            'cpu_threshold': self.cpu_threshold,
+            'memory_threshold': self.memory_threshold,
+            'load_threshold': self.load_threshold,
+            'swap_threshold': self.swap_threshold,
+            'pressure_threshold': self.pressure_threshold,
+            'latency_threshold': self.latency_threshold,
+            'check_interval': self.check_interval,
+            'verify_count': self.verify_count,
+            'verify_interval': self.verify_interval,
+            'enable_smart_alert': self.enable_smart_alert,
+            'alert_time_window': self.alert_time_window,
+            'history_length': self.history_length
+        }
+    
+    def apply_settings(self, settings):
+        """应用数据库中保存的监控参数，并同步到告警追踪器"""
+        self.cpu_threshold = float(settings.get('cpu_threshold', 80.0))
+        self.memory_threshold = float(settings.get('memory_threshold', 85.0))
+        self.load_threshold = float(settings.get('load_threshold', 80.0))
+        self.swap_threshold = float(settings.get('swap_threshold', 500.0))
+        self.pressure_threshold = float(settings.get('pressure_threshold', 20.0))
+        self.latency_threshold = float(settings.get('latency_threshold', 2000.0))
+        self.check_interval = int(settings.get('check_interval', 15))
+        self.verify_count = int(settings.get('verify_count', 3))
+        self.verify_interval = int(settings.get('verify_interval', 1))
+        self.enable_smart_alert = settings.get('enable_smart_alert', 'True') == 'True'
+        self.alert_time_window = int(settings.get('alert_time_window', 600))
+        self.history_length = int(settings.get('history_length', 60))
+        
+        self.alert_tracker.verify_count = self.verify_count
+        self.alert_tracker.enable_smart_alert = self.enable_smart_alert
+        self.alert_tracker.time_window = self.alert_time_window
+    
+    def log(self, message, level='info'):
+        """记录日志"""
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}")
+    
+    def show_notification(self, title, message):
+        """发送告警通知"""
+        self.log(f"{title}: {message}", 'alert')
+    
+    def create_server_card(self, server_info):
+        """新增服务器（中继下游主机）时的界面回调，需设置 server_info.card，无界面时不做任何事"""
+    
+    def update_timing_status(self):
+        """检查耗时变化时的界面回调，无界面时不做任何事"""
+    
+    def get_metric_threshold(self, metric_name):
+        """获取指标对应的告警阈值"""
+        threshold_map = {
+            'CPU': self.cpu_threshold,
+            '内存': self.memory_threshold,
+            '负载': self.load_threshold,
+            '交换': self.swap_threshold,
+            '压力': self.pressure_threshold,
+            '延迟': self.latency_threshold
+        }
+        return threshold_map.get(metric_name, 80)
+    
+    @staticmethod
+    def get_swap_rate(data):
+        """获取换入+换出速率（页/秒），旧版Agent没有该字段时返回0"""
+        swap = data['memory'].get('swap', {})
+        return swap.get('swapin_rate', 0) + swap.get('swapout_rate', 0)
+    
+    @staticmethod
+    def get_pressure_percent(data):
+        """
+        获取最严重的资源压力
+        :return: (some avg10 最大值, 资源名)，不支持PSI时返回 (0, None)
+        """
+        pressure = data.get('pressure') or {}
+        if not pressure.get('available'):
+            return 0, None
+        
+        worst_value, worst_resource = 0, None
+        for resource in ('cpu', 'memory', 'io'):
+            value = pressure.get(resource, {}).get('some', {}).get('avg10', 0)
+            if worst_resource is None or value > worst_value:
+                worst_value, worst_resource = value, resource
+        return worst_value, worst_resource
+    
+    def verify_alert(self, server_info, metric_name, value):
+        """
+        验证告警 - 连续检测确认
+        :param server_info: 服务器信息
+        :param metric_name: 指标名称
+        :param value: 初始检测值
+        :return: True如果验证通过（连续N次都超过阈值）
+        """
+        unit = self.METRIC_UNITS.get(metric_name, '%')
+        self.log(f"🔍 [{server_info.name}] 触发{metric_name}告警验证机制 (初始值: {value:.1f}{unit})", 'verify')
+        self.log(f"   开始连续{self.verify_count}次验证检测 (每次间隔{self.verify_interval}秒)...", 'verify')
+        
+        exceeded_count = 0
+        threshold = self.get_metric_threshold(metric_name)
+        
+        for i in range(self.verify_count):
+            time.sleep(self.verify_interval)  # 每次检测间隔
+            
+            # 进行单次检测
+            data = self.check_server(server_info, silent_mode=True)
+            
+            if data:
+                # 获取对应指标的值
+                current_value = 0
+                if metric_name == 'CPU':
+                    current_value = data['cpu']['percent']
+                elif metric_name == '内存':
+                    current_value = data['memory']['percent']
+                elif metric_name == '负载':
+                    current_value = data['load'].get('load1_percent', 0)
+                elif metric_name == '交换':
+                    current_value = self.get_swap_rate(data)
+                elif metric_name == '压力':
+                    current_value = self.get_pressure_percent(data)[0]
+                elif metric_name == '延迟':
+                    current_value = self.get_latency(server_info)
+                
+                # 检查是否超过阈值
+                if current_value > threshold:
+                    exceeded_count += 1
+                    self.log(f"   ✅ 第{i+1}/{self.verify_count}次验证: {metric_name}={current_value:.1f}{unit} (超过阈值{threshold}{unit})", 'verify')
+                else:
+                    self.log(f"   ❌ 第{i+1}/{self.verify_count}次验证: {metric_name}={current_value:.1f}{unit} (未超过阈值{threshold}{unit})", 'info')
+            else:
+                self.log(f"   ❌ 第{i+1}/{self.verify_count}次验证: 连接失败", 'error')
+        
+        # 判断是否所有检测都超过阈值
+        all_exceeded = (exceeded_count == self.verify_count)
+        
+        if all_exceeded:
+            self.log(f"🚨 [{server_info.name}] {metric_name}告警验证通过！连续{exceeded_count}次检测都超过阈值", 'alert')
+        else:
+            self.log(f"ℹ️ [{server_info.name}] {metric_name}告警验证未通过 ({exceeded_count}/{self.verify_count}次超过阈值)", 'info')
+        
+        return all_exceeded
+    
+    def check_server(self, server_info, test_mode=False, silent_mode=False):
+        """
+        检查服务器性能
+        :param server_info: 服务器信息
+        :param test_mode: 测试模式（只返回True/False）
+        :param silent_mode: 静默模式（不更新UI和日志，用于验证检测）
+        """
+        breaker = None
+        if not test_mode and not silent_mode:
+            breaker = self.get_breaker(server_info)
+            if not breaker.allow():
+                return None
+        
+        timing = CheckTiming()
+        record_timing = not test_mode and not silent_mode
+        try:
+            headers = {
+                'Authorization': f'Bearer {self.get_server_key(server_info)}'
+            }
+            
+            # 中继下游主机没有独立地址，通过所属中继的 /fleet/metrics 获取
+            base_url = server_info.relay_url or server_info.url
+            
+            # 普通服务器带上已有版本号，只拉取变化的字段
+            params = {}
+            if server_info.metrics_version and not test_mode and not server_info.relay_url:
+                params['since_version'] = server_info.metrics_version
+            response = self.http_get(f"{base_url}/metrics", params=params,
+                                     headers=headers, timeout=self.REQUEST_TIMEOUT)
+            timing.received()
+            if breaker and breaker.record_success():
+                self.log(f"✅ [{server_info.name}] 探测成功，恢复正常检测", 'success')
+            
+            if response.status_code == 401:
+                if not test_mode and not silent_mode:
+                    self.log(f"🔐 [{server_info.name}] 认证失败 - 密钥错误!", 'error')
+                    self.report_error(server_info, "认证失败")
+                return None
+            
+            if response.status_code == 200:
+                data = response.json()
+                
+                if test_mode:
+                    return True
+                
+                if data.get('delta'):
+                    data = self.apply_metrics_delta(server_info, data)
+                    if data is None:
+                        # 基准版本对不上，丢弃本地状态后重新拉取完整数据
+                        record_timing = False  # 由重新拉取的那次检查记录耗时
+                        return self.check_server(server_info, test_mode, silent_mode)
+                elif data.get('version') and not server_info.relay_url:
+                    server_info.metrics_version, server_info.metrics_data = data['version'], data
+                timing.lap('parse')
+                
+                # 增量基准确定后才记录延迟，重新拉取时只记录那一次；
+                # 中继下游主机的请求发给中继，往返时间不属于该主机
+                if not server_info.relay_host:
+                    self.record_latency(server_info, timing.latency)
+                
+                if server_info.relay_host:
+                    # 中继下游主机：从汇总结果中取出该主机的数据
+                    host = data.get('hosts', {}).get(server_info.relay_host)
+                    error = self.get_relay_host_error(host)
+                    if error:
+                        if not silent_mode:
+                            self.log(f"❌ [{server_info.name}] {error}", 'error')
+                            self.report_error(server_info, error)
+                        return None
+                    data = host['data']
+                elif 'hosts' in data and 'summary' in data:
+                    # 中继服务器：逐个分发下游主机数据
+                    if not silent_mode:
+                        self.process_fleet(server_info, data)
+                    return data
+                
+                if silent_mode:
+                    return data
+                
+                return self.process_metrics(server_info, data)
+            else:
+                if not silent_mode:
+                    self.log(f"❌ [{server_info.name}] HTTP {response.status_code}", 'error')
+                    self.report_error(server_info, f"HTTP {response.status_code}")
+                return None
+                
+        except requests.exceptions.Timeout:
+            if not silent_mode:
+                self.log(f"⏱️ [{server_info.name}] 连接超时", 'error')
+                self.report_error(server_info, "连接超时")
+                self.trip_breaker(server_info, breaker)
+            return None
+        except requests.exceptions.ConnectionError:
+            if not silent_mode:
+                self.log(f"🔌 [{server_info.name}] 连接失败", 'error')
+                self.report_error(server_info, "连接失败")
+                self.trip_breaker(server_info, breaker)
+            return None
+        except Exception as e:
+            if not silent_mode:
+                self.log(f"❌ [{server_info.name}] 错误: {str(e)}", 'error')
+                self.report_error(server_info, str(e))
+                if breaker and breaker.state == CircuitBreaker.HALF_OPEN:
+                    # 探测请求出现其他错误时重新熔断，避免一直停留在半开状态
+                    self.trip_breaker(server_info, breaker)
+            return None
+        finally:
+            timing.finish()
+            if record_timing:
+                self.record_check_timing(server_info, timing)
+    
+    def get_server_key(self, server_info):
+        """服务器访问密钥，按需加载的服务器在第一次使用时才解密"""
+        key = server_info.key
+        if key is None:
+            key = server_info.key = self.db.decrypt(server_info.encrypted_key)
+        return key
+    
+    def report_error(self, server_info, error):
+        """标记服务器异常并在卡片上显示错误"""
+        server_info.health = 'error'
+        if server_info.card is not None:
+            server_info.card.set_error_status(error)
+    
+    def get_breaker(self, server_info):
+        """获取（必要时创建）服务器的熔断器"""
+        breaker = server_info.breaker
+        if breaker is None:
+            breaker = server_info.breaker = CircuitBreaker(
+                failure_threshold=self.BREAKER_FAILURES,
+                base_delay=self.BREAKER_BASE_DELAY,
+                max_delay=self.BREAKER_MAX_DELAY
+            )
+        return breaker
+    
+    def trip_breaker(self, server_info, breaker):
+        """记录一次不可达，达到阈值时熔断并在卡片上显示下次重试时间"""
+        if breaker is None:
+            return
+        delay = breaker.record_failure()
+        if delay is None:
+            return
+        self.log(f"⛔ [{server_info.name}] 连续{breaker.failures}次不可达，暂停检测 {delay:.0f} 秒后重试", 'warning')
+        server_info.health = 'paused'
+        if server_info.card is not None:
+            server_info.card.set_circuit_open(breaker.failures, breaker.retry_at)
+    
+    @staticmethod
+    def http_get(url, **kwargs):
+        """与 requests.get 相同（每次新会话），但连接使用计时适配器"""
+        with requests.Session() as session:
+            adapter = timed_adapter()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            return session.get(url, **kwargs)
+    
+    def record_latency(self, server_info, latency):
+        """记录一次请求的往返延迟（毫秒）"""
+        history = server_info.latency
+        if history is None:
+            history = server_info.latency = deque(maxlen=self.LATENCY_WINDOW)
+        history.append(latency)
+    
+    @staticmethod
+    def get_latency(server_info):
+        """最近一次响应延迟（毫秒），没有记录时返回 None"""
+        history = server_info.latency
+        return history[-1] if history else None
+    
+    def record_check_timing(self, server_info, timing):
+        """累计一次检查的分阶段耗时，更新卡片和状态栏"""
+        stats = server_info.timings
+        if stats is None:
+            stats = server_info.timings = TimingStats()
+        stats.add(timing)
+        
+        if server_info.card is not None:
+            server_info.card.set_timing(stats)
+        self.update_timing_status()
+    
+    def all_servers(self):
+        """所有服务器记录，包括中继下游主机"""
+        return self.servers + list(self.relay_hosts.values())
+    
+    def process_metrics(self, server_info, data, alert_batch=None):
+        """
+        处理一次成功获取的指标数据：更新卡片并检查告警阈值
+        :param server_info: 服务器信息
+        :param data: /metrics 返回的数据
+        :param alert_batch: 同一次响应中待评估阈值的服务器列表（中继下游主机），为 None 时立即评估
+        """
+        cpu = data['cpu']['percent']
+        memory = data['memory']['percent']
+        load = data['load'].get('load1_percent', 0)
+        disk = (data.get('disk') or {}).get('percent', ServerState.NO_DATA)
+        swap_rate = self.get_swap_rate(data)
+        pressure, server_info.pressure_resource = self.get_pressure_percent(data)
+        
+        # 响应延迟（中继下游主机由中继代为拉取，没有独立的延迟）
+        latency = self.get_latency(server_info)
+        
+        # 记录最新指标（顺序同 ServerState.METRICS），同时写入全部服务器的指标矩阵
+        server_info.metrics = array('d', (cpu, memory, load, disk, swap_rate, pressure,
+                                          ServerState.NO_DATA if latency is None else latency))
+        self.fleet_metrics.write(server_info.id, server_info.metrics)
+        server_info.health = 'ok'
+        
+        # 更新卡片数据
+        card = server_info.card
+        if card is not None:
+            started = time.perf_counter()
+            card.update_data(data)
+            if latency is not None:
+                card.update_latency(latency, TimingStats.percentile(server_info.latency, 95), self.latency_threshold)
+            timing = CheckTiming.current()
+            if timing is not None:
+                timing.add('ui', time.perf_counter() - started)
+        
+        # 检查阈值：中继下游主机在整个响应处理完后一起评估，其余立即评估
+        if alert_batch is None:
+            self.check_alerts([server_info])
+        else:
+            alert_batch.append(server_info)
+        
+        return data
+    
+    def get_threshold_vector(self):
+        """按 ServerState.METRICS 顺序的告警阈值，不告警的指标（磁盘）为无穷大"""
+        return [self.get_metric_threshold(name) if name != '磁盘' else float('inf')
+                for name in ServerState.METRICS]
+    
+    def evaluate_thresholds(self, servers):
+        """
+        在指标矩阵上一次评估一批服务器的全部指标
+        :return: 每台服务器的 (超限掩码, 上升沿掩码, 恢复掩码)，按 ServerState.METRICS 位置
+        """
+        np = get_numpy() if len(servers) >= self.VECTORIZE_MIN else None
+        return self.fleet_metrics.evaluate([server.id for server in servers], self.get_threshold_vector(), np)
+    
+    def forget_server(self, server_info):
+        """服务器被删除或地址、密钥被修改时，丢弃它在指标矩阵和告警追踪器中的记录"""
+        self.fleet_metrics.release(server_info.id)
+        self.alert_tracker.forget(server_info.id)
+    
+    def check_alerts(self, servers):
+        """
+        批量评估阈值后逐台处理告警 - 使用智能告警机制
+        超过阈值的指标（新超过或持续超过）交给 AlertTracker 验证和通知，恢复正常的指标清除告警记录
+        """
+        thresholds = self.get_threshold_vector()
+        results = self.evaluate_thresholds(servers)
+        
+        for server_info, (mask, rising, recovered) in zip(servers, results):
+            cpu, memory, load = server_info.metrics[0], server_info.metrics[1], server_info.metrics[2]
+            
+            # 清除恢复正常的指标的告警记录
+            for index, metric_name in enumerate(ServerState.METRICS):
+                if recovered >> index & 1:
+                    self.alert_tracker.clear_alerts(server_info.id, metric_name)
+            
+            if not mask:
+                # 所有指标正常
+                msg = f"✅ [{server_info.name}] CPU:{cpu:.1f}% 内存:{memory:.1f}% 负载:{load:.1f}%"
+                self.log(msg, 'success')
+                continue
+            
+            alerts = []
+            for index, metric_name in enumerate(ServerState.METRICS):
+                if not mask >> index & 1:
+                    continue
+                metric_value = server_info.metrics[index]
+                threshold = thresholds[index]
+                unit = self.METRIC_UNITS.get(metric_name, '%')
+                mark = '↑' if rising >> index & 1 else ''  # 本次新超过阈值
+                if metric_name == '压力':
+                    alerts.append(f"{mark}压力({server_info.pressure_resource}): {metric_value:.1f}%")
+                elif metric_name == '延迟':
+                    alerts.append(f"{mark}延迟: {metric_value:.0f}ms")
+                else:
+                    alerts.append(f"{mark}{metric_name}: {metric_value:.1f}{unit}")
+                
+                # 记录告警
+                self.alert_tracker.record_alert(server_info.id, metric_name, metric_value)
+                
+                # 检查是否需要验证（根据智能告警设置）
+                if self.alert_tracker.should_verify(server_info.id, metric_name):
+                    # 检查是否应该发送通知（避免重复通知）
+                    if self.alert_tracker.should_notify(server_info.id, metric_name):
+                        # 如果启用智能告警，进行连续验证
+                        if self.enable_smart_alert:
+                            self.log(f"⚠️ [{server_info.name}] 检测到{metric_name}超过阈值: {metric_value:.1f}{unit}", 'warning')
+                            
+                            verified = self.verify_alert(server_info, metric_name, metric_value)
+                            
+                            if verified:
+                                # 验证通过，发送系统通知
+                                alert_msg = f"⚠️ [{server_info.name}] {metric_name}持续超过阈值！"
+                                self.log(alert_msg, 'alert')
+                                
+                                self.show_notification(
+                                    f"🚨 服务器性能警告 - {server_info.name}",
+                                    f"{metric_name}持续超过阈值！\n当前值: {metric_value:.1f}{unit}\n阈值: {threshold}{unit}\n\n请立即检查服务器状态！"
+                                )
+                                
+                                # 标记已通知
+                                self.alert_tracker.mark_notified(server_info.id, metric_name)
+                            else:
+                                # 验证未通过，可能是瞬时波动
+                                self.log(f"ℹ️ [{server_info.name}] {metric_name}可能为瞬时波动，未发送通知", 'info')
+                        else:
+                            # 未启用智能告警，直接通知
+                            alert_msg = f"⚠️ [{server_info.name}] {metric_name}超过阈值: {metric_value:.1f}{unit}"
+                            self.log(alert_msg, 'alert')
+                            
+                            self.show_notification(
+                                f"🚨 服务器性能警告 - {server_info.name}",
+                                f"{metric_name}超过阈值！\n当前值: {metric_value:.1f}{unit}\n阈值: {threshold}{unit}\n\n请立即检查服务器状态！"
+                            )
+                            
+                            # 标记已通知
+                            self.alert_tracker.mark_notified(server_info.id, metric_name)
+            
+            # 记录当前状态
+            msg = f"⚠️ [{server_info.name}] " + ", ".join(alerts)
+            self.log(msg, 'warning')
+    
+    def apply_metrics_delta(self, server_info, delta):
+        """
+        把增量响应合并到本地保存的完整数据上
+        :return: 合并后的完整数据，基准版本不一致时返回 None
+        """
+        base_version, base = server_info.metrics_version, server_info.metrics_data
+        server_info.metrics_version = server_info.metrics_data = None
+        if not base or base_version != delta.get('base_version'):
+            return None
+        
+        data = copy.deepcopy(base)
+        self.merge_metrics(data, delta.get('changed', {}))
+        for path in delta.get('removed', []):
+            node = data
+            for key in path[:-1]:
+                node = node.get(key, {})
+            node.pop(path[-1], None)
+        data['version'] = delta['version']
+        data['timestamp'] = delta.get('timestamp', data.get('timestamp'))
+        server_info.metrics_version, server_info.metrics_data = data['version'], data
+        return data
+    
+    @staticmethod
+    def merge_metrics(base, changed):
+        """递归合并变化的字段"""
+        for key, value in changed.items():
+            if isinstance(value, dict) and isinstance(base.get(key), dict):
+                MonitorEngine.merge_metrics(base[key], value)
+            else:
+                base[key] = value
+    
+    def get_relay_host_info(self, relay_info, host_name):
+        """获取中继下游主机的服务器信息（同一主机始终返回同一对象）"""
+        url = f"{relay_info.url}#{host_name}"
+        sub_info = self.relay_hosts.get(url)
+        if sub_info is None:
+            sub_info = self.relay_hosts[url] = ServerState(
+                f"{relay_info.name}/{host_name}", url,
+                relay_url=relay_info.url, relay_host=host_name
+            )
+        sub_info.key = self.get_server_key(relay_info)
+        return sub_info
+    
+    @staticmethod
+    def get_relay_host_error(host):
+        """检查中继下游主机数据是否可用，不可用时返回错误描述"""
+        if not host:
+            return "中继无该主机数据"
+        if host.get('status') != 'ok' or not host.get('data'):
+            return host.get('error') or "等待中继数据"
+        if host.get('stale'):
+            return "中继数据已过期"
+        return None
+    
+    def process_fleet(self, relay_info, fleet):
+        """处理中继汇总数据：每个下游主机按普通服务器更新卡片，全部更新后一起评估告警"""
+        summary = fleet.get('summary', {})
+        relay_info.health = 'ok'
+        if relay_info.card is not None:
+            relay_info.card.set_relay_summary(summary)
+        self.log(f"🛰️ [{relay_info.name}] 中继汇总: 共{summary.get('total', 0)}台, "
+                 f"正常{summary.get('ok', 0)}台, 异常{summary.get('error', 0)}台", 'info')
+        
+        alert_batch = []
+        for host_name, host in fleet.get('hosts', {}).items():
+            sub_info = self.get_relay_host_info(relay_info, host_name)
+            if sub_info.card is None:
+                self.create_server_card(sub_info)
+            
+            error = self.get_relay_host_error(host)
+            if error:
+                self.log(f"❌ [{sub_info.name}] {error}", 'error')
+                self.report_error(sub_info, error)
+            else:
+                self.process_metrics(sub_info, host['data'], alert_batch)
+        self.check_alerts(alert_batch)
+    
+    def monitor_loop(self):
+        """监控循环"""
+        self.log("="*80, 'info')
+        self.log("🚀 开始服务器性能监控...", 'info')
+        self.log(f"📊 监控服务器数量: {len(self.servers)}", 'info')
+        self.log(f"⏱️  检测间隔: {self.check_interval}秒", 'info')
+        
+        if self.enable_smart_alert:
+            self.log(f"🧠 智能告警: 已启用", 'info')
+            self.log(f"   ├─ 时间窗口: {self.alert_time_window}秒 ({self.alert_time_window//60}分钟)", 'info')
+            self.log(f"   ├─ 验证机制: 检测到超阈值 → 连续{self.verify_count}次验证(每{self.verify_interval}秒一次) → 全部超过才通知", 'info')
+            self.log(f"   └─ 防重复: 时间窗口内同一指标不会重复通知", 'info')
+        else:
+            self.log(f"🧠 智能告警: 已禁用 (检测到超阈值立即通知)", 'warning')
+        
+        self.log(f"🔒 数据库加密: 已启用", 'info')
+        self.log("="*80, 'info')
+        
+        while self.monitoring:
+            self.check_all_servers()
+            
+            if self.monitoring:
+                self.log(f"⏸️ 等待 {self.check_interval} 秒后继续下一轮检测...", 'info')
+                time.sleep(self.check_interval)
+                
+        self.log("⏹️ 监控已停止", 'warning')
+    
+    def check_all_servers(self):
+        """检查所有服务器（一轮）"""
+        for server_info in self.servers[:]:
+            if not self.monitoring:
+                break
+            self.check_server(server_info)
@@ -0,0 +1,124 @@
+# monitord.py - 服务器性能监控后台守护进程（无图形界面，适合在 Linux 服务器上以 systemd 服务运行）
+"""
+与桌面客户端使用同一个数据库(server_monitor.db)和密钥文件(monitor.key)，
+共享同一套轮询、熔断、增量拉取和智能告警逻辑，不加载 tkinter / PIL / pystray / plyer。
+告警写入日志，也可以通过 --notify-cmd 交给外部命令（邮件、IM 机器人等）发送，
+命令通过环境变量 MONITOR_ALERT_TITLE / MONITOR_ALERT_MESSAGE 获取告警内容。
+
+示例:
+    python3 monitord.py --db /opt/monitor/server_monitor.db --key /opt/monitor/monitor.key \\
+        --log-file /var/log/monitord.log --notify-cmd /opt/monitor/notify.sh
+
+systemd 单元示例:
+    [Service]
+    WorkingDirectory=/opt/monitor
+    ExecStart=/usr/bin/python3 /opt/monitor/monitord.py
+    Restart=always
+"""
+import argparse
+import logging
+import os
+import signal
+import subprocess
+import sys
+
+from monitor_core import DatabaseManager, MonitorEngine
+
+# 引擎日志级别到 logging 级别
+LOG_LEVELS = {
+    'info': logging.INFO,
+    'success': logging.INFO,
+    'verify': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+    'alert': logging.CRITICAL
+}
+
+
+class MonitorDaemon(MonitorEngine):
+    """无界面的监控进程：日志写入 logging，告警写日志并可调用外部命令"""
+
+    def __init__(self, db, logger, notify_cmd=None):
+        super().__init__(db)
+        self.logger = logger
+        self.notify_cmd = notify_cmd
+
+    def log(self, message, level='info'):
+        """记录日志"""
+        self.logger.log(LOG_LEVELS.get(level, logging.INFO), message)
+
+    def show_notification(self, title, message):
+        """告警写日志，并交给外部命令发送"""
+        self.logger.critical("%s | %s", title, message.replace('\n', ' '))
+        if not self.notify_cmd:
+            return
+        env = dict(os.environ, MONITOR_ALERT_TITLE=title, MONITOR_ALERT_MESSAGE=message)
+        try:
+            subprocess.run(self.notify_cmd, shell=True, env=env, timeout=30, check=False)
+        except (OSError, subprocess.SubprocessError) as e:
+            self.logger.error("告警命令执行失败: %s", e)
+
+    def load(self):
+        """从数据库加载监控参数和服务器列表"""
+        settings = self.db.get_all_settings()
+        if settings:
+            self.apply_settings(settings)
+        self.servers = self.db.get_all_servers()
+        self.log(f"✅ 已从数据库加载 {len(self.servers)} 个服务器配置", 'success')
+
+
+def setup_logger(log_file, level):
+    logger = logging.getLogger('monitord')
+    handler = logging.FileHandler(log_file, encoding='utf-8') if log_file else logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s %(message)s', '%Y-%m-%d %H:%M:%S'))
+    logger.addHandler(handler)
+    logger.setLevel(getattr(logging, level.upper()))
+    return logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Server Monitor headless daemon')
+    parser.add_argument('--db', default='server_monitor.db', help='database file shared with the desktop client')
+    parser.add_argument('--key', default='monitor.key', help='encryption key file shared with the desktop client')
+    parser.add_argument('--log-file', help='append logs to this file instead of stdout')
+    parser.add_argument('--log-level', default='info', choices=['debug', 'info', 'warning', 'error', 'critical'])
+    parser.add_argument('--interval', type=int, help='override the check interval (seconds)')
+    parser.add_argument('--notify-cmd', help='shell command run for each alert')
+    parser.add_argument('--once', action='store_true', help='check all servers once and exit')
+    args = parser.parse_args()
+
+    # 密钥文件缺失时 DatabaseManager 会生成新密钥，已有的服务器密钥将无法解密
+    if not os.path.exists(args.key):
+        print(f"密钥文件不存在: {args.key}", file=sys.stderr)
+        return 1
+    if not os.path.exists(args.db):
+        print(f"数据库文件不存在: {args.db}", file=sys.stderr)
+        return 1
+
+    logger = setup_logger(args.log_file, args.log_level)
+    daemon = MonitorDaemon(DatabaseManager(args.db, args.key), logger, args.notify_cmd)
+    daemon.load()
+    if args.interval:
+        daemon.check_interval = args.interval
+    if not daemon.servers:
+        daemon.log("❌ 数据库中没有服务器配置", 'error')
+        return 1
+
+    def stop(signum, frame):
+        daemon.monitoring = False
+        daemon.log(f"⏹️ 收到信号 {signum}，监控已停止", 'warning')
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    daemon.monitoring = True
+    if args.once:
+        daemon.check_all_servers()
+    else:
+        daemon.monitor_loop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -330,6 +330,7 @@ upgrade_installation() {
     # 创建优化版的 server.py
     print_step "更新 Python 脚本..."
     create_optimized_server_script
+    create_benchmark_script
     
     # 重启服务
     if systemctl is-active --quiet ${SERVICE_NAME}; then
@@ -354,7 +355,10 @@ upgrade_installation() {
 create_optimized_server_script() {
     cat > ${INSTALL_DIR}/server.py << 'EOFPYTHON'
 # server.py - 优化版服务器性能监控 API (兼容 Python 3.4+)
+import copy
+import importlib.util
 import json
+import math
 import platform
 import socket
 import os
@@ -364,14 +368,114 @@ from datetime import datetime
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from socketserver import ThreadingMixIn
 import urllib.parse
-from threading import Lock
+import http.client
+import mmap
+import queue
+import random
+import signal
+import struct
+from collections import deque
+from threading import Lock, Thread
+from concurrent.futures import ThreadPoolExecutor
 
 class SystemMonitor:
     """系统监控类 - 优化版"""
     
+    # procfs 根目录与 statvfs 实现，微基准测试时替换为固定的 /proc 样本树
+    PROC_ROOT = os.environ.get('PROC_ROOT', '/proc')
+    statvfs = staticmethod(os.statvfs)
+
     _cpu_cache = {'value': 0.0, 'timestamp': 0, 'lock': Lock()}
     _cache_duration = 1.0  # 缓存1秒
-    
+
+    # /proc/meminfo 与 /proc/vmstat 的行号索引（同一次开机内行序固定，只构建一次）
+    _proc_index = {}
+    _index_lock = Lock()
+    _vmstat_cache = {'pswpin': 0, 'pswpout': 0, 'timestamp': 0,
+                     'swapin_rate': 0.0, 'swapout_rate': 0.0, 'lock': Lock()}
+
+    MEMINFO_KEYS = (
+        'MemTotal', 'MemFree', 'MemAvailable', 'Buffers', 'Cached',
+        'SwapCached', 'SwapTotal', 'SwapFree', 'Dirty', 'Writeback',
+        'Shmem', 'Slab', 'SReclaimable', 'SUnreclaim',
+        'HugePages_Total', 'HugePages_Free', 'HugePages_Rsvd', 'Hugepagesize'
+    )
+    VMSTAT_KEYS = ('pswpin', 'pswpout')
+
+    @staticmethod
+    def _read_proc_fields(path, keys, separator=':'):
+        """
+        单次遍历读取 /proc 键值文件
+        首次调用时记录每个键所在的行号，之后直接按行号取值；
+        若行号处的键名不匹配（例如内核升级后重启），则重建索引
+        """
+        with open(path, 'r') as f:
+            lines = f.read().splitlines()
+
+        index = SystemMonitor._proc_index.get(path)
+        values = {}
+        if index is not None:
+            for key, lineno in index.items():
+                if lineno >= len(lines):
+                    index = None
+                    break
+                name, _, rest = lines[lineno].partition(separator)
+                if name.strip() != key:
+                    index = None
+                    break
+                values[key] = rest
+
+        if index is None:
+            wanted = set(keys)
+            index = {}
+            values = {}
+            for lineno, line in enumerate(lines):
+                name, _, rest = line.partition(separator)
+                name = name.strip()
+                if name in wanted:
+                    index[name] = lineno
+                    values[name] = rest
+            with SystemMonitor._index_lock:
+                SystemMonitor._proc_index[path] = index
+
+        result = {}
+        for key, rest in values.items():
+            parts = rest.split()
+            if not parts:
+                continue
+            value = int(parts[0])
+            if len(parts) > 1 and parts[1] == 'kB':
+                value *= 1024
+            result[key] = value
+        return result
+
+    @staticmethod
+    def get_swap_rates():
+        """获取换入/换出速率（页/秒），基于 /proc/vmstat 的增量计算"""
+        cache = SystemMonitor._vmstat_cache
+        try:
+            now = time.time()
+            with cache['lock']:
+                if now - cache['timestamp'] < SystemMonitor._cache_duration:
+                    return cache['swapin_rate'], cache['swapout_rate']
+
+                vmstat = SystemMonitor._read_proc_fields(f'{SystemMonitor.PROC_ROOT}/vmstat', SystemMonitor.VMSTAT_KEYS, separator=' ')
+                pswpin = vmstat.get('pswpin', 0)
+                pswpout = vmstat.get('pswpout', 0)
+
+                if cache['timestamp'] > 0:
+                    elapsed = now - cache['timestamp']
+                    cache['swapin_rate'] = round(max(0, pswpin - cache['pswpin']) / elapsed, 2)
+                    cache['swapout_rate'] = round(max(0, pswpout - cache['pswpout']) / elapsed, 2)
+
+                cache['pswpin'] = pswpin
+                cache['pswpout'] = pswpout
+                cache['timestamp'] = now
+                return cache['swapin_rate'], cache['swapout_rate']
+        except Exception as e:
+            print(f"Vmstat Error: {e}", file=sys.stderr)
+            return 0.0, 0.0
+
     @staticmethod
     def get_cpu_percent():
         """获取CPU使用率 - 带缓存优化"""
@@ -383,13 +487,13 @@ class SystemMonitor:
                     return SystemMonitor._cpu_cache['value']
                 
                 if platform.system() == "Linux":
-                    with open('/proc/stat', 'r') as f:
+                    with open(f'{SystemMonitor.PROC_ROOT}/stat', 'r') as f:
                         line = f.readline()
                     cpu_times1 = [int(x) for x in line.split()[1:8]]
                     
                     time.sleep(0.05)  # 减少等待时间从0.1到0.05
                     
-                    with open('/proc/stat', 'r') as f:
+                    with open(f'{SystemMonitor.PROC_ROOT}/stat', 'r') as f:
                         line = f.readline()
                     cpu_times2 = [int(x) for x in line.split()[1:8]]
                     
@@ -416,28 +520,36 @@ class SystemMonitor:
             print(f"CPU Error: {e}", file=sys.stderr)
             return 0.0
     
+    @staticmethod
+    def get_cpu_info():
+        """获取CPU使用率与核心数"""
+        return {
+            'percent': SystemMonitor.get_cpu_percent(),
+            'count': os.cpu_count() or 1
+        }
+    
     @staticmethod
     def get_memory_info():
         """获取内存信息"""
         try:
             if platform.system() == "Linux":
-                with open('/proc/meminfo', 'r') as f:
-                    lines = f.readlines()
-                
-                mem_info = {}
-                for line in lines[:10]:  # 只读前10行，提高效率
-                    parts = line.split(':')
-                    if len(parts) == 2:
-                        key = parts[0].strip()
-                        value_str = parts[1].strip().split()[0]
-                        value = int(value_str) * 1024
-                        mem_info[key] = value
-                
+                mem_info = SystemMonitor._read_proc_fields(f'{SystemMonitor.PROC_ROOT}/meminfo', SystemMonitor.MEMINFO_KEYS)
+
                 total = mem_info.get('MemTotal', 0)
-                available = mem_info.get('MemAvailable', 0)
+                free = mem_info.get('MemFree', 0)
+                buffers = mem_info.get('Buffers', 0)
+                cached = mem_info.get('Cached', 0)
+                # 旧内核 (<3.14) 没有 MemAvailable，退化为 free + buffers + cached
+                available = mem_info.get('MemAvailable', free + buffers + cached)
                 used = total - available
                 percent = (used / total * 100) if total > 0 else 0
-                
+
+                swap_total = mem_info.get('SwapTotal', 0)
+                swap_free = mem_info.get('SwapFree', 0)
+                swap_used = swap_total - swap_free
+                swap_percent = (swap_used / swap_total * 100) if swap_total > 0 else 0
+                swapin_rate, swapout_rate = SystemMonitor.get_swap_rates()
+
                 return {
                     'total': total,
                     'used': used,
@@ -445,7 +557,33 @@ class SystemMonitor:
                     'percent': round(percent, 2),
                     'total_gb': round(total / (1024**3), 2),
                     'used_gb': round(used / (1024**3), 2),
-                    'available_gb': round(available / (1024**3), 2)
+                    'available_gb': round(available / (1024**3), 2),
+                    'free': free,
+                    'buffers': buffers,
+                    'cached': cached,
+                    'shmem': mem_info.get('Shmem', 0),
+                    'dirty': mem_info.get('Dirty', 0),
+                    'writeback': mem_info.get('Writeback', 0),
+                    'slab': mem_info.get('Slab', 0),
+                    'slab_reclaimable': mem_info.get('SReclaimable', 0),
+                    'slab_unreclaimable': mem_info.get('SUnreclaim', 0),
+                    'swap': {
+                        'total': swap_total,
+                        'used': swap_used,
+                        'free': swap_free,
+                        'cached': mem_info.get('SwapCached', 0),
+                        'percent': round(swap_percent, 2),
+                        'total_gb': round(swap_total / (1024**3), 2),
+                        'used_gb': round(swap_used / (1024**3), 2),
+                        'swapin_rate': swapin_rate,
+                        'swapout_rate': swapout_rate
+                    },
+                    'hugepages': {
+                        'total': mem_info.get('HugePages_Total', 0),
+                        'free': mem_info.get('HugePages_Free', 0),
+                        'reserved': mem_info.get('HugePages_Rsvd', 0),
+                        'page_size': mem_info.get('Hugepagesize', 0)
+                    }
                 }
             
             return {'error': 'Platform not supported'}
@@ -459,7 +597,7 @@ class SystemMonitor:
         """获取磁盘信息"""
         try:
             path = "/" if platform.system() != "Windows" else "C:\\"
-            stat = os.statvfs(path)
+            stat = SystemMonitor.statvfs(path)
             total = stat.f_blocks * stat.f_frsize
             free = stat.f_bavail * stat.f_frsize
             used = total - free
@@ -483,7 +621,11 @@ class SystemMonitor:
         """获取系统负载"""
         try:
             if platform.system() != 'Windows':
-                load1, load5, load15 = os.getloadavg()
+                if platform.system() == 'Linux':
+                    with open(f'{SystemMonitor.PROC_ROOT}/loadavg', 'r') as f:
+                        load1, load5, load15 = (float(x) for x in f.read().split()[:3])
+                else:
+                    load1, load5, load15 = os.getloadavg()
                 cpu_count = os.cpu_count() or 1
                 
                 return {
@@ -508,9 +650,1399 @@ class SystemMonitor:
             print(f"Load Error: {e}", file=sys.stderr)
             return {'error': str(e)}
 
+    PSI_RESOURCES = ('cpu', 'memory', 'io')
+    _psi_supported = None
+
+    @staticmethod
+    def get_pressure_raw():
+        """
+        读取 /proc/pressure/{cpu,memory,io} (PSI, Linux 4.20+)
+        内核不支持或以 psi=0 启动时返回 None，之后不再重复尝试
+        """
+        if SystemMonitor._psi_supported is False:
+            return None
+        try:
+            result = {}
+            for resource in SystemMonitor.PSI_RESOURCES:
+                with open(f'{SystemMonitor.PROC_ROOT}/pressure/{resource}', 'r') as f:
+                    lines = f.read().splitlines()
+                stats = {}
+                for line in lines:
+                    parts = line.split()
+                    if not parts:
+                        continue
+                    fields = {}
+                    for item in parts[1:]:
+                        name, _, value = item.partition('=')
+                        fields[name] = int(value) if name == 'total' else float(value)
+                    stats[parts[0]] = fields
+                result[resource] = stats
+            SystemMonitor._psi_supported = True
+            return result
+        except (OSError, ValueError) as e:
+            if SystemMonitor._psi_supported is None:
+                print(f"PSI not available: {e}", file=sys.stderr)
+            SystemMonitor._psi_supported = False
+            return None
+
+    _cores_cache = {'prev': {}, 'lock': Lock()}
+
+    @staticmethod
+    def get_cpu_cores():
+        """获取每个核心的使用率，基于相邻两次调用之间 /proc/stat 的增量"""
+        cache = SystemMonitor._cores_cache
+        cores = {}
+        with open(f'{SystemMonitor.PROC_ROOT}/stat', 'r') as f:
+            for line in f:
+                if not line.startswith('cpu'):
+                    break
+                parts = line.split()
+                if parts[0] == 'cpu':
+                    continue
+                times = [int(x) for x in parts[1:8]]
+                cores[parts[0]] = (sum(times), times[3] + times[4])
+
+        result = {}
+        with cache['lock']:
+            prev = cache['prev']
+            for name, (total, idle) in cores.items():
+                percent = 0.0
+                if name in prev:
+                    d_total = total - prev[name][0]
+                    d_idle = idle - prev[name][1]
+                    if d_total > 0:
+                        percent = round(100.0 * (d_total - d_idle) / d_total, 2)
+                result[name] = percent
+            cache['prev'] = cores
+        return {'count': len(result), 'cores': result}
+
+    _net_cache = {'prev': {}, 'timestamp': 0, 'lock': Lock()}
+
+    @staticmethod
+    def get_network_info():
+        """获取各网卡（不含 lo）的累计流量与收发速率（字节/秒）"""
+        cache = SystemMonitor._net_cache
+        now = time.time()
+        counters = {}
+        with open(f'{SystemMonitor.PROC_ROOT}/net/dev', 'r') as f:
+            for line in f.readlines()[2:]:
+                name, _, rest = line.partition(':')
+                name = name.strip()
+                if name == 'lo':
+                    continue
+                fields = [int(x) for x in rest.split()]
+                counters[name] = {
+                    'rx_bytes': fields[0], 'rx_packets': fields[1],
+                    'rx_errors': fields[2], 'rx_dropped': fields[3],
+                    'tx_bytes': fields[8], 'tx_packets': fields[9],
+                    'tx_errors': fields[10], 'tx_dropped': fields[11]
+                }
+
+        with cache['lock']:
+            elapsed = now - cache['timestamp']
+            prev = cache['prev']
+            rx_total = tx_total = 0.0
+            for name, entry in counters.items():
+                rx_rate = tx_rate = 0.0
+                if name in prev and cache['timestamp'] > 0 and elapsed > 0:
+                    rx_rate = round(max(0, entry['rx_bytes'] - prev[name]['rx_bytes']) / elapsed, 2)
+                    tx_rate = round(max(0, entry['tx_bytes'] - prev[name]['tx_bytes']) / elapsed, 2)
+                entry['rx_rate'] = rx_rate
+                entry['tx_rate'] = tx_rate
+                rx_total += rx_rate
+                tx_total += tx_rate
+            cache['prev'] = counters
+            cache['timestamp'] = now
+        return {'rx_rate': round(rx_total, 2), 'tx_rate': round(tx_total, 2), 'interfaces': counters}
+
+    # 不统计容量的伪文件系统
+    PSEUDO_FS = {
+        'proc', 'sysfs', 'devtmpfs', 'devpts', 'tmpfs', 'cgroup', 'cgroup2', 'securityfs',
+        'pstore', 'bpf', 'debugfs', 'tracefs', 'mqueue', 'hugetlbfs', 'configfs', 'fusectl',
+        'autofs', 'binfmt_misc', 'rpc_pipefs', 'nsfs', 'squashfs', 'overlay', 'ramfs', 'efivarfs'
+    }
+
+    @staticmethod
+    def get_mounts():
+        """获取所有真实文件系统挂载点的容量与 inode 使用情况（同一设备只统计一次）"""
+        mounts = []
+        seen = set()
+        with open(f'{SystemMonitor.PROC_ROOT}/mounts', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3 or parts[2] in SystemMonitor.PSEUDO_FS or parts[0] in seen:
+                    continue
+                # /proc/mounts 中空格等字符以八进制转义
+                mountpoint = parts[1].replace('\\040', ' ')
+                try:
+                    stat = SystemMonitor.statvfs(mountpoint)
+                except OSError:
+                    continue
+                seen.add(parts[0])
+                total = stat.f_blocks * stat.f_frsize
+                free = stat.f_bavail * stat.f_frsize
+                used = total - stat.f_bfree * stat.f_frsize
+                mounts.append({
+                    'device': parts[0],
+                    'mountpoint': mountpoint,
+                    'fstype': parts[2],
+                    'total': total,
+                    'used': used,
+                    'free': free,
+                    'percent': round(used / (used + free) * 100, 2) if used + free > 0 else 0,
+                    'inodes_percent': round((stat.f_files - stat.f_ffree) / stat.f_files * 100, 2) if stat.f_files else 0
+                })
+        return {'count': len(mounts), 'mounts': mounts}
+
+    PROCESS_STATES = {'R': 'running', 'S': 'sleeping', 'D': 'disk_sleep', 'Z': 'zombie', 'T': 'stopped', 't': 'stopped', 'I': 'idle'}
+
+    @staticmethod
+    def get_process_stats(top_n=5):
+        """统计进程状态与线程总数，并列出常驻内存最大的 top_n 个进程"""
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        states = {'running': 0, 'sleeping': 0, 'disk_sleep': 0, 'zombie': 0, 'stopped': 0, 'idle': 0, 'other': 0}
+        threads = 0
+        total = 0
+        biggest = []
+        for entry in os.scandir(SystemMonitor.PROC_ROOT):
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f'{SystemMonitor.PROC_ROOT}/{entry.name}/stat', 'rb') as f:
+                    raw = f.read().decode('utf-8', 'replace')
+            except OSError:
+                continue
+            # 进程名可能包含空格和括号，以最后一个 ')' 为界
+            head, _, rest = raw.rpartition(')')
+            fields = rest.split()
+            if len(fields) < 22:
+                continue
+            total += 1
+            states[SystemMonitor.PROCESS_STATES.get(fields[0], 'other')] += 1
+            threads += int(fields[17])
+            biggest.append((int(fields[21]) * page_size, int(entry.name), head.partition('(')[2]))
+        biggest.sort(reverse=True)
+        return {
+            'total': total,
+            'threads': threads,
+            'states': states,
+            'top_rss': [{'pid': pid, 'name': name, 'rss': rss} for rss, pid, name in biggest[:top_n]]
+        }
+
+
+class CgroupCollector:
+    """
+    cgroup v2 / systemd 单元资源采集
+    - CGROUP_UNITS: 逗号分隔的单元名（如 nginx.service），为空则按 CPU 占用取前 CGROUP_TOP_N 个
+    - 单元目录的文件描述符与上一次的计数器都会缓存，每次采样只读取 cpu.stat / memory.* / io.stat
+    - 目录树每 CGROUP_RESCAN_INTERVAL 秒重新扫描一次，发现新增或消失的单元
+    """
+
+    UNIT_SUFFIXES = ('.service', '.scope')
+
+    def __init__(self, root=None, units=None, top_n=None, rescan_interval=None):
+        self.root = root or os.environ.get('CGROUP_ROOT') or self._detect_root()
+        if units is None:
+            units = os.environ.get('CGROUP_UNITS', '')
+        self.units = [u.strip() for u in units.split(',') if u.strip()]
+        self.top_n = top_n if top_n is not None else int(os.environ.get('CGROUP_TOP_N', 5))
+        if rescan_interval is None:
+            rescan_interval = float(os.environ.get('CGROUP_RESCAN_INTERVAL', 60))
+        self.rescan_interval = rescan_interval
+        self._dir_fds = {}   # {相对路径: 目录 fd}
+        self._prev = {}      # {相对路径: (timestamp, usage_usec, rbytes, wbytes)}
+        self._last_scan = 0
+
+    @staticmethod
+    def _detect_root():
+        """定位 cgroup v2 挂载点（纯 v2 或混合模式下的 unified）"""
+        for path in ('/sys/fs/cgroup', '/sys/fs/cgroup/unified'):
+            if os.path.exists(os.path.join(path, 'cgroup.controllers')):
+                return path
+        return None
+
+    def _scan(self):
+        """扫描目录树，刷新单元到目录 fd 的映射"""
+        found = set()
+        for dirpath, dirnames, _ in os.walk(self.root):
+            rel = os.path.relpath(dirpath, self.root)
+            name = os.path.basename(dirpath)
+            if self.units:
+                if name in self.units:
+                    found.add(rel)
+            elif name.endswith(self.UNIT_SUFFIXES):
+                found.add(rel)
+                dirnames[:] = []  # 单元内部的子 cgroup 已计入单元本身
+
+        for rel in list(self._dir_fds):
+            if rel not in found:
+                self._forget(rel)
+        for rel in found:
+            if rel not in self._dir_fds:
+                try:
+                    self._dir_fds[rel] = os.open(os.path.join(self.root, rel), os.O_RDONLY | os.O_DIRECTORY)
+                except OSError:
+                    pass
+        self._last_scan = time.time()
+
+    def _forget(self, rel):
+        fd = self._dir_fds.pop(rel, None)
+        self._prev.pop(rel, None)
+        if fd is not None:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _read_at(dir_fd, filename):
+        """通过缓存的目录 fd 读取文件，缺失的控制器文件返回 None"""
+        try:
+            fd = os.open(filename, os.O_RDONLY, dir_fd=dir_fd)
+        except FileNotFoundError:
+            return None
+        try:
+            return os.read(fd, 65536).decode()
+        finally:
+            os.close(fd)
+
+    def _read_unit(self, rel, dir_fd, now):
+        usage_usec = 0
+        text = self._read_at(dir_fd, 'cpu.stat')
+        if text is None:
+            # cpu.stat 是 cgroup v2 的核心文件，读不到说明目录已被删除
+            raise FileNotFoundError(rel)
+        for line in text.splitlines():
+            if line.startswith('usage_usec '):
+                usage_usec = int(line.split()[1])
+                break
+
+        text = self._read_at(dir_fd, 'memory.current')
+        memory_current = int(text) if text else 0
+        text = self._read_at(dir_fd, 'memory.max')
+        memory_max = int(text) if text and text.strip() != 'max' else None
+
+        rbytes = wbytes = 0
+        text = self._read_at(dir_fd, 'io.stat')
+        if text:
+            for line in text.splitlines():
+                for item in line.split()[1:]:
+                    key, _, value = item.partition('=')
+                    if key == 'rbytes':
+                        rbytes += int(value)
+                    elif key == 'wbytes':
+                        wbytes += int(value)
+
+        cpu_percent = io_read_rate = io_write_rate = 0.0
+        prev = self._prev.get(rel)
+        if prev and now > prev[0]:
+            elapsed = now - prev[0]
+            cpu_percent = max(0, usage_usec - prev[1]) / (elapsed * 1e6) * 100
+            io_read_rate = max(0, rbytes - prev[2]) / elapsed
+            io_write_rate = max(0, wbytes - prev[3]) / elapsed
+        self._prev[rel] = (now, usage_usec, rbytes, wbytes)
+
+        return {
+            'name': os.path.basename(rel),
+            'path': '/' + rel,
+            'cpu_percent': round(cpu_percent, 2),
+            'cpu_usage_usec': usage_usec,
+            'memory_current': memory_current,
+            'memory_max': memory_max,
+            'memory_percent': round(memory_current / memory_max * 100, 2) if memory_max else None,
+            'io_read_bytes': rbytes,
+            'io_write_bytes': wbytes,
+            'io_read_rate': round(io_read_rate, 2),
+            'io_write_rate': round(io_write_rate, 2)
+        }
+
+    def collect(self):
+        """采集所有单元，返回按 CPU 占用排序的结果"""
+        if not self.root:
+            return {'available': False}
+
+        now = time.time()
+        if now - self._last_scan >= self.rescan_interval:
+            self._scan()
+
+        units = []
+        for rel, dir_fd in list(self._dir_fds.items()):
+            try:
+                units.append(self._read_unit(rel, dir_fd, now))
+            except (OSError, ValueError):
+                # 单元已停止，cgroup 目录被删除
+                self._forget(rel)
+
+        units.sort(key=lambda u: u['cpu_percent'], reverse=True)
+        if not self.units:
+            units = units[:self.top_n]
+        return {'available': True, 'root': self.root, 'units': units}
+
+
+class RelayPoller:
+    """
+    中继模式 - 并发轮询下游 Agent，缓存各自最新快照供 /fleet/metrics 汇总输出
+    下游列表来自 RELAY_TARGETS_FILE，每行: 名称 地址 密钥（# 开头为注释）
+    每个下游保持一条 HTTP/1.1 长连接，出错时关闭并在下一轮重建
+    """
+
+    def __init__(self, targets, interval=None, concurrency=None, timeout=None):
+        self.targets = targets
+        self.interval = interval if interval is not None else float(os.environ.get('RELAY_INTERVAL', 5))
+        self.timeout = timeout if timeout is not None else float(os.environ.get('RELAY_TIMEOUT', 5))
+        if concurrency is None:
+            concurrency = int(os.environ.get('RELAY_CONCURRENCY', 16))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(targets))))
+        self._connections = {}
+        self._lock = Lock()
+        self._results = {}
+
+    @classmethod
+    def from_env(cls):
+        """根据配置创建中继，未配置下游时返回 None"""
+        path = os.environ.get('RELAY_TARGETS_FILE', '')
+        if not path or not os.path.exists(path):
+            return None
+        targets = cls.load_targets(path)
+        return cls(targets) if targets else None
+
+    @staticmethod
+    def load_targets(path):
+        """读取下游列表"""
+        targets = []
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                parts = line.split()
+                if len(parts) < 3:
+                    print(f"Relay: invalid target line: {line}", file=sys.stderr)
+                    continue
+                name, url, key = parts[0], parts[1], parts[2]
+                if not url.startswith(('http://', 'https://')):
+                    url = 'http://' + url
+                targets.append({'name': name, 'url': url.rstrip('/'), 'key': key})
+        return targets
+
+    def start(self):
+        """启动轮询线程"""
+        thread = Thread(target=self._run, name='relay', daemon=True)
+        thread.start()
+        return thread
+
+    def _run(self):
+        while True:
+            started = time.time()
+            try:
+                list(self._executor.map(self._poll, self.targets))
+            except Exception as e:
+                print(f"Relay Error: {e}", file=sys.stderr)
+            time.sleep(max(0.1, self.interval - (time.time() - started)))
+
+    def _connect(self, target):
+        parts = urllib.parse.urlsplit(target['url'])
+        if parts.scheme == 'https':
+            conn = http.client.HTTPSConnection(parts.hostname, parts.port or 443, timeout=self.timeout)
+        else:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=self.timeout)
+        return conn, parts.path
+
+    def _poll(self, target):
+        """轮询单个下游（每个下游同一时刻只有一个线程访问其连接）"""
+        name = target['name']
+        started = time.time()
+        status, error, data = 'ok', None, None
+        # 已有带版本号的快照时请求增量数据
+        with self._lock:
+            previous = (self._results.get(name) or {}).get('data')
+        path = '/metrics'
+        if previous and previous.get('version'):
+            path += f"?since_version={previous['version']}"
+        # 复用的长连接可能已被对端关闭，此时重建连接重试一次
+        reused = name in self._connections
+        for attempt in range(2 if reused else 1):
+            conn, base_path = self._connections.pop(name, None) or self._connect(target)
+            status, error, data = 'ok', None, None
+            try:
+                conn.request('GET', base_path + path,
+                             headers={'Authorization': f"Bearer {target['key']}"})
+                response = conn.getresponse()
+                body = response.read()
+                if response.status == 200:
+                    data = json.loads(body.decode('utf-8'))
+                    if data.get('delta'):
+                        data = self._apply_delta(previous, data)
+                elif response.status == 401:
+                    status, error = 'unauthorized', 'HTTP 401'
+                else:
+                    status, error = 'error', f'HTTP {response.status}'
+                if response.will_close:
+                    conn.close()
+                else:
+                    self._connections[name] = (conn, base_path)
+                break
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                conn.close()
+                status, error = 'error', str(e) or e.__class__.__name__
+
+        now = time.time()
+        with self._lock:
+            entry = self._results.setdefault(name, {'url': target['url'], 'data': None, 'updated_at': None})
+            entry['status'] = status
+            entry['error'] = error
+            entry['last_attempt'] = now
+            entry['latency_ms'] = round((now - started) * 1000, 1)
+            if data is not None:
+                entry['data'] = data
+                entry['updated_at'] = now
+
+    @staticmethod
+    def _apply_delta(previous, delta):
+        """把增量响应合并到上一份快照的副本上"""
+        if previous is None or previous.get('version') != delta.get('base_version'):
+            raise ValueError('delta base version mismatch')
+        data = SnapshotHistory.merge(copy.deepcopy(previous), delta['changed'], delta['removed'])
+        data['version'] = delta['version']
+        data['timestamp'] = delta['timestamp']
+        data['delta'] = False
+        return data
+
+    def fleet(self):
+        """汇总结果：每个下游的最新快照、新鲜度与错误状态"""
+        now = time.time()
+        stale_after = self.interval * 3
+        hosts = {}
+        summary = {'total': len(self.targets), 'ok': 0, 'error': 0, 'stale': 0}
+        with self._lock:
+            for target in self.targets:
+                entry = self._results.get(target['name'])
+                if entry is None:
+                    hosts[target['name']] = {'url': target['url'], 'status': 'pending', 'data': None}
+                    continue
+                host = dict(entry)
+                host['age_seconds'] = round(now - entry['updated_at'], 1) if entry['updated_at'] else None
+                host['stale'] = host['age_seconds'] is None or host['age_seconds'] > stale_after
+                hosts[target['name']] = host
+                summary['ok' if entry['status'] == 'ok' else 'error'] += 1
+                if host['stale']:
+                    summary['stale'] += 1
+        return {'interval': self.interval, 'summary': summary, 'hosts': hosts}
+
+
+class PressureCollector:
+    """PSI 指标：内核提供的 avg10/avg60 以及相邻两次采样之间的停顿时间增量"""
+
+    def __init__(self):
+        self._prev = None
+        self._prev_time = 0
+
+    def collect(self):
+        now = time.time()
+        raw = SystemMonitor.get_pressure_raw()
+        if raw is None:
+            return {'available': False}
+
+        prev, elapsed = self._prev, now - self._prev_time
+        self._prev, self._prev_time = raw, now
+
+        pressure = {'available': True}
+        for resource, stats in raw.items():
+            entry = {}
+            for kind, fields in stats.items():
+                total = fields.get('total', 0)
+                delta = 0
+                if prev and kind in prev.get(resource, {}):
+                    delta = max(0, total - prev[resource][kind].get('total', 0))
+                entry[kind] = {
+                    'avg10': fields.get('avg10', 0.0),
+                    'avg60': fields.get('avg60', 0.0),
+                    'avg300': fields.get('avg300', 0.0),
+                    'total': total,
+                    'stall_delta_us': delta,
+                    'stall_percent': round(delta / (elapsed * 1e6) * 100, 2) if prev and elapsed > 0 else 0.0
+                }
+            pressure[resource] = entry
+        return pressure
+
+    @staticmethod
+    def signal(pressure):
+        """自适应采样使用的信号：各资源 some.avg10 的最大值"""
+        if not pressure.get('available'):
+            return None
+        return max(pressure[r]['some']['avg10'] for r in SystemMonitor.PSI_RESOURCES if r in pressure)
+
+
+class Collector:
+    """
+    已注册的采集器
+    :param interval: 采样间隔（秒），None 表示跟随 SAMPLE_INTERVAL
+    :param budget_ms: 单次采集的耗时预算，超出时采样器会自动放慢该采集器
+    :param signal: 可选，从结果中取出一个数值，启用自适应采样
+    """
+
+    def __init__(self, name, func, interval=None, budget_ms=50, signal=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.budget_ms = budget_ms
+        self.signal = signal
+
+
+class CollectorRegistry:
+    """
+    采集器注册表 - 内置采集器与 PLUGINS_DIR 下的插件模块统一注册
+    插件模块中可直接使用注入的 collector 装饰器，无需修改 MonitorHandler:
+        @collector('uptime', interval=60, budget_ms=5)
+        def uptime():
+            return {'seconds': ...}
+    结果出现在 /metrics 中，并可通过 /<名称> 单独访问
+    """
+
+    def __init__(self):
+        self._collectors = {}
+
+    def register(self, name, interval=None, budget_ms=50, signal=None):
+        """注册采集器（装饰器），同名采集器会被替换"""
+        def decorator(func):
+            if name in self._collectors:
+                print(f"Collector '{name}' replaced", file=sys.stderr)
+            self._collectors[name] = Collector(name, func, interval, budget_ms, signal)
+            return func
+        return decorator
+
+    def get(self, name):
+        return self._collectors.get(name)
+
+    def __contains__(self, name):
+        return name in self._collectors
+
+    def __iter__(self):
+        return iter(list(self._collectors.values()))
+
+    def load_plugins(self, directory=None):
+        """加载插件目录下的 *.py 模块，单个插件出错不影响其他插件"""
+        if directory is None:
+            directory = os.environ.get('PLUGINS_DIR') or os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), 'collectors')
+        if not os.path.isdir(directory):
+            return []
+        loaded = []
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.py') or filename.startswith('_'):
+                continue
+            try:
+                spec = importlib.util.spec_from_file_location(
+                    'collector_' + filename[:-3], os.path.join(directory, filename))
+                module = importlib.util.module_from_spec(spec)
+                module.collector = self.register
+                spec.loader.exec_module(module)
+                loaded.append(filename)
+            except Exception as e:
+                print(f"Plugin Error: {filename}: {e}", file=sys.stderr)
+        return loaded
+
+
+# 内置采集器（间隔为 None 的跟随 SAMPLE_INTERVAL）
+COLLECTORS = CollectorRegistry()
+COLLECTORS.register('cpu', budget_ms=100, signal=lambda v: v.get('percent'))(SystemMonitor.get_cpu_info)
+COLLECTORS.register('cpu_cores', budget_ms=20)(SystemMonitor.get_cpu_cores)
+COLLECTORS.register('memory', budget_ms=20, signal=lambda v: v.get('percent'))(SystemMonitor.get_memory_info)
+COLLECTORS.register('load', budget_ms=5, signal=lambda v: v.get('load1_percent'))(SystemMonitor.get_load_average)
+COLLECTORS.register('pressure', budget_ms=20, signal=PressureCollector.signal)(PressureCollector().collect)
+COLLECTORS.register('network', budget_ms=20)(SystemMonitor.get_network_info)
+COLLECTORS.register('disk', interval=10, budget_ms=20)(SystemMonitor.get_disk_info)
+COLLECTORS.register('cgroups', interval=5, budget_ms=100)(CgroupCollector().collect)
+COLLECTORS.register('processes', interval=10, budget_ms=200)(SystemMonitor.get_process_stats)
+COLLECTORS.register('mounts', interval=60, budget_ms=200)(SystemMonitor.get_mounts)
+
+
+class TimerWheel:
+    """
+    哈希时间轮 - 固定数量的槽位，每个槽位挂若干 [剩余圈数, 任务]
+    每个 tick 只检查当前槽位，调度开销与任务总数无关
+    """
+
+    def __init__(self, slots=64):
+        self.slots = [[] for _ in range(slots)]
+        self.position = 0
+
+    def schedule(self, item, ticks):
+        """ticks 个 tick 之后到期"""
+        ticks = max(1, int(ticks))
+        index = (self.position + ticks) % len(self.slots)
+        self.slots[index].append([(ticks - 1) // len(self.slots), item])
+
+    def advance(self):
+        """推进一格，返回到期的任务"""
+        self.position = (self.position + 1) % len(self.slots)
+        due, pending = [], []
+        for entry in self.slots[self.position]:
+            if entry[0] == 0:
+                due.append(entry[1])
+            else:
+                entry[0] -= 1
+                pending.append(entry)
+        self.slots[self.position] = pending
+        return due
+
+
+class MetricsSampler:
+    """
+    后台采样线程 - 按时间轮驱动各采集器，请求处理只读取最新快照
+    每个 tick 为 SAMPLE_INTERVAL 秒，采集器按各自间隔到期执行（COLLECTOR_INTERVALS 可覆盖，如 mounts:120,processes:5）
+    带 signal 的采集器启用自适应采样：最近若干次的标准差超过 ADAPTIVE_STDDEV，
+    或数值接近 ADAPTIVE_THRESHOLDS 中的阈值时切到 ADAPTIVE_MIN_INTERVAL；
+    信号平稳时间隔逐次翻倍，最长 ADAPTIVE_MAX_INTERVAL
+    :param publish: 可选回调，每次采样后接收快照（多进程模式下写入共享内存）
+    :param relay: 可选 RelayPoller，其汇总结果随快照一起发布
+    :param history: 可选 HistoryStore，每次采样追加一条持久化记录
+    """
+
+    ADAPTIVE_WINDOW = 10
+    # 数值达到阈值的 90% 即视为接近阈值
+    THRESHOLD_MARGIN = 0.9
+
+    def __init__(self, interval=None, publish=None, relay=None, history=None, registry=None):
+        if interval is None:
+            interval = float(os.environ.get('SAMPLE_INTERVAL', 1))
+        self.interval = max(0.2, interval)
+        self.publish = publish
+        self.relay = relay
+        self.history = history
+        self.registry = registry or COLLECTORS
+        self.overrides = self._parse_pairs(os.environ.get('COLLECTOR_INTERVALS', ''))
+        self.adaptive = os.environ.get('ADAPTIVE_SAMPLING', '1') != '0'
+        self.min_interval = max(self.interval, float(os.environ.get('ADAPTIVE_MIN_INTERVAL') or self.interval))
+        self.max_interval = max(self.min_interval, float(os.environ.get('ADAPTIVE_MAX_INTERVAL', 10)))
+        self.stddev_bound = float(os.environ.get('ADAPTIVE_STDDEV', 5))
+        self.thresholds = self._parse_pairs(os.environ.get('ADAPTIVE_THRESHOLDS', 'cpu:80,memory:85,load:80,pressure:20'))
+        self._signals = {}
+        self._effective = {}
+        self.wheel = TimerWheel()
+        self._lock = Lock()
+        self._snapshot = {}
+        self._results = {}
+        self._stats = {}
+        # 快照版本号从启动时刻的毫秒数开始递增，Agent 重启后旧版本号不会被误认
+        self._version = int(time.time() * 1000)
+
+    def start(self):
+        """启动采样线程"""
+        if self.relay:
+            self.relay.start()
+        self.sample()
+        thread = Thread(target=self._run, name='sampler', daemon=True)
+        thread.start()
+        return thread
+
+    def _run(self):
+        next_tick = time.time()
+        while True:
+            next_tick += self.interval
+            delay = next_tick - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -self.interval:
+                # 落后超过一个 tick（例如系统挂起）时不再追赶
+                next_tick = time.time()
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Sampler Error: {e}", file=sys.stderr)
+
+    def sample(self):
+        """立即执行全部采集器并发布快照（启动时调用）"""
+        for collector in self.registry:
+            self._collect(collector)
+        self._publish()
+
+    def tick(self):
+        """推进时间轮，执行到期的采集器"""
+        due = self.wheel.advance()
+        for collector in due:
+            self._collect(collector)
+        if due or self.relay:
+            self._publish()
+
+    @staticmethod
+    def _parse_pairs(text):
+        """解析 名称:数值,名称:数值 形式的配置"""
+        pairs = {}
+        for item in text.split(','):
+            name, _, value = item.partition(':')
+            if name.strip() and value.strip():
+                pairs[name.strip()] = float(value)
+        return pairs
+
+    def _next_interval(self, collector, value, stats):
+        """根据信号的波动与阈值距离决定下一次采样间隔（秒）"""
+        base = self.overrides.get(collector.name, collector.interval) or self.interval
+        if not self.adaptive or collector.signal is None or collector.name in self.overrides:
+            return base
+        try:
+            level = collector.signal(value)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            level = None
+        if level is None:
+            return base
+
+        window = self._signals.setdefault(collector.name, deque(maxlen=self.ADAPTIVE_WINDOW))
+        window.append(float(level))
+        mean = sum(window) / len(window)
+        stddev = math.sqrt(sum((x - mean) ** 2 for x in window) / len(window))
+        threshold = self.thresholds.get(collector.name)
+
+        current = self._effective.get(collector.name, base)
+        if stddev > self.stddev_bound or (threshold is not None and level >= threshold * self.THRESHOLD_MARGIN):
+            current = self.min_interval
+        elif len(window) == window.maxlen and stddev < self.stddev_bound / 2:
+            current = min(self.max_interval, current * 2)
+        self._effective[collector.name] = current
+        stats['adaptive'] = True
+        stats['stddev'] = round(stddev, 2)
+        return current
+
+    def _collect(self, collector):
+        """执行单个采集器并重新挂入时间轮"""
+        started = time.time()
+        try:
+            value = collector.func()
+        except Exception as e:
+            print(f"Collector Error: {collector.name}: {e}", file=sys.stderr)
+            value = {'available': False, 'error': str(e)}
+        elapsed_ms = (time.time() - started) * 1000
+
+        stats = self._stats.setdefault(collector.name, {'runs': 0, 'over_budget': 0})
+        ticks = max(1, int(round(self._next_interval(collector, value, stats) / self.interval)))
+        stats['runs'] += 1
+        stats['last_ms'] = round(elapsed_ms, 1)
+        stats['budget_ms'] = collector.budget_ms
+        if elapsed_ms > collector.budget_ms:
+            # 超出耗时预算时按超出倍数放慢（最多 8 倍），恢复后回到原间隔
+            stats['over_budget'] += 1
+            ticks *= min(8, int(math.ceil(elapsed_ms / collector.budget_ms)))
+        stats['interval'] = round(ticks * self.interval, 2)
+        stats['rate'] = round(1 / stats['interval'], 3)
+
+        self._results[collector.name] = value
+        self.wheel.schedule(collector, ticks)
+
+    def _publish(self):
+        """用各采集器的最新结果组成新快照并替换"""
+        self._version += 1
+        snapshot = dict(self._results)
+        snapshot['version'] = self._version
+        snapshot['sampled_at'] = time.time()
+        snapshot['collectors'] = {name: dict(stats) for name, stats in self._stats.items()}
+        if self.relay:
+            snapshot['fleet'] = self.relay.fleet()
+        with self._lock:
+            self._snapshot = snapshot
+        if self.publish:
+            self.publish(snapshot)
+        if self.history:
+            self.history.append(snapshot)
+
+    def snapshot(self):
+        """读取最新快照（快照整体替换、不会被修改，可直接使用）"""
+        with self._lock:
+            return self._snapshot
+
+
+class SharedSnapshot:
+    """
+    跨进程共享的采样快照（多进程模式）
+    fork 之前创建匿名共享内存，采样进程写入 JSON，工作进程只读
+    头部为 (序号, 长度)，写入期间序号为奇数，读取方发现序号变化或为奇数时重试（seqlock）
+    映射大小由 SHM_SIZE 决定，fork 后无法扩大；快照超出时改为写入 snapshot_error，工作进程据此返回 503
+    """
+
+    HEADER = struct.Struct('<QI')
+
+    def __init__(self, size=None):
+        if size is None:
+            size = int(os.environ.get('SHM_SIZE', 1024 * 1024))
+        self.size = size
+        self._buf = mmap.mmap(-1, size)
+        self._lock = Lock()
+        self._seq = 0
+        self._cached_seq = -1
+        self._cached = {}
+
+    def publish(self, snapshot):
+        """写入新快照（仅采样进程调用）"""
+        payload = json.dumps(snapshot, ensure_ascii=False).encode('utf-8')
+        limit = self.size - self.HEADER.size
+        if len(payload) > limit:
+            print(f"Snapshot too large for shared memory: {len(payload)} bytes (SHM_SIZE limit {limit})",
+                  file=sys.stderr)
+            # 不能继续提供旧快照：写入错误标记，工作进程对依赖快照的请求返回 503
+            payload = json.dumps({'snapshot_error': {
+                'error': 'Snapshot too large for shared memory',
+                'size': len(payload),
+                'limit': limit,
+                'hint': 'Increase SHM_SIZE in config.env'
+            }}).encode('utf-8')
+        self._seq += 1
+        self.HEADER.pack_into(self._buf, 0, self._seq, 0)
+        self._buf[self.HEADER.size:self.HEADER.size + len(payload)] = payload
+        self._seq += 1
+        self.HEADER.pack_into(self._buf, 0, self._seq, len(payload))
+
+    def _read(self):
+        for _ in range(100):
+            seq, length = self.HEADER.unpack_from(self._buf, 0)
+            if seq % 2 == 1:
+                time.sleep(0.001)
+                continue
+            if seq == self._cached_seq:
+                return self._cached
+            payload = self._buf[self.HEADER.size:self.HEADER.size + length]
+            if self.HEADER.unpack_from(self._buf, 0)[0] != seq:
+                continue
+            try:
+                snapshot = json.loads(payload.decode('utf-8')) if length else {}
+            except (ValueError, UnicodeDecodeError):
+                # 头部的序号和长度不是原子写入，可能读到新序号配旧长度，稍后重新读取
+                time.sleep(0.001)
+                continue
+            self._cached_seq = seq
+            self._cached = snapshot
+            return self._cached
+        return self._cached
+
+    def snapshot(self):
+        """读取最新快照，只在快照更新后重新解析"""
+        with self._lock:
+            return self._read()
+
+
+class HistoryStore:
+    """
+    持久化高精度历史 - 安装目录下固定大小的内存映射环形文件
+    文件头为 (魔数, 记录长度, 容量, 已写入总数)，每轮采样写入一条定长记录并推进写入计数
+    Agent 重启后直接映射原文件继续写入，无需回放；查询直接从映射中解包
+    """
+
+    MAGIC = b'SMHIST01'
+    HEADER = struct.Struct('<8sIIQ')
+    COUNT = struct.Struct('<Q')
+    COUNT_OFFSET = 16
+    FIELDS = ('sampled_at', 'cpu', 'memory', 'swap', 'swapin_rate', 'swapout_rate', 'disk',
+              'load1', 'load5', 'load15', 'psi_cpu', 'psi_memory', 'psi_io')
+    RECORD = struct.Struct('<' + 'd' * len(FIELDS))
+
+    def __init__(self, path, capacity):
+        self.path = path
+        self.capacity = capacity
+        size = self.HEADER.size + capacity * self.RECORD.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, size)
+            self._buf = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._view = memoryview(self._buf)
+        magic, record_size, stored_capacity, _ = self.HEADER.unpack_from(self._buf, 0)
+        if magic != self.MAGIC or record_size != self.RECORD.size or stored_capacity != capacity:
+            # 新文件或容量/格式变化，清空重新开始
+            self.HEADER.pack_into(self._buf, 0, self.MAGIC, self.RECORD.size, capacity, 0)
+
+    @classmethod
+    def from_env(cls):
+        """根据配置打开历史文件，HISTORY_SIZE=0 或无法打开时返回 None"""
+        capacity = int(os.environ.get('HISTORY_SIZE', 21600))
+        if capacity <= 0:
+            return None
+        path = os.environ.get('HISTORY_FILE') or os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), 'history.dat')
+        try:
+            return cls(path, capacity)
+        except (OSError, ValueError) as e:
+            print(f"History Error: {e}", file=sys.stderr)
+            return None
+
+    @property
+    def count(self):
+        return self.COUNT.unpack_from(self._buf, self.COUNT_OFFSET)[0]
+
+    @staticmethod
+    def _record(snapshot):
+        """从快照中取出记录字段，缺失项记为 NaN"""
+        def pick(*keys):
+            node = snapshot
+            for key in keys:
+                if not isinstance(node, dict) or key not in node:
+                    return float('nan')
+                node = node[key]
+            return float(node) if isinstance(node, (int, float)) else float('nan')
+
+        return (
+            pick('sampled_at'), pick('cpu', 'percent'), pick('memory', 'percent'),
+            pick('memory', 'swap', 'percent'), pick('memory', 'swap', 'swapin_rate'),
+            pick('memory', 'swap', 'swapout_rate'), pick('disk', 'percent'),
+            pick('load', 'load1'), pick('load', 'load5'), pick('load', 'load15'),
+            pick('pressure', 'cpu', 'some', 'avg10'), pick('pressure', 'memory', 'some', 'avg10'),
+            pick('pressure', 'io', 'some', 'avg10')
+        )
+
+    def append(self, snapshot):
+        """写入一条记录（仅采样方调用）：先写记录，再推进写入计数"""
+        count = self.count
+        offset = self.HEADER.size + (count % self.capacity) * self.RECORD.size
+        self.RECORD.pack_into(self._buf, offset, *self._record(snapshot))
+        self.COUNT.pack_into(self._buf, self.COUNT_OFFSET, count + 1)
+
+    def query(self, seconds=None, limit=None):
+        """
+        读取最近的记录（按时间升序）
+        最旧的一个槽位可能正被覆盖写入，因此最多返回 capacity-1 条
+        """
+        count = self.count
+        n = min(count, self.capacity - 1)
+        if limit is not None:
+            n = min(n, max(0, limit))
+        start, end = (count - n) % self.capacity, count % self.capacity
+        base, size = self.HEADER.size, self.RECORD.size
+        if n == 0:
+            chunks = []
+        elif start < end:
+            chunks = [self._view[base + start * size:base + end * size]]
+        else:
+            chunks = [self._view[base + start * size:base + self.capacity * size],
+                      self._view[base:base + end * size]]
+
+        since = time.time() - seconds if seconds is not None else None
+        samples = []
+        for chunk in chunks:
+            for record in self.RECORD.iter_unpack(chunk):
+                if since is not None and record[0] < since:
+                    continue
+                samples.append([None if v != v else round(v, 2) for v in record])
+        return samples
+
+
+class SnapshotHistory:
+    """
+    按版本保存最近若干份 /metrics 数据，用于 ?since_version=N 增量响应
+    每个进程各自记录自己返回过的版本，找不到基准版本时返回完整数据
+    """
+
+    def __init__(self, size=None):
+        self.size = size if size is not None else int(os.environ.get('SNAPSHOT_HISTORY', 32))
+        self._lock = Lock()
+        self._payloads = {}
+        self._order = deque()
+
+    def record(self, version, payload):
+        """记录某个版本的数据（已记录过的版本忽略）"""
+        with self._lock:
+            if version in self._payloads:
+                return
+            self._payloads[version] = payload
+            self._order.append(version)
+            while len(self._order) > self.size:
+                self._payloads.pop(self._order.popleft(), None)
+
+    def get(self, version):
+        with self._lock:
+            return self._payloads.get(version)
+
+    @staticmethod
+    def diff(old, new, path=()):
+        """
+        计算两份嵌套数据的差异
+        :return: (changed, removed) changed 只包含变化的叶子，removed 为被删除键的路径列表
+        """
+        changed, removed = {}, []
+        for key, value in new.items():
+            if key not in old:
+                changed[key] = value
+            elif isinstance(value, dict) and isinstance(old[key], dict):
+                sub_changed, sub_removed = SnapshotHistory.diff(old[key], value, path + (key,))
+                if sub_changed:
+                    changed[key] = sub_changed
+                removed.extend(sub_removed)
+            elif old[key] != value:
+                changed[key] = value
+        for key in old:
+            if key not in new:
+                removed.append(list(path + (key,)))
+        return changed, removed
+
+    @staticmethod
+    def merge(base, changed, removed=()):
+        """把 diff 的结果合并到 base 上（原地修改）"""
+        for key, value in changed.items():
+            if isinstance(value, dict) and isinstance(base.get(key), dict):
+                SnapshotHistory.merge(base[key], value)
+            else:
+                base[key] = value
+        for path in removed:
+            node = base
+            for key in path[:-1]:
+                node = node.get(key, {})
+            node.pop(path[-1], None)
+        return base
+
+
+class PromRenderer:
+    """
+    /metrics/prom 文本输出（Prometheus text 0.0.4 / OpenMetrics 1.0）
+    指标族在构造时展开成 (名称, 类型, 取值函数) 列表，HELP/TYPE 头预先生成；
+    样本行的 "名称{标签} " 前缀按标签值缓存，渲染时只做取值与字符串拼接
+    """
+
+    PREFIX = 'server_monitor_'
+    MAX_CACHED_PREFIXES = 10000
+
+    MEMORY_FIELDS = ('total', 'used', 'available', 'free', 'buffers', 'cached', 'shmem',
+                     'dirty', 'writeback', 'slab', 'slab_reclaimable', 'slab_unreclaimable')
+    NETWORK_COUNTERS = (('receive_bytes', 'rx_bytes'), ('receive_packets', 'rx_packets'),
+                        ('receive_errors', 'rx_errors'), ('receive_dropped', 'rx_dropped'),
+                        ('transmit_bytes', 'tx_bytes'), ('transmit_packets', 'tx_packets'),
+                        ('transmit_errors', 'tx_errors'), ('transmit_dropped', 'tx_dropped'))
+
+    def __init__(self):
+        self._families = []
+        self._headers = {}
+        self._prefixes = {}
+        self._define()
+
+    def family(self, name, kind, help_text, extract):
+        """
+        注册指标族
+        :param extract: 接收快照，返回 [(标签元组, 数值), ...]，标签元组形如 (('cpu', 'cpu0'),)
+        """
+        name = self.PREFIX + name
+        self._families.append((name, kind, extract))
+        # OpenMetrics 的计数器在 HELP/TYPE 中不带 _total 后缀，0.0.4 格式中与样本名一致
+        sample_name = name + '_total' if kind == 'counter' else name
+        self._headers[(name, False)] = f"# HELP {sample_name} {help_text}\n# TYPE {sample_name} {kind}"
+        self._headers[(name, True)] = f"# HELP {name} {help_text}\n# TYPE {name} {kind}"
+
+    @staticmethod
+    def value(*keys, scale=1):
+        """按路径取单个无标签数值"""
+        def extract(snapshot):
+            node = snapshot
+            for key in keys:
+                node = node[key]
+            return [((), node * scale if scale != 1 else node)]
+        return extract
+
+    @staticmethod
+    def each(section, path, labels, field, scale=1):
+        """
+        对快照中的一组条目逐个取值
+        :param labels: 条目为字典时是标签名（取字典键）；为列表时是 ((标签名, 字段名), ...)
+        :param field: 条目中的字段名，None 表示条目本身就是数值
+        """
+        def extract(snapshot):
+            node = snapshot[section]
+            for key in path:
+                node = node[key]
+            if isinstance(node, dict):
+                pairs = ((((labels, key),), entry) for key, entry in node.items())
+            else:
+                pairs = ((tuple((name, entry[attr]) for name, attr in labels), entry) for entry in node)
+            samples = []
+            for label_values, entry in pairs:
+                value = entry if field is None else entry.get(field)
+                if value is not None:
+                    samples.append((label_values, value * scale if scale != 1 else value))
+            return samples
+        return extract
+
+    def _define(self):
+        f = self.family
+        f('cpu_usage_percent', 'gauge', 'CPU usage in percent', self.value('cpu', 'percent'))
+        f('cpu_count', 'gauge', 'Number of logical CPUs', self.value('cpu', 'count'))
+        f('cpu_core_usage_percent', 'gauge', 'Per-core CPU usage in percent',
+          self.each('cpu_cores', ('cores',), 'cpu', None))
+
+        for key in self.MEMORY_FIELDS:
+            f(f'memory_{key}_bytes', 'gauge', f'Memory {key} in bytes', self.value('memory', key))
+        f('memory_usage_percent', 'gauge', 'Memory usage in percent', self.value('memory', 'percent'))
+        for key in ('total', 'used', 'free', 'cached'):
+            f(f'swap_{key}_bytes', 'gauge', f'Swap {key} in bytes', self.value('memory', 'swap', key))
+        f('swap_usage_percent', 'gauge', 'Swap usage in percent', self.value('memory', 'swap', 'percent'))
+        f('swap_in_pages_per_second', 'gauge', 'Pages swapped in per second', self.value('memory', 'swap', 'swapin_rate'))
+        f('swap_out_pages_per_second', 'gauge', 'Pages swapped out per second', self.value('memory', 'swap', 'swapout_rate'))
+        for key in ('total', 'free', 'reserved'):
+            f(f'hugepages_{key}', 'gauge', f'Huge pages {key}', self.value('memory', 'hugepages', key))
+        f('hugepages_page_size_bytes', 'gauge', 'Huge page size in bytes', self.value('memory', 'hugepages', 'page_size'))
+
+        for key in ('total', 'used', 'free'):
+            f(f'disk_{key}_bytes', 'gauge', f'Root filesystem {key} in bytes', self.value('disk', key))
+        f('disk_usage_percent', 'gauge', 'Root filesystem usage in percent', self.value('disk', 'percent'))
+
+        for period in ('1', '5', '15'):
+            f(f'load{period}', 'gauge', f'{period}-minute load average', self.value('load', f'load{period}'))
+            f(f'load{period}_percent', 'gauge', f'{period}-minute load average per CPU in percent',
+              self.value('load', f'load{period}_percent'))
+
+        def pressure(field, scale=1):
+            def extract(snapshot):
+                data = snapshot['pressure']
+                if not data.get('available'):
+                    return []
+                return [((('resource', resource), ('kind', kind)), values[field] * scale)
+                        for resource in SystemMonitor.PSI_RESOURCES if resource in data
+                        for kind, values in data[resource].items()]
+            return extract
+        for window in ('avg10', 'avg60', 'avg300'):
+            f(f'pressure_{window}_percent', 'gauge', f'PSI {window} stall percentage', pressure(window))
+        f('pressure_stall_seconds', 'counter', 'PSI total stall time in seconds', pressure('total', 1e-6))
+        f('pressure_stall_percent', 'gauge', 'PSI stall percentage over the last sample interval', pressure('stall_percent'))
+
+        for name, key in self.NETWORK_COUNTERS:
+            f(f'network_{name}', 'counter', f'Network {name.replace("_", " ")}',
+              self.each('network', ('interfaces',), 'interface', key))
+        f('network_receive_bytes_per_second', 'gauge', 'Network receive rate in bytes per second',
+          self.each('network', ('interfaces',), 'interface', 'rx_rate'))
+        f('network_transmit_bytes_per_second', 'gauge', 'Network transmit rate in bytes per second',
+          self.each('network', ('interfaces',), 'interface', 'tx_rate'))
+
+        mount_labels = (('mountpoint', 'mountpoint'), ('device', 'device'), ('fstype', 'fstype'))
+        for key in ('total', 'used', 'free'):
+            f(f'mount_{key}_bytes', 'gauge', f'Filesystem {key} in bytes',
+              self.each('mounts', ('mounts',), mount_labels, key))
+        f('mount_usage_percent', 'gauge', 'Filesystem usage in percent',
+          self.each('mounts', ('mounts',), mount_labels, 'percent'))
+        f('mount_inodes_usage_percent', 'gauge', 'Filesystem inode usage in percent',
+          self.each('mounts', ('mounts',), mount_labels, 'inodes_percent'))
+
+        f('processes', 'gauge', 'Number of processes', self.value('processes', 'total'))
+        f('threads', 'gauge', 'Number of threads', self.value('processes', 'threads'))
+        f('processes_state', 'gauge', 'Number of processes by state',
+          self.each('processes', ('states',), 'state', None))
+
+        unit_labels = (('unit', 'name'),)
+        f('cgroup_cpu_usage_percent', 'gauge', 'cgroup CPU usage in percent',
+          self.each('cgroups', ('units',), unit_labels, 'cpu_percent'))
+        f('cgroup_cpu_usage_seconds', 'counter', 'cgroup CPU time in seconds',
+          self.each('cgroups', ('units',), unit_labels, 'cpu_usage_usec', 1e-6))
+        f('cgroup_memory_current_bytes', 'gauge', 'cgroup memory usage in bytes',
+          self.each('cgroups', ('units',), unit_labels, 'memory_current'))
+        f('cgroup_memory_max_bytes', 'gauge', 'cgroup memory limit in bytes',
+          self.each('cgroups', ('units',), unit_labels, 'memory_max'))
+        f('cgroup_memory_usage_percent', 'gauge', 'cgroup memory usage relative to its limit',
+          self.each('cgroups', ('units',), unit_labels, 'memory_percent'))
+        f('cgroup_io_read_bytes', 'counter', 'cgroup bytes read',
+          self.each('cgroups', ('units',), unit_labels, 'io_read_bytes'))
+        f('cgroup_io_write_bytes', 'counter', 'cgroup bytes written',
+          self.each('cgroups', ('units',), unit_labels, 'io_write_bytes'))
+
+        f('collector_interval_seconds', 'gauge', 'Effective sampling interval per collector',
+          self.each('collectors', (), 'collector', 'interval'))
+        f('collector_duration_seconds', 'gauge', 'Duration of the last collector run',
+          self.each('collectors', (), 'collector', 'last_ms', 1e-3))
+        f('collector_over_budget', 'counter', 'Collector runs that exceeded their cost budget',
+          self.each('collectors', (), 'collector', 'over_budget'))
+
+    @staticmethod
+    def _escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    def _prefix(self, name, labels):
+        key = (name, labels)
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            if len(self._prefixes) >= self.MAX_CACHED_PREFIXES:
+                self._prefixes.clear()
+            if labels:
+                text = ','.join(f'{k}="{self._escape(v)}"' for k, v in labels)
+                prefix = f'{name}{{{text}}} '
+            else:
+                prefix = name + ' '
+            self._prefixes[key] = prefix
+        return prefix
+
+    @staticmethod
+    def _format(value):
+        if isinstance(value, bool):
+            return '1' if value else '0'
+        if isinstance(value, int):
+            return str(value)
+        return repr(float(value))
+
+    def render(self, snapshot, openmetrics=False):
+        """渲染快照；缺失或不可用的指标族直接跳过"""
+        lines = []
+        for name, kind, extract in self._families:
+            try:
+                samples = extract(snapshot)
+            except (KeyError, TypeError, AttributeError):
+                continue
+            if not samples:
+                continue
+            lines.append(self._headers[(name, openmetrics)])
+            sample_name = name + '_total' if kind == 'counter' else name
+            for labels, value in samples:
+                if isinstance(value, (int, float)):
+                    lines.append(self._prefix(sample_name, labels) + self._format(value))
+        self._render_plugins(snapshot, lines, openmetrics)
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def _render_plugins(self, snapshot, lines, openmetrics):
+        """插件采集器：输出结果中的顶层数值字段"""
+        for collector in COLLECTORS:
+            if collector.func.__module__ == __name__:
+                continue
+            value = snapshot.get(collector.name)
+            if not isinstance(value, dict):
+                value = {'value': value}
+            for field, number in value.items():
+                if isinstance(number, (int, float)) and not isinstance(number, bool):
+                    name = f'{self.PREFIX}{collector.name}_{field}'
+                    lines.append(f'# TYPE {name} gauge')
+                    lines.append(self._prefix(name, ()) + self._format(number))
+
+
+class RequestLogger:
+    """
+    异步请求日志 - 请求线程只把记录放入队列（队列满时直接丢弃并计数），后台线程输出 JSON Lines
+    - LOG_SAMPLE: 逐条日志的抽样比例（0~1）
+    - LOG_RATE: 每秒最多输出的逐条日志数（令牌桶），超出部分只计入汇总；0 表示只输出汇总
+    - LOG_SUMMARY_INTERVAL: 每隔多少秒输出一次按客户端聚合的请求计数
+    """
+
+    def __init__(self, rate=None, sample=None, summary_interval=None, queue_size=None, stream=None):
+        self.rate = rate if rate is not None else float(os.environ.get('LOG_RATE', 10))
+        self.sample = sample if sample is not None else float(os.environ.get('LOG_SAMPLE', 1))
+        if summary_interval is None:
+            summary_interval = float(os.environ.get('LOG_SUMMARY_INTERVAL', 60))
+        self.summary_interval = max(1.0, summary_interval)
+        if queue_size is None:
+            queue_size = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+        self.stream = stream or sys.stdout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._dropped = 0  # 请求线程累加、日志线程读取并清零，由 _dropped_lock 保护
+        self._dropped_lock = Lock()
+        self._tokens = self.rate
+        self._last_refill = time.time()
+        self._clients = {}
+        self._window_start = time.time()
+
+    @classmethod
+    def from_env(cls):
+        """LOG_REQUESTS=0 时关闭请求日志，返回 None"""
+        if os.environ.get('LOG_REQUESTS', '1') == '0':
+            return None
+        return cls()
+
+    def start(self):
+        thread = Thread(target=self._run, name='request-log', daemon=True)
+        thread.start()
+        return thread
+
+    def log(self, client, method, path, status, duration, size):
+        """记录一次请求（请求线程调用，不会阻塞）"""
+        try:
+            self._queue.put_nowait((time.time(), client, method, path, status, duration, size))
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+
+    def _run(self):
+        while True:
+            timeout = max(0.1, self._window_start + self.summary_interval - time.time())
+            lines = []
+            try:
+                record = self._queue.get(timeout=timeout)
+                while True:
+                    line = self._handle(record)
+                    if line:
+                        lines.append(line)
+                    record = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            if time.time() - self._window_start >= self.summary_interval:
+                line = self._summary()
+                if line:
+                    lines.append(line)
+            if lines:
+                try:
+                    self.stream.write('\n'.join(lines) + '\n')
+                    self.stream.flush()
+                except (OSError, ValueError):
+                    pass
+
+    def _allow(self, now):
+        """抽样 + 令牌桶限速"""
+        if self.sample < 1 and random.random() >= self.sample:
+            return False
+        self._tokens = min(self.rate, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _handle(self, record):
+        ts, client, method, path, status, duration, size = record
+        counters = self._clients.setdefault(client, {'requests': 0, 'suppressed': 0, 'bytes': 0, 'status': {}})
+        counters['requests'] += 1
+        counters['bytes'] += size
+        counters['status'][str(status)] = counters['status'].get(str(status), 0) + 1
+        if not self._allow(ts):
+            counters['suppressed'] += 1
+            return None
+        return json.dumps({
+            'ts': datetime.fromtimestamp(ts).isoformat(timespec='milliseconds'),
+            'type': 'request',
+            'client': client,
+            'method': method,
+            'path': path,
+            'status': status,
+            'duration_ms': round(duration * 1000, 2),
+            'bytes': size
+        }, ensure_ascii=False)
+
+    def _summary(self):
+        """输出并重置当前窗口的按客户端聚合计数"""
+        now = time.time()
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+        clients = self._clients
+        window = round(now - self._window_start, 1)
+        self._clients, self._window_start = {}, now
+        if not clients and not dropped:
+            return None
+        return json.dumps({
+            'ts': datetime.fromtimestamp(now).isoformat(timespec='milliseconds'),
+            'type': 'summary',
+            'window_seconds': window,
+            'requests': sum(c['requests'] for c in clients.values()),
+            'dropped': dropped,
+            'clients': clients
+        }, ensure_ascii=False)
+
 
 class MonitorHandler(BaseHTTPRequestHandler):
     SECRET_KEY = os.environ.get('SECRET_KEY', 'default_key')
+    sampler = None
+    history = SnapshotHistory()
+    history_store = None
+    request_log = None
+    prom = PromRenderer()
+    # 快照中尚无数据时可直接采集的指标
+    FALLBACKS = {
+        'cpu': SystemMonitor.get_cpu_info,
+        'memory': SystemMonitor.get_memory_info,
+        'disk': SystemMonitor.get_disk_info,
+        'load': SystemMonitor.get_load_average
+    }
+    
+    # 所有响应都带 Content-Length，使用 HTTP/1.1 才能真正复用长连接
+    protocol_version = 'HTTP/1.1'
+    # 响应头与响应体分两次写出，长连接下需关闭 Nagle，否则会与延迟 ACK 叠加出约 40ms 的等待
+    disable_nagle_algorithm = True
     
     # 连接超时设置
     timeout = 30
@@ -544,14 +2076,13 @@ class MonitorHandler(BaseHTTPRequestHandler):
     
     def do_GET(self):
         """处理GET请求"""
+        started = time.time()
+        self.response_status, self.response_size = None, 0
+        path = self.path
         try:
-            client_ip = self.client_address[0]
             parsed_path = urllib.parse.urlparse(self.path)
             path = parsed_path.path
-            
-            # 简化日志输出
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            print(f"[{timestamp}] {client_ip} -> {path}", flush=True)
+            self.query = urllib.parse.parse_qs(parsed_path.query)
             
             # 所有路径都需要认证
             if not self.verify_auth():
@@ -562,15 +2093,29 @@ class MonitorHandler(BaseHTTPRequestHandler):
                 '/': self.handle_root,
                 '/health': self.handle_health,
                 '/metrics': self.handle_metrics,
+                '/metrics/prom': self.handle_prom,
                 '/cpu': self.handle_cpu,
                 '/memory': self.handle_memory,
                 '/disk': self.handle_disk,
-                '/load': self.handle_load
+                '/load': self.handle_load,
+                '/pressure': self.handle_pressure,
+                '/cgroups': self.handle_cgroups,
+                '/history': self.handle_history,
+                '/fleet/metrics': self.handle_fleet_metrics
             }
             
             handler = routes.get(path)
-            if handler:
+            snapshot_error = None
+            if path not in ('/', '/health', '/history'):
+                snapshot_error = self.get_snapshot().get('snapshot_error')
+            if snapshot_error and (handler or path.strip('/') in COLLECTORS):
+                # 多进程模式下快照超出共享内存，没有可用的最新数据
+                self.send_json(snapshot_error, status_code=503)
+            elif handler:
                 handler()
+            elif path.strip('/') in COLLECTORS:
+                # 没有专门处理函数的采集器（如插件）
+                self.handle_collector(path.strip('/'))
             else:
                 self.send_json({
                     'error': 'Not Found',
@@ -587,6 +2132,11 @@ class MonitorHandler(BaseHTTPRequestHandler):
                 }, status_code=500)
             except:
                 pass
+        finally:
+            # 请求日志由后台线程异步输出
+            if self.request_log is not None:
+                self.request_log.log(self.client_address[0], self.command, path,
+                                     self.response_status, time.time() - started, self.response_size)
     
     def handle_root(self):
         """根路径"""
@@ -604,81 +2154,205 @@ class MonitorHandler(BaseHTTPRequestHandler):
                 '/': 'API documentation',
                 '/health': 'Health check',
                 '/metrics': 'All metrics',
+                '/metrics/prom': 'All metrics in Prometheus/OpenMetrics text format',
                 '/cpu': 'CPU info',
                 '/memory': 'Memory info',
                 '/disk': 'Disk info',
-                '/load': 'System load'
+                '/load': 'System load',
+                '/pressure': 'Pressure stall information (PSI)',
+                '/cgroups': 'Per-unit cgroup v2 resource usage',
+                '/history': 'Persistent high-resolution history (?seconds=300&limit=N)',
+                '/fleet/metrics': 'Relay mode: latest metrics of all downstream agents'
             }
         }
+        for collector in COLLECTORS:
+            help_info['endpoints'].setdefault('/' + collector.name, f'Collector: {collector.name}')
         self.send_json(help_info)
     
     def handle_health(self):
-        """健康检查 - 快速响应"""
-        self.send_json({
+        """健康检查 - 快速响应（快照无法写入共享内存时报告 degraded）"""
+        result = {
             'status': 'healthy',
             'timestamp': datetime.now().isoformat()
-        })
+        }
+        snapshot_error = self.get_snapshot().get('snapshot_error')
+        if snapshot_error:
+            result['status'] = 'degraded'
+            result['snapshot_error'] = snapshot_error
+        self.send_json(result)
     
     def handle_metrics(self):
-        """所有指标"""
-        data = {
-            'timestamp': datetime.now().isoformat(),
-            'cpu': {
-                'percent': SystemMonitor.get_cpu_percent(),
-                'count': os.cpu_count() or 1
-            },
-            'memory': SystemMonitor.get_memory_info(),
-            'disk': SystemMonitor.get_disk_info(),
+        """
+        所有指标
+        带 ?since_version=N 且 N 仍在历史中时，只返回相对版本 N 变化的字段
+        """
+        snapshot = self.get_snapshot()
+        payload = {
             'system': {
                 'hostname': socket.gethostname(),
                 'platform': platform.system(),
                 'platform_release': platform.release(),
                 'architecture': platform.machine()
             },
-            'load': SystemMonitor.get_load_average()
+            'collectors': snapshot.get('collectors', {})
         }
+        # 所有已注册的采集器（含插件）
+        for collector in COLLECTORS:
+            payload[collector.name] = self.get_sampled(
+                collector.name, self.FALLBACKS.get(collector.name), snapshot)
+        
+        version = snapshot.get('version')
+        if version:
+            self.history.record(version, payload)
+            base = None
+            since = self.query.get('since_version', [None])[0]
+            if since and since.isdigit():
+                base = self.history.get(int(since))
+            if base is not None:
+                changed, removed = SnapshotHistory.diff(base, payload)
+                self.send_json({
+                    'timestamp': datetime.now().isoformat(),
+                    'version': version,
+                    'base_version': int(since),
+                    'delta': True,
+                    'changed': changed,
+                    'removed': removed
+                })
+                return
+        
+        data = dict(payload)
+        data['timestamp'] = datetime.now().isoformat()
+        if version:
+            data['version'] = version
+            data['delta'] = False
         self.send_json(data)
     
     def handle_cpu(self):
         """CPU信息"""
-        self.send_json({
-            'percent': SystemMonitor.get_cpu_percent(),
-            'count': os.cpu_count() or 1,
-            'timestamp': datetime.now().isoformat()
-        })
+        data = dict(self.get_sampled('cpu', SystemMonitor.get_cpu_info))
+        data['timestamp'] = datetime.now().isoformat()
+        self.send_json(data)
     
     def handle_memory(self):
         """内存信息"""
-        data = SystemMonitor.get_memory_info()
+        data = dict(self.get_sampled('memory', SystemMonitor.get_memory_info))
         data['timestamp'] = datetime.now().isoformat()
         self.send_json(data)
     
     def handle_disk(self):
         """磁盘信息"""
-        data = SystemMonitor.get_disk_info()
+        data = dict(self.get_sampled('disk', SystemMonitor.get_disk_info))
         data['timestamp'] = datetime.now().isoformat()
         self.send_json(data)
     
     def handle_load(self):
         """负载信息"""
-        data = SystemMonitor.get_load_average()
+        data = dict(self.get_sampled('load', SystemMonitor.get_load_average))
+        data['timestamp'] = datetime.now().isoformat()
+        self.send_json(data)
+    
+    def handle_pressure(self):
+        """PSI 压力信息"""
+        data = dict(self.get_sampled('pressure'))
+        data['timestamp'] = datetime.now().isoformat()
+        self.send_json(data)
+    
+    def handle_cgroups(self):
+        """cgroup 单元资源信息"""
+        data = dict(self.get_sampled('cgroups'))
         data['timestamp'] = datetime.now().isoformat()
         self.send_json(data)
     
+    def handle_fleet_metrics(self):
+        """中继模式：下游 Agent 汇总"""
+        fleet = self.get_sampled('fleet')
+        if fleet.get('available') is False:
+            self.send_json({
+                'error': 'Relay mode disabled',
+                'hint': 'Set RELAY_TARGETS_FILE in config.env'
+            }, status_code=404)
+            return
+        data = dict(fleet)
+        data['timestamp'] = datetime.now().isoformat()
+        data['relay'] = socket.gethostname()
+        self.send_json(data)
+    
+    def handle_prom(self):
+        """Prometheus / OpenMetrics 文本格式（按 Accept 头协商）"""
+        openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+        body = self.prom.render(self.get_snapshot(), openmetrics).encode('utf-8')
+        if openmetrics:
+            content_type = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+        else:
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        self.send_body(body, content_type)
+    
+    def handle_collector(self, name):
+        """任意已注册采集器的最新结果"""
+        value = self.get_sampled(name)
+        data = dict(value) if isinstance(value, dict) else {'value': value}
+        data['timestamp'] = datetime.now().isoformat()
+        self.send_json(data)
+    
+    def handle_history(self):
+        """持久化历史：默认最近 300 秒，列顺序见 fields"""
+        store = self.history_store
+        if store is None:
+            self.send_json({
+                'error': 'History disabled',
+                'hint': 'Set HISTORY_SIZE > 0 in config.env'
+            }, status_code=404)
+            return
+        try:
+            seconds = float(self.query.get('seconds', ['300'])[0])
+            limit = self.query.get('limit', [None])[0]
+            limit = int(limit) if limit is not None else None
+        except ValueError:
+            self.send_json({'error': 'Invalid seconds/limit'}, status_code=400)
+            return
+        samples = store.query(seconds=seconds, limit=limit)
+        self.send_json({
+            'timestamp': datetime.now().isoformat(),
+            'capacity': store.capacity,
+            'written': store.count,
+            'fields': list(HistoryStore.FIELDS),
+            'samples': samples
+        })
+    
+    def get_snapshot(self):
+        """读取当前完整采样快照，未启动采样时为空"""
+        return self.sampler.snapshot() if self.sampler is not None else {}
+    
+    def get_sampled(self, key, fallback=None, snapshot=None):
+        """
+        从采样快照中读取指标
+        :param fallback: 快照中没有该项时的直接采集函数，未提供则视为不可用
+        :param snapshot: 已读取的快照，保证同一响应中的各项来自同一轮采样
+        """
+        if snapshot is None:
+            snapshot = self.get_snapshot()
+        value = snapshot.get(key)
+        if value is None:
+            return fallback() if fallback else {'available': False}
+        return value
+    
     def send_json(self, data, status_code=200):
         """发送JSON响应"""
+        response = json.dumps(data, ensure_ascii=False, indent=2)
+        self.send_body(response.encode('utf-8'), 'application/json; charset=utf-8', status_code)
+    
+    def send_body(self, response_bytes, content_type, status_code=200):
+        """发送响应体"""
         try:
-            response = json.dumps(data, ensure_ascii=False, indent=2)
-            response_bytes = response.encode('utf-8')
-            
             self.send_response(status_code)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Type', content_type)
             self.send_header('Access-Control-Allow-Origin', '*')
             self.send_header('Content-Length', len(response_bytes))
             self.send_header('Connection', 'keep-alive')
             self.send_header('Keep-Alive', 'timeout=5, max=100')
             self.end_headers()
             self.wfile.write(response_bytes)
+            self.response_status, self.response_size = status_code, len(response_bytes)
         except Exception as e:
             print(f"Response error: {e}", file=sys.stderr)
     
@@ -692,28 +2366,150 @@ class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
     """支持多线程的 HTTP 服务器"""
     daemon_threads = True
     allow_reuse_address = True
+    reuse_port = False
     
     def server_bind(self):
         """绑定服务器并设置 socket 选项"""
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reuse_port:
+            # 多个工作进程绑定同一端口，由内核分发连接
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         HTTPServer.server_bind(self)
 
 
-def run_server(host='0.0.0.0', port=None):
-    """运行服务器 - 使用多线程"""
+class ReusePortHTTPServer(ThreadedHTTPServer):
+    """多进程模式下每个工作进程使用的服务器"""
+    reuse_port = True
+
+
+def run_sampler_process(shared, history):
+    """采样进程：周期性采集并写入共享内存"""
+    sampler = MetricsSampler(publish=shared.publish, relay=RelayPoller.from_env(), history=history)
+    if sampler.relay:
+        sampler.relay.start()
+    sampler.sample()
+    sampler._run()
+
+
+def run_worker_process(host, port, shared, history):
+    """工作进程：从共享内存读取快照并处理请求"""
+    MonitorHandler.sampler = shared
+    MonitorHandler.history_store = history
+    MonitorHandler.request_log = RequestLogger.from_env()
+    if MonitorHandler.request_log:
+        MonitorHandler.request_log.start()
+    httpd = ReusePortHTTPServer((host, port), MonitorHandler)
+    httpd.serve_forever()
+
+
+def spawn_process(target, *args):
+    """fork 子进程执行 target，子进程结束后直接退出，不会返回调用方"""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        code = 0
+        try:
+            target(*args)
+        except Exception as e:
+            print(f"Process Error: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def run_prefork(host, port, workers):
+    """
+    多进程模式：1 个采样进程 + N 个 SO_REUSEPORT 工作进程
+    主进程只负责监督，子进程异常退出时自动拉起
+    """
+    shared = SharedSnapshot()
+    # 历史文件在 fork 之前映射，子进程共享同一映射
+    history = HistoryStore.from_env()
+    children = {}
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    children[spawn_process(run_sampler_process, shared, history)] = ('sampler', run_sampler_process, (shared, history))
+    # 等待采样进程写入第一份快照
+    time.sleep(min(1.0, float(os.environ.get('SAMPLE_INTERVAL', 1))))
+    for _ in range(workers):
+        children[spawn_process(run_worker_process, host, port, shared, history)] = ('worker', run_worker_process, (host, port, shared, history))
+
+    print(f"Pre-fork mode: 1 sampler + {workers} workers (SO_REUSEPORT)\n", flush=True)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        role, target, args = children.pop(pid, (None, None, None))
+        if role and not stopping:
+            print(f"{role} process {pid} exited (status {status}), restarting...", file=sys.stderr, flush=True)
+            time.sleep(1)
+            children[spawn_process(target, *args)] = (role, target, args)
+    print("\n\nStopping...")
+
+
+def run_server(host='0.0.0.0', port=None, workers=None):
+    """运行服务器 - 默认单进程多线程，WORKERS>1 时使用多进程模式"""
     if port is None:
         port = int(os.environ.get('LISTEN_PORT', 8627))
+    if workers is None:
+        workers = int(os.environ.get('WORKERS', 1))
+    if workers > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        print("SO_REUSEPORT not supported, falling back to single process", file=sys.stderr)
+        workers = 1
     
     print("\n" + "="*70)
     print("Server Performance Monitor API v2.1-optimized")
     print("="*70)
     print(f"Listening: {host}:{port}")
     print(f"Threading: Enabled (Multi-threaded)")
+    print(f"Workers: {workers}")
+    print(f"Sampler: every {float(os.environ.get('SAMPLE_INTERVAL', 1))}s")
+    # 插件在 fork 之前加载，多进程模式下各工作进程都能识别插件采集器
+    plugins = COLLECTORS.load_plugins()
+    print(f"Collectors: {', '.join(c.name for c in COLLECTORS)}")
+    if plugins:
+        print(f"Plugins: {', '.join(plugins)}")
     print(f"Python: {sys.version.split()[0]}")
     print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*70 + "\n")
     
+    if workers > 1:
+        run_prefork(host, port, workers)
+        return
+    
     try:
+        # 启动后台采样线程
+        MonitorHandler.history_store = HistoryStore.from_env()
+        MonitorHandler.sampler = MetricsSampler(relay=RelayPoller.from_env(), history=MonitorHandler.history_store)
+        MonitorHandler.sampler.start()
+        MonitorHandler.request_log = RequestLogger.from_env()
+        if MonitorHandler.request_log:
+            MonitorHandler.request_log.start()
+        if MonitorHandler.history_store:
+            store = MonitorHandler.history_store
+            print(f"History: {store.path} ({store.count} samples written, capacity {store.capacity})")
+        if MonitorHandler.sampler.relay:
+            print(f"Relay: polling {len(MonitorHandler.sampler.relay.targets)} downstream agents\n")
+        
         # 使用自定义的多线程服务器
         httpd = ThreadedHTTPServer((host, port), MonitorHandler)
         
@@ -735,6 +2531,601 @@ EOFPYTHON
     print_success "优化版脚本创建完成"
 }
 
+# 创建压测工具 bench.py 与采集函数微基准 microbench.py
+create_benchmark_script() {
+    cat > ${INSTALL_DIR}/bench.py << 'EOFBENCH'
+# bench.py - Agent 压测与延迟基准工具
+"""
+在本机启动一个临时 Agent（或连接已运行的 Agent），按路由 × 连接方式 × 并发数逐组压测，
+输出吞吐、延迟分位数以及 Agent 进程的 CPU/RSS，并可保存为 JSON 与历史结果对比
+
+示例:
+    python3 bench.py                                   # 启动临时 Agent，默认参数
+    python3 bench.py --concurrency 1,16,64 --duration 10 --json result.json
+    python3 bench.py --url http://127.0.0.1:8627 --key KEY   # 压测正在运行的服务
+    python3 bench.py --compare old.json --max-regression 15  # 吞吐/延迟退化超过 15% 时返回 1
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+
+
+def percentile(sorted_values, pct):
+    """已排序列表的分位数（最近秩）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class ProcessStats:
+    """按 /proc 统计 Agent 进程（含多进程模式下的子进程）的 CPU 时间与 RSS 峰值"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.ticks = os.sysconf('SC_CLK_TCK')
+        self.page_size = os.sysconf('SC_PAGE_SIZE')
+
+    def pids(self):
+        """Agent 主进程及其直接子进程"""
+        result = [self.pid]
+        for name in os.listdir('/proc'):
+            if not name.isdigit():
+                continue
+            try:
+                with open(f'/proc/{name}/stat', 'r') as f:
+                    fields = f.read().rpartition(')')[2].split()
+                if int(fields[1]) == self.pid:
+                    result.append(int(name))
+            except (OSError, IndexError, ValueError):
+                continue
+        return result
+
+    def sample(self):
+        """返回 (CPU 秒数, RSS 字节)"""
+        cpu, rss = 0.0, 0
+        for pid in self.pids():
+            try:
+                with open(f'/proc/{pid}/stat', 'r') as f:
+                    fields = f.read().rpartition(')')[2].split()
+                cpu += (int(fields[11]) + int(fields[12])) / self.ticks
+                rss += int(fields[21]) * self.page_size
+            except (OSError, IndexError, ValueError):
+                continue
+        return cpu, rss
+
+
+class Agent:
+    """启动临时 Agent：随机密钥、独立历史文件，退出时清理"""
+
+    def __init__(self, server, port, workers, sample_interval):
+        self.server = server
+        self.port = port
+        self.key = secrets.token_hex(16)
+        self.tmpdir = tempfile.mkdtemp(prefix='bench-')
+        env = dict(os.environ)
+        env.update({
+            'LISTEN_PORT': str(port),
+            'SECRET_KEY': self.key,
+            'WORKERS': str(workers),
+            'SAMPLE_INTERVAL': str(sample_interval),
+            'HISTORY_FILE': os.path.join(self.tmpdir, 'history.dat'),
+            'PLUGINS_DIR': os.path.join(self.tmpdir, 'collectors'),
+            'RELAY_TARGETS_FILE': ''
+        })
+        self.process = subprocess.Popen([sys.executable, server], env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def wait_ready(self, timeout=15):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'agent exited with code {self.process.returncode}')
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=1)
+                conn.request('GET', '/health', headers={'Authorization': f'Bearer {self.key}'})
+                if conn.getresponse().status == 200:
+                    conn.close()
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError('agent did not become ready')
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        for name in ('history.dat',):
+            try:
+                os.remove(os.path.join(self.tmpdir, name))
+            except OSError:
+                pass
+        try:
+            os.rmdir(self.tmpdir)
+        except OSError:
+            pass
+
+
+def worker(host, port, path, key, keepalive, stop_at, latencies, errors, lock):
+    """单个压测线程：keepalive 时复用一条连接，否则每个请求新建连接"""
+    headers = {'Authorization': f'Bearer {key}'}
+    if not keepalive:
+        headers['Connection'] = 'close'
+    local, failed = [], 0
+    conn = None
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        try:
+            if conn is None:
+                conn = http.client.HTTPConnection(host, port, timeout=10)
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                failed += 1
+            local.append(time.perf_counter() - started)
+            if not keepalive or response.will_close:
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            failed += 1
+            if conn is not None:
+                conn.close()
+            conn = None
+    if conn is not None:
+        conn.close()
+    with lock:
+        latencies.extend(local)
+        errors.append(failed)
+
+
+def run_case(host, port, key, path, keepalive, concurrency, duration, stats):
+    """执行一组压测并返回结果"""
+    latencies, errors, lock = [], [], threading.Lock()
+    cpu_before, _ = stats.sample() if stats else (0.0, 0)
+    peak_rss = [0]
+    done = threading.Event()
+
+    def watch():
+        while not done.wait(0.2):
+            peak_rss[0] = max(peak_rss[0], stats.sample()[1])
+
+    watcher = threading.Thread(target=watch, daemon=True) if stats else None
+    if watcher:
+        watcher.start()
+
+    started = time.perf_counter()
+    stop_at = started + duration
+    threads = [threading.Thread(target=worker, args=(host, port, path, key, keepalive, stop_at, latencies, errors, lock))
+               for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+
+    result = {
+        'route': path,
+        'mode': 'keepalive' if keepalive else 'close',
+        'concurrency': concurrency,
+        'duration': round(elapsed, 2),
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0
+    }
+    latencies.sort()
+    for pct in (50, 90, 99):
+        result[f'p{pct}_ms'] = round(percentile(latencies, pct) * 1000, 2)
+    result['max_ms'] = round(latencies[-1] * 1000, 2) if latencies else 0.0
+    if stats:
+        cpu_after, rss = stats.sample()
+        result['agent_cpu_percent'] = round((cpu_after - cpu_before) / elapsed * 100, 1)
+        result['agent_rss_mb'] = round(max(peak_rss[0], rss) / 1024 / 1024, 1)
+    return result
+
+
+def compare(results, baseline, max_regression):
+    """与历史结果逐组对比，返回退化项列表"""
+    previous = {(r['route'], r['mode'], r['concurrency']): r for r in baseline.get('results', [])}
+    regressions = []
+    for r in results:
+        old = previous.get((r['route'], r['mode'], r['concurrency']))
+        if not old:
+            continue
+        if old['rps'] > 0 and (old['rps'] - r['rps']) / old['rps'] * 100 > max_regression:
+            regressions.append(f"{r['route']} {r['mode']} c={r['concurrency']}: rps {old['rps']} -> {r['rps']}")
+        if old['p99_ms'] > 0 and (r['p99_ms'] - old['p99_ms']) / old['p99_ms'] * 100 > max_regression:
+            regressions.append(f"{r['route']} {r['mode']} c={r['concurrency']}: p99 {old['p99_ms']}ms -> {r['p99_ms']}ms")
+    return regressions
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Server Monitor Agent benchmark')
+    parser.add_argument('--server', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py'),
+                        help='server.py to start (ignored with --url)')
+    parser.add_argument('--url', help='benchmark a running agent instead of starting one')
+    parser.add_argument('--key', default=os.environ.get('SECRET_KEY', ''), help='secret key for --url')
+    parser.add_argument('--pid', type=int, help='agent pid for CPU/RSS when using --url')
+    parser.add_argument('--routes', default='/health,/cpu,/metrics,/metrics/prom')
+    parser.add_argument('--modes', default='keepalive,close')
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per case')
+    parser.add_argument('--workers', type=int, default=1, help='WORKERS for the started agent')
+    parser.add_argument('--sample-interval', type=float, default=1.0)
+    parser.add_argument('--json', help='write machine-readable results to this file')
+    parser.add_argument('--compare', help='previous JSON result to compare against')
+    parser.add_argument('--max-regression', type=float, default=10.0, help='allowed regression in percent')
+    args = parser.parse_args()
+
+    agent = None
+    if args.url:
+        parts = urllib.parse.urlsplit(args.url if '://' in args.url else 'http://' + args.url)
+        host, port, key = parts.hostname, parts.port or 80, args.key
+        stats = ProcessStats(args.pid) if args.pid else None
+    else:
+        host, port = '127.0.0.1', free_port()
+        agent = Agent(args.server, port, args.workers, args.sample_interval)
+        key = agent.key
+        stats = ProcessStats(agent.process.pid)
+
+    results = []
+    try:
+        if agent:
+            agent.wait_ready()
+            time.sleep(args.sample_interval)
+        print(f"{'route':<16}{'mode':<11}{'conc':>5}{'rps':>10}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}{'err':>6}{'cpu%':>8}{'rss':>8}")
+        for path in [p.strip() for p in args.routes.split(',') if p.strip()]:
+            for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+                for concurrency in [int(c) for c in args.concurrency.split(',') if c.strip()]:
+                    r = run_case(host, port, key, path, mode == 'keepalive', concurrency, args.duration, stats)
+                    results.append(r)
+                    print(f"{r['route']:<16}{r['mode']:<11}{r['concurrency']:>5}{r['rps']:>10}"
+                          f"{r['p50_ms']:>9}{r['p90_ms']:>9}{r['p99_ms']:>9}{r['max_ms']:>9}{r['errors']:>6}"
+                          f"{r.get('agent_cpu_percent', '-'):>8}{r.get('agent_rss_mb', '-'):>8}", flush=True)
+    finally:
+        if agent:
+            agent.stop()
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'host': socket.gethostname(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('key', 'json', 'compare')},
+        'results': results
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            print(f"\nRegressions (> {args.max_regression}%):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.max_regression}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+EOFBENCH
+
+    cat > ${INSTALL_DIR}/microbench.py << 'EOFMICRO'
+# microbench.py - SystemMonitor 采集函数微基准测试
+"""
+对每个采集函数计时（每次调用耗时与内存分配），数据源可以是:
+    small / large   按机器规模生成的 /proc 样本树（8 核/数百进程，256 核/数千进程/数百挂载点）
+    live            本机真实 /proc
+    目录            用 --record 从某台机器录制的 /proc 样本树
+
+示例:
+    python3 microbench.py                                  # small,large,live
+    python3 microbench.py --record /tmp/proc-web01         # 录制本机 /proc 样本
+    python3 microbench.py --fixture /tmp/proc-web01 --json result.json
+    python3 microbench.py --compare old.json --max-regression 20
+
+单次调用中位耗时超出采集器的耗时预算（server.py 中注册的 budget_ms），
+或相对 --compare 结果退化超过阈值时，返回码为 1
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from server import SystemMonitor, COLLECTORS
+
+PROFILES = {
+    'small': {'cores': 8, 'pids': 300, 'mounts': 20, 'interfaces': 4},
+    'large': {'cores': 256, 'pids': 5000, 'mounts': 400, 'interfaces': 64}
+}
+
+# (名称, 函数, 对应的采集器)
+TARGETS = (
+    ('get_cpu_percent', SystemMonitor.get_cpu_percent, 'cpu'),
+    ('get_cpu_cores', SystemMonitor.get_cpu_cores, 'cpu_cores'),
+    ('get_memory_info', SystemMonitor.get_memory_info, 'memory'),
+    ('get_disk_info', SystemMonitor.get_disk_info, 'disk'),
+    ('get_load_average', SystemMonitor.get_load_average, 'load'),
+    ('get_pressure_raw', SystemMonitor.get_pressure_raw, 'pressure'),
+    ('get_network_info', SystemMonitor.get_network_info, 'network'),
+    ('get_mounts', SystemMonitor.get_mounts, 'mounts'),
+    ('get_process_stats', SystemMonitor.get_process_stats, 'processes')
+)
+
+FAKE_STATVFS = os.statvfs_result((4096, 4096, 26214400, 13107200, 12000000, 6553600, 5000000, 5000000, 0, 255))
+
+
+def write(root, path, text):
+    full = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, 'w') as f:
+        f.write(text)
+
+
+def generate(root, cores, pids, mounts, interfaces, seed=1):
+    """生成指定规模的 /proc 样本树"""
+    rng = random.Random(seed)
+
+    def cpu_line(name):
+        values = [rng.randint(10 ** 5, 10 ** 7) for _ in range(10)]
+        return name + ' ' + ' '.join(str(v) for v in values)
+
+    stat = [cpu_line('cpu ')] + [cpu_line(f'cpu{i}') for i in range(cores)]
+    stat += ['intr 123456789 ' + ' '.join('0' for _ in range(256)), 'ctxt 987654321',
+             'btime 1700000000', f'processes {pids * 10}', 'procs_running 3', 'procs_blocked 0']
+    write(root, 'stat', '\n'.join(stat) + '\n')
+
+    meminfo = [
+        ('MemTotal', 64 << 20), ('MemFree', 8 << 20), ('MemAvailable', 40 << 20), ('Buffers', 1 << 20),
+        ('Cached', 24 << 20), ('SwapCached', 1024), ('Active', 20 << 20), ('Inactive', 16 << 20),
+        ('Active(anon)', 10 << 20), ('Inactive(anon)', 2 << 20), ('Active(file)', 10 << 20),
+        ('Inactive(file)', 14 << 20), ('Unevictable', 0), ('Mlocked', 0), ('SwapTotal', 8 << 20),
+        ('SwapFree', 7 << 20), ('Dirty', 2048), ('Writeback', 0), ('AnonPages', 12 << 20),
+        ('Mapped', 1 << 20), ('Shmem', 512 << 10), ('KReclaimable', 1 << 20), ('Slab', 2 << 20),
+        ('SReclaimable', 1 << 20), ('SUnreclaim', 1 << 20), ('KernelStack', 32768), ('PageTables', 131072),
+        ('NFS_Unstable', 0), ('Bounce', 0), ('WritebackTmp', 0), ('CommitLimit', 40 << 20),
+        ('Committed_AS', 30 << 20), ('VmallocTotal', 34359738367), ('VmallocUsed', 200000),
+        ('VmallocChunk', 0), ('Percpu', cores * 1024), ('HardwareCorrupted', 0), ('AnonHugePages', 0),
+        ('ShmemHugePages', 0), ('ShmemPmdMapped', 0), ('FileHugePages', 0), ('FilePmdMapped', 0)
+    ]
+    lines = [f'{k + ":":<16}{v:>8} kB' for k, v in meminfo]
+    lines += ['HugePages_Total:       0', 'HugePages_Free:        0', 'HugePages_Rsvd:        0',
+              'HugePages_Surp:        0', 'Hugepagesize:       2048 kB', 'Hugetlb:               0 kB']
+    write(root, 'meminfo', '\n'.join(lines) + '\n')
+
+    vmstat = [f'nr_stat_{i} {rng.randint(0, 10 ** 6)}' for i in range(60)]
+    vmstat += ['pswpin 12345', 'pswpout 23456'] + [f'numa_stat_{i} {rng.randint(0, 10 ** 6)}' for i in range(90)]
+    write(root, 'vmstat', '\n'.join(vmstat) + '\n')
+
+    write(root, 'loadavg', f'{cores * 0.3:.2f} {cores * 0.25:.2f} {cores * 0.2:.2f} 3/{pids * 2} {pids * 10}\n')
+
+    for resource in ('cpu', 'memory', 'io'):
+        write(root, f'pressure/{resource}',
+              'some avg10=1.23 avg60=0.98 avg300=0.50 total=123456789\n'
+              'full avg10=0.10 avg60=0.05 avg300=0.01 total=2345678\n')
+
+    net = ['Inter-|   Receive                                                |  Transmit',
+           ' face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed',
+           '    lo: 1000 10 0 0 0 0 0 0 1000 10 0 0 0 0 0 0']
+    for i in range(interfaces):
+        values = ' '.join(str(rng.randint(0, 10 ** 9)) for _ in range(16))
+        net.append(f'  eth{i}: {values}')
+    write(root, 'net/dev', '\n'.join(net) + '\n')
+
+    mount_lines = ['proc /proc proc rw 0 0', 'sysfs /sys sysfs rw 0 0', 'tmpfs /run tmpfs rw 0 0',
+                   'cgroup2 /sys/fs/cgroup cgroup2 rw 0 0', '/dev/sda1 / ext4 rw,relatime 0 0']
+    for i in range(mounts):
+        if i % 3 == 0:
+            mount_lines.append(f'tmpfs /run/user/{1000 + i} tmpfs rw 0 0')
+        else:
+            mount_lines.append(f'/dev/sd{chr(98 + i % 20)}{i} /data/vol{i} {"xfs" if i % 2 else "ext4"} rw 0 0')
+    write(root, 'mounts', '\n'.join(mount_lines) + '\n')
+
+    states = 'SSSSSSSSRDIZ'
+    for pid in range(1, pids + 1):
+        fields = [rng.choice(states), '1', str(pid), str(pid), '0', '-1', '4194304'] + ['0'] * 10
+        fields += [str(rng.randint(1, 64)), '0', str(rng.randint(0, 10 ** 6)),
+                   str(rng.randint(10 ** 6, 10 ** 9)), str(rng.randint(100, 10 ** 5))] + ['0'] * 30
+        write(root, f'{pid}/stat', f'{pid} (worker {pid % 17}) ' + ' '.join(fields) + '\n')
+
+
+def record(root, source='/proc'):
+    """录制本机 /proc 中采集函数会读取的文件"""
+    for path in ('stat', 'meminfo', 'vmstat', 'loadavg', 'net/dev', 'mounts',
+                 'pressure/cpu', 'pressure/memory', 'pressure/io'):
+        try:
+            with open(os.path.join(source, path), 'r') as f:
+                write(root, path, f.read())
+        except OSError:
+            continue
+    count = 0
+    for name in os.listdir(source):
+        if name.isdigit():
+            try:
+                with open(os.path.join(source, name, 'stat'), 'r') as f:
+                    write(root, f'{name}/stat', f.read())
+                count += 1
+            except OSError:
+                continue
+    return count
+
+
+def reset_caches():
+    """清除采集函数的内部缓存，保证每次调用都真正读取数据"""
+    SystemMonitor._cpu_cache['timestamp'] = 0
+    SystemMonitor._vmstat_cache['timestamp'] = 0
+    SystemMonitor._psi_supported = None
+
+
+def measure(func, max_calls, max_seconds, alloc_calls):
+    """返回计时与分配统计"""
+    timings = []
+    deadline = time.perf_counter() + max_seconds
+    while len(timings) < max_calls and (not timings or time.perf_counter() < deadline):
+        reset_caches()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_calls):
+            reset_caches()
+            before = tracemalloc.get_traced_memory()[0]
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            func()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'calls': len(timings),
+        'min_ms': round(timings[0] * 1000, 3),
+        'median_ms': round(timings[len(timings) // 2] * 1000, 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 3),
+        'alloc_peak_kb': round(sum(peaks) / len(peaks) / 1024, 1) if peaks else 0.0,
+        'alloc_retained_bytes': int(sum(retained) / len(retained)) if retained else 0
+    }
+
+
+def compare(results, baseline, max_regression):
+    previous = {(r['fixture'], r['function']): r for r in baseline.get('results', [])}
+    regressions = []
+    for r in results:
+        old = previous.get((r['fixture'], r['function']))
+        if old and old['median_ms'] > 0 and (r['median_ms'] - old['median_ms']) / old['median_ms'] * 100 > max_regression:
+            regressions.append(f"{r['fixture']} {r['function']}: {old['median_ms']}ms -> {r['median_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SystemMonitor collector micro-benchmarks')
+    parser.add_argument('--fixture', default='small,large,live',
+                        help='comma separated: small, large, live or a recorded /proc directory')
+    parser.add_argument('--functions', default='', help='only benchmark these functions (comma separated)')
+    parser.add_argument('--calls', type=int, default=200, help='max timed calls per function')
+    parser.add_argument('--seconds', type=float, default=2.0, help='max seconds per function')
+    parser.add_argument('--alloc-calls', type=int, default=10, help='calls traced for allocations')
+    parser.add_argument('--record', metavar='DIR', help='record the live /proc into DIR and exit')
+    parser.add_argument('--json', help='write machine-readable results to this file')
+    parser.add_argument('--compare', help='previous JSON result to compare against')
+    parser.add_argument('--max-regression', type=float, default=20.0, help='allowed regression in percent')
+    args = parser.parse_args()
+
+    if args.record:
+        count = record(args.record)
+        print(f"Recorded /proc into {args.record} ({count} processes)")
+        return 0
+
+    wanted = {f.strip() for f in args.functions.split(',') if f.strip()}
+    results, failures = [], []
+    print(f"{'fixture':<10}{'function':<20}{'calls':>6}{'min':>10}{'median':>10}{'p95':>10}{'budget':>8}{'alloc KB':>10}{'kept B':>8}")
+    for fixture in [f.strip() for f in args.fixture.split(',') if f.strip()]:
+        tmpdir = None
+        if fixture in PROFILES:
+            tmpdir = tempfile.mkdtemp(prefix=f'proc-{fixture}-')
+            generate(tmpdir, **PROFILES[fixture])
+            root, statvfs = tmpdir, lambda path: FAKE_STATVFS
+        elif fixture == 'live':
+            root, statvfs = '/proc', os.statvfs
+        else:
+            root, statvfs = fixture, lambda path: FAKE_STATVFS
+        label = os.path.basename(fixture.rstrip('/')) or fixture
+
+        SystemMonitor.PROC_ROOT = root
+        SystemMonitor.statvfs = staticmethod(statvfs)
+        SystemMonitor._proc_index.clear()
+        try:
+            for name, func, collector_name in TARGETS:
+                if wanted and name not in wanted:
+                    continue
+                collector = COLLECTORS.get(collector_name)
+                budget = collector.budget_ms if collector else None
+                r = measure(func, args.calls, args.seconds, args.alloc_calls)
+                r.update({'fixture': label, 'function': name, 'budget_ms': budget})
+                results.append(r)
+                status = ''
+                if budget is not None and r['median_ms'] > budget:
+                    failures.append(f"{label} {name}: median {r['median_ms']}ms > budget {budget}ms")
+                    status = '  OVER BUDGET'
+                print(f"{label:<10}{name:<20}{r['calls']:>6}{r['min_ms']:>10}{r['median_ms']:>10}{r['p95_ms']:>10}"
+                      f"{budget if budget is not None else '-':>8}{r['alloc_peak_kb']:>10}{r['alloc_retained_bytes']:>8}{status}",
+                      flush=True)
+        finally:
+            if tmpdir:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            failures += compare(results, json.load(f), args.max_regression)
+
+    if failures:
+        print("\nFAILED:")
+        for line in failures:
+            print(f"  {line}")
+        return 1
+    print("\nAll collectors within budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+EOFMICRO
+
+    chmod +x ${INSTALL_DIR}/bench.py ${INSTALL_DIR}/microbench.py
+    print_success "压测工具创建完成"
+}
+
 # 交互式配置
 interactive_config() {
     print_line
@@ -844,6 +3235,7 @@ create_directory() {
     fi
     
     mkdir -p $INSTALL_DIR
+    mkdir -p ${INSTALL_DIR}/collectors
     print_success "目录创建完成"
 }
 
@@ -855,6 +3247,36 @@ create_config() {
 # Server Monitor Configuration
 LISTEN_PORT=${LISTEN_PORT}
 SECRET_KEY=${SECRET_KEY}
+# 后台采样间隔（秒）
+SAMPLE_INTERVAL=${SAMPLE_INTERVAL:-1}
+# cgroup 单元采集：指定单元（逗号分隔），留空则按 CPU 占用取前 N 个
+CGROUP_UNITS=${CGROUP_UNITS:-}
+CGROUP_TOP_N=${CGROUP_TOP_N:-5}
+# 工作进程数：1 为单进程多线程；大于 1 时启用多进程 SO_REUSEPORT 模式
+WORKERS=${WORKERS:-1}
+# 中继模式：下游 Agent 列表文件（每行: 名称 地址 密钥），留空则不启用
+# 多进程模式（WORKERS>1）下整个快照（含全部下游数据）需放入 SHM_SIZE 字节的共享内存，
+# 超出时数据接口返回 503；下游每台约占 2-4KB，几百台以上请相应调大 SHM_SIZE
+RELAY_TARGETS_FILE=${RELAY_TARGETS_FILE:-}
+SHM_SIZE=${SHM_SIZE:-1048576}
+RELAY_INTERVAL=${RELAY_INTERVAL:-5}
+# 持久化历史：内存映射环形文件及其记录条数（每轮采样一条，0 为关闭）
+HISTORY_FILE=${HISTORY_FILE:-${INSTALL_DIR}/history.dat}
+HISTORY_SIZE=${HISTORY_SIZE:-21600}
+# 采集器间隔覆盖（名称:秒，逗号分隔，如 mounts:120,processes:5）；插件目录中的 *.py 会自动加载
+COLLECTOR_INTERVALS=${COLLECTOR_INTERVALS:-}
+PLUGINS_DIR=${PLUGINS_DIR:-${INSTALL_DIR}/collectors}
+# 自适应采样：信号平稳时逐步放慢到最大间隔，波动大或接近阈值时回到最小间隔（0 为关闭）
+ADAPTIVE_SAMPLING=${ADAPTIVE_SAMPLING:-1}
+ADAPTIVE_MIN_INTERVAL=${ADAPTIVE_MIN_INTERVAL:-1}
+ADAPTIVE_MAX_INTERVAL=${ADAPTIVE_MAX_INTERVAL:-10}
+ADAPTIVE_STDDEV=${ADAPTIVE_STDDEV:-5}
+ADAPTIVE_THRESHOLDS=${ADAPTIVE_THRESHOLDS:-cpu:80,memory:85,load:80,pressure:20}
+# 请求日志（JSON Lines，后台异步输出）：逐条日志每秒上限与抽样比例，超出部分只计入定期汇总
+LOG_REQUESTS=${LOG_REQUESTS:-1}
+LOG_RATE=${LOG_RATE:-10}
+LOG_SAMPLE=${LOG_SAMPLE:-1}
+LOG_SUMMARY_INTERVAL=${LOG_SUMMARY_INTERVAL:-60}
 EOF
 
     chmod 600 ${INSTALL_DIR}/config.env
@@ -1115,6 +3537,8 @@ show_menu() {
     echo "  12) 测试 API 连接"
     echo "  13) 检查端口占用"
     echo "  14) 查看进程信息"
+    echo "  18) 性能基准测试"
+    echo "  19) 采集函数微基准测试"
     echo ""
     echo -e "${YELLOW}其他操作:${NC}"
     echo "  15) 启用开机自启"
@@ -1461,6 +3885,62 @@ test_api() {
     rm -f /tmp/api_response.json
 }
 
+run_benchmark() {
+    if [[ ! -f ${INSTALL_DIR}/bench.py ]]; then
+        echo -e "${RED}✗ 压测工具不存在，请先升级安装${NC}"
+        return
+    fi
+    
+    source $CONFIG_FILE
+    
+    echo -e "${BLUE}性能基准测试${NC}\n"
+    echo "  1) 启动临时 Agent 测试（不影响正在运行的服务）"
+    echo "  2) 测试正在运行的服务"
+    read -p "请选择 [1-2，默认 1]: " bench_mode
+    read -p "每组测试时长（秒，默认 5）: " bench_duration
+    read -p "并发数（逗号分隔，默认 1,8,32）: " bench_concurrency
+    
+    RESULT_FILE="${INSTALL_DIR}/bench-$(date +%Y%m%d_%H%M%S).json"
+    BENCH_ARGS=(--duration "${bench_duration:-5}" --concurrency "${bench_concurrency:-1,8,32}" --json "$RESULT_FILE")
+    
+    # 与上一次结果对比
+    LAST_RESULT=$(ls -t ${INSTALL_DIR}/bench-*.json 2>/dev/null | head -1)
+    if [[ -n "$LAST_RESULT" ]]; then
+        BENCH_ARGS+=(--compare "$LAST_RESULT")
+    fi
+    
+    if [[ "$bench_mode" == "2" ]]; then
+        MAIN_PID=$(systemctl show -p MainPID --value ${SERVICE_NAME})
+        BENCH_ARGS+=(--url "http://127.0.0.1:${LISTEN_PORT}" --key "${SECRET_KEY}")
+        if [[ -n "$MAIN_PID" && "$MAIN_PID" != "0" ]]; then
+            BENCH_ARGS+=(--pid "$MAIN_PID")
+        fi
+    else
+        BENCH_ARGS+=(--workers "${WORKERS:-1}" --sample-interval "${SAMPLE_INTERVAL:-1}")
+    fi
+    
+    echo ""
+    python3 ${INSTALL_DIR}/bench.py "${BENCH_ARGS[@]}"
+}
+
+run_microbenchmark() {
+    if [[ ! -f ${INSTALL_DIR}/microbench.py ]]; then
+        echo -e "${RED}✗ 微基准工具不存在，请先升级安装${NC}"
+        return
+    fi
+    
+    echo -e "${BLUE}采集函数微基准测试（small/large 样本与本机 /proc）${NC}\n"
+    
+    RESULT_FILE="${INSTALL_DIR}/microbench-$(date +%Y%m%d_%H%M%S).json"
+    MICRO_ARGS=(--json "$RESULT_FILE")
+    LAST_RESULT=$(ls -t ${INSTALL_DIR}/microbench-*.json 2>/dev/null | head -1)
+    if [[ -n "$LAST_RESULT" ]]; then
+        MICRO_ARGS+=(--compare "$LAST_RESULT")
+    fi
+    
+    python3 ${INSTALL_DIR}/microbench.py "${MICRO_ARGS[@]}"
+}
+
 check_port() {
     if [[ ! -f $CONFIG_FILE ]]; then
         echo -e "${RED}✗ 配置文件不存在${NC}"
@@ -1542,7 +4022,7 @@ uninstall_service() {
 main() {
     while true; do
         show_menu
-        read -p "请选择操作 [0-17]: " choice
+        read -p "请选择操作 [0-19]: " choice
         echo ""
         
         case $choice in
@@ -1563,12 +4043,14 @@ main() {
             15) enable_autostart ;;
             16) disable_autostart ;;
             17) uninstall_service ;;
+            18) run_benchmark ;;
+            19) run_microbenchmark ;;
             0) 
                 echo -e "${GREEN}再见！${NC}"
                 exit 0
                 ;;
             *)
-                echo -e "${RED}✗ 无效的选择，请输入 0-17${NC}"
+                echo -e "${RED}✗ 无效的选择，请输入 0-19${NC}"
                 ;;
         esac
         
@@ -1610,6 +4092,7 @@ main() {
     fi
     
     create_optimized_server_script
+    create_benchmark_script
     create_config
     create_service
     create_uninstall_script